@@ -0,0 +1,308 @@
+"""Declarative loaders for the ``string_list_data`` / ``string_map_data`` files.
+
+Most of an export's activity files are lists of items shaped like::
+
+    {"title": "...", "string_list_data": [{"href", "value", "timestamp"}]}
+    {"title": "...", "string_map_data": {"Saved on": {"href", "value", "timestamp"}}}
+
+Each registry entry maps one such file (or family of split files) to a typed
+table. A column source is either ``"title"``, ``"list.<field>"`` (first
+``string_list_data`` entry) or ``"<Map key>.<field>"`` (``string_map_data``),
+and ``"src1|src2"`` takes the first non-empty of several sources.
+
+Tables are cached in ``shared_cache`` with the fingerprint of their files,
+and ``load_all`` reads every registered table on a thread pool through that
+one cache.
+"""
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import export_json
+import instrument
+import shared_cache
+
+# Columns stored as pandas categoricals; "timestamp" is always datetime64 and
+# everything else is a nullable string.
+CATEGORY_COLUMNS = {"creator", "owner", "account", "source"}
+
+REGISTRY = {}
+
+
+def register(name, paths, columns, key=None, required=("timestamp",), label=None):
+    """Add a table to the registry.
+
+    ``paths`` are glob patterns relative to the export root; ``key`` is the
+    top-level JSON key holding the item list (``None`` when the file is a
+    bare list).
+    """
+    REGISTRY[name] = {
+        "name": name,
+        "label": label or name.replace("_", " ").capitalize(),
+        "paths": tuple(paths),
+        "key": key,
+        "columns": dict(columns),
+        "required": tuple(required),
+    }
+
+
+_IG = "your_instagram_activity"
+
+register(
+    "liked_posts",
+    [f"{_IG}/likes/liked_posts.json"],
+    {"creator": "title", "link": "list.href", "timestamp": "list.timestamp"},
+    key="likes_media_likes",
+)
+register(
+    "liked_comments",
+    [f"{_IG}/likes/liked_comments.json"],
+    {"creator": "title", "link": "list.href", "timestamp": "list.timestamp"},
+    key="likes_comment_likes",
+)
+register(
+    "saved_posts",
+    [f"{_IG}/saved/saved_posts.json"],
+    {"creator": "title", "link": "Saved on.href", "timestamp": "Saved on.timestamp"},
+    key="saved_saved_media",
+)
+register(
+    "saved_collections",
+    [f"{_IG}/saved/saved_collections.json"],
+    {"creator": "Name.value", "link": "Name.href", "timestamp": "Added Time.timestamp|Creation Time.timestamp"},
+    key="saved_saved_collections",
+    required=("creator", "timestamp"),
+)
+register(
+    "post_comments",
+    [f"{_IG}/comments/post_comments_*.json"],
+    {"owner": "Media Owner.value", "text": "Comment.value", "timestamp": "Time.timestamp"},
+)
+register(
+    "reels_comments",
+    [f"{_IG}/comments/reels_comments.json"],
+    {"owner": "Media Owner.value", "text": "Comment.value", "timestamp": "Time.timestamp"},
+    key="comments_reels_comments",
+)
+register(
+    "story_likes",
+    [f"{_IG}/story_interactions/story_likes.json"],
+    {"creator": "title", "timestamp": "list.timestamp"},
+    key="story_activities_story_likes",
+)
+register(
+    "story_polls",
+    [f"{_IG}/story_interactions/polls.json"],
+    {"creator": "title", "value": "list.value", "timestamp": "list.timestamp"},
+    key="story_activities_polls",
+)
+register(
+    "story_emoji_sliders",
+    [f"{_IG}/story_interactions/emoji_sliders.json"],
+    {"creator": "title", "value": "list.value", "timestamp": "list.timestamp"},
+    key="story_activities_emoji_sliders",
+)
+register(
+    "followers",
+    ["connections/followers_and_following/followers_*.json"],
+    {"account": "list.value", "link": "list.href", "timestamp": "list.timestamp"},
+)
+register(
+    "following",
+    ["connections/followers_and_following/following.json"],
+    {"account": "title|list.value", "link": "list.href", "timestamp": "list.timestamp"},
+    key="relationships_following",
+)
+register(
+    "account_searches",
+    ["logged_information/recent_searches/account_searches.json"],
+    {"account": "Search.value", "timestamp": "Time.timestamp"},
+    key="searches_user",
+)
+register(
+    "keyword_searches",
+    ["logged_information/recent_searches/word_or_phrase_searches.json"],
+    {"text": "Search.value", "timestamp": "Time.timestamp"},
+    key="searches_keyword",
+)
+
+
+# ------------------------------------------------------------
+# Extraction
+# ------------------------------------------------------------
+
+def _compile_one(source):
+    if source == "title":
+        return lambda item: item.get("title") or None
+
+    head, _, field = source.rpartition(".")
+    if head == "list":
+        def get_list(item):
+            sld = item.get("string_list_data") or ()
+            return sld[0].get(field) if sld else None
+        return get_list
+
+    def get_map(item):
+        meta = (item.get("string_map_data") or {}).get(head)
+        return meta.get(field) if meta else None
+    return get_map
+
+
+def _compile_source(source):
+    """Turn a column source string into a function of one item."""
+    getters = [_compile_one(alt) for alt in source.split("|")]
+    if len(getters) == 1:
+        return getters[0]
+
+    def first(item):
+        for get in getters:
+            value = get(item)
+            if value not in (None, ""):
+                return value
+        return None
+    return first
+
+
+def _items(data, key):
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        return []
+    if key is not None:
+        return data.get(key) or []
+    for value in data.values():
+        if isinstance(value, list):
+            return value
+    return []
+
+
+def matched_files(export_root, spec):
+    files = []
+    for pattern in spec["paths"]:
+        files.extend(sorted(glob.glob(os.path.join(export_root, pattern))))
+    return files
+
+
+def fingerprint(files):
+    out = []
+    for path in files:
+        try:
+            st = os.stat(path)
+            out.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            continue
+    return tuple(out)
+
+
+def to_frame(columns):
+    """Build a typed frame from ``{column: list}``; timestamps are epoch seconds."""
+    import pandas as pd
+
+    data = {}
+    for col, values in columns.items():
+        if col == "timestamp":
+            ts = pd.to_datetime(pd.Series(values, dtype="float64"), unit="s", utc=True)
+            if config.AUTO_LOCAL_TIME:
+                from dateutil.tz import tzlocal
+                ts = ts.dt.tz_convert(tzlocal())
+            data[col] = ts.dt.tz_localize(None)
+        elif col in CATEGORY_COLUMNS:
+            data[col] = pd.Categorical(values)
+        else:
+            data[col] = pd.array(values, dtype="string")
+    return pd.DataFrame(data)
+
+
+def extract(spec, files):
+    """Parse ``files`` for one registry entry into a typed frame."""
+    getters = {col: _compile_source(src) for col, src in spec["columns"].items()}
+    required = spec["required"]
+    out = {col: [] for col in getters}
+
+    bytes_read = 0
+    for path in files:
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            data = export_json.loads(raw)
+        except (OSError, ValueError):
+            continue
+        bytes_read += len(raw)
+
+        for item in _items(data, spec["key"]):
+            if not isinstance(item, dict):
+                continue
+            row = {col: get(item) for col, get in getters.items()}
+            if any(row.get(col) in (None, "") for col in required):
+                continue
+            for col, value in row.items():
+                out[col].append(value)
+
+    return to_frame(out), bytes_read
+
+
+# ------------------------------------------------------------
+# Cached loading
+# ------------------------------------------------------------
+
+def load_table(export_root, name):
+    """Typed frame for registry entry ``name``; treat it as read-only.
+
+    Re-parsed only when the matched files' (path, mtime, size) change.
+    """
+    spec = REGISTRY[name]
+    files = matched_files(export_root, spec)
+    fp = fingerprint(files)
+    root = os.path.abspath(export_root)
+    key = ("activity", root, name)
+
+    hit = shared_cache.get(key)
+    if hit is not None and hit[0] == fp:
+        return hit[1]
+    shared_cache.record_miss(root)
+
+    with instrument.span(f"activity.{name}") as sp:
+        frame, bytes_read = extract(spec, [p for p, _, _ in fp])
+        sp["rows"] = len(frame)
+        sp["bytes_read"] = bytes_read
+
+    shared_cache.put(key, (fp, frame), owner=root)
+    return frame
+
+
+def load_all(export_root, names=None, max_workers=8):
+    """Load every registered table (or ``names``) in parallel.
+
+    Reading and parsing overlap across files on the pool; already-cached
+    tables return immediately.
+    """
+    names = list(REGISTRY) if names is None else list(names)
+    with instrument.span("activity.load_all") as sp:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = dict(zip(names, pool.map(lambda n: load_table(export_root, n), names)))
+        sp["rows"] = sum(len(f) for f in frames.values())
+    return frames
+
+
+def summary(frames):
+    """One row per table: label, row count and time span."""
+    import pandas as pd
+
+    rows = []
+    for name, frame in frames.items():
+        ts = frame["timestamp"] if "timestamp" in frame else pd.Series(dtype="datetime64[ns]")
+        rows.append({
+            "table": name,
+            "label": REGISTRY[name]["label"],
+            "rows": len(frame),
+            "first": ts.min() if len(ts) else None,
+            "last": ts.max() if len(ts) else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def clear_cache():
+    for key in shared_cache.keys():
+        if key[0] == "activity":
+            shared_cache.discard(key)
@@ -1,30 +1,30 @@
+import io
 import os
+import json
+import time
+import datetime
 import importlib
+import zipfile
 import streamlit as st
-import pandas as pd
 import config
+import instrument
 import identity
+import ingest
 import json_loader
 import profile_loader
+import shared_cache
 import likes_stats
-
-from stats_core import (
-    messages_per_month,
-    user_time_stats,
-    words_per_user,
-    direction_word_stats,
-    per_conversation_message_length_diff,
-    domination_stats,
-    heatmap_data,
-    longest_conversations_by_messages,
-    longest_conversations_by_duration,
-    most_active_day,
-    global_user_stats,
-    media_stats_overall,
-    media_stats_per_conversation,
-    reel_spammer_stats,
-    attachment_heavy_stats,
-)
+import activity
+import media_inventory
+import similarity
+import snapshot
+import participants
+import message_store
+import thumbnails
+import timeline_index
+import trends
+import watcher
+from tables import paged_table
 
 from plots import (
     plot_messages_per_month,
@@ -33,6 +33,12 @@ from plots import (
     plot_heatmap,
     plot_top_reel_spammers,
     plot_attachment_share,
+    plot_likes_saves_per_month,
+    plot_hour_of_day,
+    plot_creator_trend,
+    plot_monthly_series,
+    plot_rolling_counts,
+    plot_trend,
 )
 
 
@@ -65,78 +71,57 @@ def set_export_root(export_root: str):
     importlib.reload(likes_stats)
 
 
-@st.cache_data(show_spinner=True)
 def load_df_for_root(export_root: str):
-    set_export_root(export_root)
-
-    my_name, my_username = identity.detect_identity(
-        config.INBOX_DIR,
-        config.PERSONAL_INFO_JSON
-    )
-
-    df = json_loader.build_dataframe_from_json(config.INBOX_DIR, my_name)
-    return df, my_name
-
-
-# -------------------------------------------------------------
-# UI — Export directory input
-# -------------------------------------------------------------
-st.title("Instagram Chat Stats")
-
-default_root = getattr(config, "EXPORT_ROOT", "")
-
-export_root = st.sidebar.text_input(
-    "Instagram export root folder",
-    value=default_root,
-    help="Folder containing: your_instagram_activity, media, personal_information, etc.",
-)
-
-if not export_root or not os.path.isdir(export_root):
-    st.error("Please enter a valid export root directory.")
-    st.stop()
-
-df, my_name = load_df_for_root(export_root)
-
-if df.empty:
-    st.warning("No messages parsed. Wrong export folder?")
-    st.stop()
-
-
-# -------------------------------------------------------------
-# Sidebar Navigation
-# -------------------------------------------------------------
-section = st.sidebar.selectbox(
-    "View",
-    [
-        "My stats",
-        "Global timeline",
-        "Per-user time stats",
-        "Word stats",
-        "Conversation domination",
-        "Longest conversations",
-        "Daily/weekly pattern",
-        "Media & attachments",
-        "Likes & Saves Insights",
-    ],
-)
-
-
-# -------------------------------------------------------------
-# SECTION: MY STATS
-# -------------------------------------------------------------
-if section == "My stats":
-    st.subheader("My stats")
+    # Shared by every session in this process (see ingest.get_job); each
+    # call gets a copy-on-write view of the one cached frame.
+    return ingest.get_job(export_root).wait()
+
+
+# Views that read the message frame or export files directly; a snapshot
+# only carries precomputed aggregates.
+RAW_DATA_SECTIONS = {"Similar conversations", "Activity overview", "Media inventory", "Conversation gallery"}
+
+
+def open_snapshot(source):
+    # Paths are shared process-wide; uploads are opened once per session.
+    if isinstance(source, str):
+        return snapshot.open_cached(source)
+    key = f"snapshot:{source.file_id}"
+    if key not in st.session_state:
+        st.session_state[key] = snapshot.Snapshot(io.BytesIO(source.getvalue()))
+    return st.session_state[key]
+
+
+@st.fragment(run_every=config.WATCH_INTERVAL_S)
+def watch_export(w):
+    """Rerun the app when the watcher has applied a change to the export."""
+    key = f"watch_version:{w.export_root}"
+    seen = st.session_state.setdefault(key, w.version)
+    if w.version != seen:
+        st.session_state[key] = w.version
+        st.rerun()
+    if w.error is not None:
+        st.warning(f"Refresh failed: {w.error}")
+    elif w.last_change is not None:
+        change = w.last_change
+        st.caption(
+            f"Refreshed {time.strftime('%H:%M:%S', time.localtime(change['time']))}: "
+            f"{len(change['conversations'])} conversations, {len(change['activity'])} activity tables "
+            f"in {change['seconds']:.1f}s."
+        )
+    else:
+        st.caption("Watching for changes...")
 
-    stats = global_user_stats(df)
 
+def render_my_stats(stats, my_name, show_profile=True):
     # Profile card
     pc1, pc2 = st.columns([1, 3])
     with pc1:
         profile_path = profile_loader.get_profile_photo_path(
             config.EXPORT_ROOT, config.PERSONAL_INFO_JSON
-        )
+        ) if show_profile else None
         if profile_path and os.path.exists(profile_path):
-            st.image(profile_path, width="content")
+            st.image(thumbnails.get_thumbnail(profile_path) or profile_path, width="content")
         else:
             st.write("🧑‍💻")
 
@@ -186,19 +171,280 @@ if section == "My stats":
         st.write(f"**Active days:** {stats['active_days']}")
 
 
+def render_ingest_progress(job, section):
+    pr = job.progress()
+    st.progress(
+        min(pr["fraction"], 1.0),
+        text=(
+            f"Loading export: {pr['files_done']}/{pr['files_total']} files, "
+            f"{pr['bytes_done'] / 1e6:.1f}/{pr['bytes_total'] / 1e6:.1f} MB, "
+            f"{pr['messages_per_s']:,.0f} messages/s"
+        ),
+    )
+    st.caption(
+        f"Reading {pr['read_bytes_per_s'] / 1e6:.1f} MB/s; parser waited {pr['read_stall_s']:.1f}s for data, "
+        f"reader waited {pr['read_throttle_s']:.1f}s for the parser."
+    )
+    st.caption("Numbers below are provisional and refine as conversations finish loading.")
+
+    if section == "My stats":
+        st.subheader("My stats")
+        render_my_stats(job.partial_user_stats(), job.my_name or "Me", show_profile=False)
+    elif section == "Global timeline":
+        st.subheader("Messages per month")
+        mpm = job.partial_messages_per_month()
+        if not mpm.empty:
+            st.pyplot(plot_messages_per_month(mpm))
+
+
+# -------------------------------------------------------------
+# UI — Export directory input
+# -------------------------------------------------------------
+st.title("Instagram Chat Stats")
+
+default_root = getattr(config, "EXPORT_ROOT", "")
+
+open_mode = st.sidebar.radio("Open", ["Export folder", "Snapshot file"], horizontal=True)
+
+snap = None
+if open_mode == "Snapshot file":
+    snap_path = st.sidebar.text_input("Snapshot file (.igsnap)")
+    snap_upload = st.sidebar.file_uploader("...or upload one", type=["igsnap", "zip"])
+    if snap_upload is None and not (snap_path and os.path.isfile(snap_path)):
+        st.info("Choose a snapshot file built from an export (sidebar button or `python snapshot.py`).")
+        st.stop()
+    try:
+        snap = open_snapshot(snap_upload if snap_upload is not None else snap_path)
+    except (ValueError, KeyError, zipfile.BadZipFile) as exc:
+        st.error(f"Could not open snapshot: {exc}")
+        st.stop()
+    if snap.notice:
+        st.sidebar.warning(snap.notice)
+    export_root = snap.export_root
+else:
+    export_root = st.sidebar.text_input(
+        "Instagram export root folder",
+        value=default_root,
+        help="Folder containing: your_instagram_activity, media, personal_information, etc.",
+    )
+
+    if not export_root or not os.path.isdir(export_root):
+        st.error("Please enter a valid export root directory.")
+        st.stop()
+
+
+# -------------------------------------------------------------
+# Sidebar Navigation
+# -------------------------------------------------------------
+section = st.sidebar.selectbox(
+    "View",
+    [
+        "My stats",
+        "Global timeline",
+        "Trends & anomalies",
+        "Per-user time stats",
+        "Word stats",
+        "Conversation domination",
+        "Group chats & contacts",
+        "Similar conversations",
+        "Longest conversations",
+        "Daily/weekly pattern",
+        "Media & attachments",
+        "Reactions & shares",
+        "Likes & Saves Insights",
+        "Activity overview",
+        "Media inventory",
+        "Conversation gallery",
+    ],
+)
+
+show_diagnostics = st.sidebar.checkbox("Diagnostics", value=False)
+
+if snap is not None:
+    df, my_name = None, snap.my_name
+    src = snap
+    st.caption(
+        f"Snapshot of {snap.manifest['export_root']} ({snap.manifest['messages']:,} messages), "
+        f"built {snap.manifest['created']}."
+    )
+    if section in RAW_DATA_SECTIONS:
+        st.info("This view needs the raw export; open the export folder instead of a snapshot.")
+        st.stop()
+else:
+    if os.path.abspath(export_root) != config.EXPORT_ROOT:
+        set_export_root(export_root)
+
+    if st.sidebar.button("Reload export"):
+        ingest.forget(export_root)
+
+    with st.sidebar.expander("Message store"):
+        store_dir = st.text_input("Store folder", value=config.MESSAGE_STORE_DIR)
+        if st.button("Merge this export into store"):
+            with st.spinner("Merging new messages..."):
+                try:
+                    merged = message_store.merge_export(store_dir, export_root)
+                except ValueError as exc:
+                    st.error(str(exc))
+                else:
+                    st.success(
+                        f"Added {merged['messages_added']:,} messages "
+                        f"from {merged['conversations']} conversations in {merged['seconds']:.1f}s."
+                    )
+        try:
+            merges = message_store.read_manifest(store_dir)["merges"] if os.path.isdir(store_dir) else []
+        except ValueError as exc:
+            st.error(str(exc))
+            merges = []
+        if merges:
+            st.caption(f"{len(merges)} merges, last from {merges[-1]['export_root']}")
+        use_store = st.checkbox("Analyse merged store instead of this export", value=False)
+
+    if use_store:
+        try:
+            df, my_name = message_store.load_store(store_dir)
+        except ValueError as exc:
+            st.error(str(exc))
+            st.stop()
+        if df.empty:
+            st.warning("The message store is empty. Merge an export first.")
+            st.stop()
+    else:
+        job = ingest.get_job(export_root)
+        if job.status == "error":
+            st.error(f"Failed to load export: {job.error}. Fix the folder and press \"Reload export\" to retry.")
+            st.stop()
+        if not job.done:
+            render_ingest_progress(job, section)
+            time.sleep(1)
+            st.rerun()
+
+        df, my_name = load_df_for_root(export_root)
+
+        if st.sidebar.checkbox("Watch export folder for changes", value=False):
+            with st.sidebar:
+                watch_export(watcher.start(export_root))
+
+    if df.empty:
+        st.warning("No messages parsed. Wrong export folder?")
+        st.stop()
+
+    src = snapshot.LiveSource(df, export_root, my_name)
+
+    st.sidebar.download_button(
+        "Download dashboard snapshot",
+        data=lambda: snapshot.snapshot_bytes(df, export_root, my_name),
+        file_name="ig_stats.igsnap",
+        mime="application/zip",
+    )
+
+
+# -------------------------------------------------------------
+# SECTION: MY STATS
+# -------------------------------------------------------------
+if section == "My stats":
+    st.subheader("My stats")
+
+    stats = src.get("global_user_stats")
+    render_my_stats(stats, my_name, show_profile=snap is None)
+
+
 # -------------------------------------------------------------
 # SECTION: GLOBAL TIMELINE
 # -------------------------------------------------------------
 elif section == "Global timeline":
     st.subheader("Messages per month")
-    mpm = messages_per_month(df)
+    mpm = src.get("messages_per_month")
     fig = plot_messages_per_month(mpm)
     st.pyplot(fig)
 
-    day, count = most_active_day(df)
+    day, count = src.get("most_active_day")
     if day:
         st.write(f"Most active day: **{day}** with **{count}** messages")
 
+    st.subheader("Rolling window")
+    window = st.select_slider("Window (days)", options=[1, 7, 14, 30, 90, 180, 365], value=30)
+    if df is not None:
+        index = timeline_index.build_index(df)
+        top = list(src.get("longest_conversations_by_messages").index)
+        chosen = st.multiselect("Compare conversations", list(index["conversations"]), default=top[:3])
+        roll = timeline_index.rolling_counts(index, window)
+        if chosen:
+            roll = roll.join(timeline_index.rolling_counts(index, window, chosen))
+    else:
+        roll = timeline_index.rolling_series(src.get("messages_per_day"), window).to_frame()
+    if not roll.empty:
+        st.pyplot(plot_rolling_counts(roll, window))
+
+    st.subheader(f"Busiest {window}-day stretch per conversation")
+    if df is not None:
+        paged_table(timeline_index.best_windows(index, window), key="busiest_windows", sort_by="messages", hide_index=True)
+    elif f"busiest_windows_{window}d" in src:
+        paged_table(src.get(f"busiest_windows_{window}d"), key="busiest_windows", sort_by="messages", hide_index=True)
+    else:
+        windows = " and ".join(f"{d}-day" for d in snapshot.BUSIEST_WINDOW_DAYS)
+        st.info(f"Snapshots include the {windows} searches; open the export folder for other windows.")
+
+    if df is not None and len(index["cum_total"]) > 1:
+        st.subheader("Activity in a date range")
+        first = index["start"].date()
+        last = first + datetime.timedelta(days=len(index["cum_total"]) - 2)
+        picked = st.date_input(
+            "Range", value=(max(first, last - datetime.timedelta(days=90)), last), min_value=first, max_value=last,
+        )
+        if len(picked) == 2:
+            in_range = timeline_index.window_counts(index, picked[0], picked[1] + datetime.timedelta(days=1))
+            st.write(f"**{int(in_range.sum()):,}** messages in **{int((in_range > 0).sum())}** conversations")
+            paged_table(
+                in_range[in_range > 0].reset_index(), key="range_counts", sort_by="messages",
+                rank_by="messages", hide_index=True,
+            )
+
+
+# -------------------------------------------------------------
+# SECTION: TRENDS & ANOMALIES
+# -------------------------------------------------------------
+elif section == "Trends & anomalies":
+    st.subheader("Unusual activity across all conversations")
+    if df is not None:
+        tc1, tc2, tc3, tc4 = st.columns(4)
+        with tc1:
+            period_days = st.selectbox("Period (days)", [1, 7, 30], index=1)
+        with tc2:
+            baseline_periods = st.slider("Baseline periods", min_value=2, max_value=26, value=trends.BASELINE_PERIODS)
+        with tc3:
+            z_threshold = st.slider("Spike z-score", min_value=2.0, max_value=8.0, value=trends.Z_THRESHOLD, step=0.5)
+        with tc4:
+            drop_share = st.slider("Drop below baseline", min_value=0.5, max_value=1.0, value=trends.DROP_SHARE, step=0.05)
+
+        result = trends.detect(df, period_days=period_days, baseline_periods=baseline_periods)
+        anomalies = trends.top_anomalies(result, z_threshold=z_threshold, drop_share=drop_share, top_n=500)
+        changes = trends.change_points(result, top_n=500)
+    elif "top_anomalies" in src:
+        result = None
+        anomalies, changes = src.get("top_anomalies"), src.get("change_points")
+        st.caption(
+            f"Snapshot: {trends.PERIOD_DAYS}-day periods against a {trends.BASELINE_PERIODS}-period baseline; "
+            "open the export folder to change the settings."
+        )
+    else:
+        result = anomalies = changes = None
+        st.info("This snapshot was made before trend detection existed; rebuild it or open the export folder.")
+
+    if anomalies is not None:
+        st.markdown("### Top anomalies")
+        st.caption("Spikes well above a chat's trailing baseline, and periods where it fell far below it.")
+        paged_table(anomalies, key="top_anomalies", hide_index=True)
+
+        if result is not None and not anomalies.empty:
+            conv = st.selectbox("Show conversation", anomalies["conversation"].unique().tolist())
+            trend = trends.conversation_trend(result, conv)
+            marks = anomalies[anomalies["conversation"] == conv].set_index("period")["messages"]
+            st.pyplot(plot_trend(trend, marks, title=conv))
+
+        st.markdown("### Biggest shifts in activity level")
+        st.caption("For each conversation, the point that best splits its history into two activity levels.")
+        paged_table(changes, key="change_points", sort_by="score", hide_index=True)
+
 
 # -------------------------------------------------------------
 # SECTION: PER-USER TIME STATS
@@ -206,32 +452,12 @@ elif section == "Global timeline":
 elif section == "Per-user time stats":
     st.subheader("Per-user time stats")
 
-    uts = user_time_stats(df)
-    uts = uts.sort_values("total_msgs", ascending=False).head(50)
+    uts = src.get("user_time_stats")
 
     # Convert index (conversation name) into a column
     uts = uts.reset_index().rename(columns={"index": "conversation"})
 
-    # Add Rank column starting from 1
-    uts.insert(0, "Rank", range(1, len(uts) + 1))
-
-    # Highlight top 3 rows
-    def highlight_top3(row):
-        rank = row["Rank"]
-        if rank == 1:
-            return ["font-weight: bold; color: gold"] * len(row)
-        elif rank == 2:
-            return ["font-weight: bold; color: silver"] * len(row)
-        elif rank == 3:
-            return ["font-weight: bold; color: #cd7f32"] * len(row)
-        return [""] * len(row)
-
-    st.dataframe(
-        uts.style.apply(highlight_top3, axis=1),
-        hide_index=True
-    )
-
-
+    paged_table(uts, key="user_time_stats", sort_by="total_msgs", rank_by="total_msgs", hide_index=True)
 
 
 # -------------------------------------------------------------
@@ -239,15 +465,15 @@ elif section == "Per-user time stats":
 # -------------------------------------------------------------
 elif section == "Word stats":
     st.subheader("Top users by total words")
-    wpu = words_per_user(df)
+    wpu = src.get("words_per_user")
     fig = plot_top_users_by_messages(wpu, top_n=20)
     st.pyplot(fig)
 
     st.subheader("You vs them word stats")
-    st.dataframe(direction_word_stats(df))
+    st.dataframe(src.get("direction_word_stats"))
 
     st.subheader("Per-conversation avg message length diff")
-    diff = per_conversation_message_length_diff(df)
+    diff = src.get("per_conversation_message_length_diff")
     st.dataframe(diff.sort_values("me_minus_them", ascending=False).head(20))
 
 
@@ -256,13 +482,97 @@ elif section == "Word stats":
 # -------------------------------------------------------------
 elif section == "Conversation domination":
     st.subheader("Who texts more: you vs them")
-    dom = domination_stats(df)
+    dom = src.get("domination_stats")
 
     mode = st.radio("View", ["Convos where I text more", "Convos where they text more"])
     fig = plot_domination_balance(dom, top_n=20, mode="me" if "I text" in mode else "them")
     st.pyplot(fig)
 
-    st.dataframe(dom.sort_values("balance", ascending=False).head(50))
+    paged_table(dom, key="domination", sort_by="balance")
+
+
+# -------------------------------------------------------------
+# SECTION: GROUP CHATS & CONTACTS
+# -------------------------------------------------------------
+elif section == "Group chats & contacts":
+    st.subheader("Group chats & contacts")
+    summary = src.get("participant_summary")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Participants", f"{summary['participants']:,}")
+    with col2:
+        st.metric("Group chats", summary["group_chats"])
+    with col3:
+        st.metric("Reply pairs", f"{summary['reply_pairs']:,}")
+
+    st.markdown("### Top interaction pairs")
+    st.caption(
+        f"A reply is a message that follows someone else's in the same chat "
+        f"within {participants.REPLY_WINDOW_S // 3600} hours."
+    )
+    paged_table(
+        src.get("top_interaction_pairs"),
+        key="interaction_pairs",
+        sort_by="total",
+        rank_by="total",
+        hide_index=True,
+    )
+
+    st.markdown("### Messages per participant")
+    per_part = src.get("messages_per_participant")
+    if st.checkbox("Group chats only", value=True):
+        per_part = per_part[per_part["members"] > 2]
+    convs = sorted(per_part["conversation"].unique())
+    if convs:
+        conv = st.selectbox("Conversation", convs)
+        paged_table(
+            per_part[per_part["conversation"] == conv].drop(columns=["conversation", "members"]),
+            key="participant_messages",
+            sort_by="messages",
+            rank_by="messages",
+            hide_index=True,
+        )
+
+    st.markdown("### Contacts across conversations")
+    paged_table(src.get("contacts"), key="contacts", sort_by="messages", hide_index=True)
+
+
+# -------------------------------------------------------------
+# SECTION: SIMILAR CONVERSATIONS
+# -------------------------------------------------------------
+elif section == "Similar conversations":
+    st.subheader("Chats that behave alike")
+    st.caption(
+        "Each conversation is described by when it is active (day of week x hour), "
+        "its reel/image/attachment shares, who talks more and message lengths."
+    )
+    sc1, sc2 = st.columns(2)
+    with sc1:
+        min_messages = st.number_input("Minimum messages per conversation", min_value=1, value=20, step=10)
+    with sc2:
+        k = st.slider("Clusters", min_value=2, max_value=20, value=6)
+
+    neighbours = similarity.similar_conversations(df, k=5, min_messages=min_messages)
+    if neighbours.empty:
+        st.info("Not enough conversations with that many messages.")
+    else:
+        st.markdown("### Most similar conversations")
+        conv = st.selectbox("Conversation", sorted(neighbours["conversation"].unique()))
+        st.dataframe(
+            neighbours[neighbours["conversation"] == conv].drop(columns="conversation"),
+            hide_index=True,
+        )
+
+        st.markdown("### Clusters")
+        members, profile = similarity.conversation_clusters(df, k=k, min_messages=min_messages)
+        st.dataframe(profile, hide_index=True)
+        cluster = st.selectbox("Show members of cluster", profile["cluster"].tolist())
+        paged_table(
+            members[members["cluster"] == cluster].drop(columns="cluster"),
+            key="cluster_members",
+            hide_index=True,
+        )
 
 
 # -------------------------------------------------------------
@@ -270,11 +580,11 @@ elif section == "Conversation domination":
 # -------------------------------------------------------------
 elif section == "Longest conversations":
     st.subheader("By total messages")
-    top_msgs = longest_conversations_by_messages(df, top_n=20)
+    top_msgs = src.get("longest_conversations_by_messages")
     st.pyplot(plot_top_users_by_messages(top_msgs, top_n=20))
 
     st.subheader("By duration (days)")
-    st.dataframe(longest_conversations_by_duration(df, top_n=20))
+    st.dataframe(src.get("longest_conversations_by_duration"))
 
 
 # -------------------------------------------------------------
@@ -282,7 +592,7 @@ elif section == "Longest conversations":
 # -------------------------------------------------------------
 elif section == "Daily/weekly pattern":
     st.subheader("Message heatmap (day × hour)")
-    fig = plot_heatmap(heatmap_data(df))
+    fig = plot_heatmap(src.get("heatmap_data"))
     st.pyplot(fig)
 
 
@@ -292,7 +602,7 @@ elif section == "Daily/weekly pattern":
 elif section == "Media & attachments":
     st.subheader("Media and attachment stats")
 
-    overall, by_dir = media_stats_overall(df)
+    overall, by_dir = src.get("media_stats_overall")
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -308,14 +618,14 @@ elif section == "Media & attachments":
     st.dataframe(by_dir)
 
     st.markdown("### Attachment-heavy conversations")
-    st.dataframe(
-        media_stats_per_conversation(df)
-            .sort_values("any_attachment_share", ascending=False)
-            .head(20)
+    paged_table(
+        src.get("media_stats_per_conversation"),
+        key="media_per_conversation",
+        sort_by="any_attachment_share",
     )
 
     st.markdown("### Top reel spammers")
-    spammers = reel_spammer_stats(df)
+    spammers = src.get("reel_spammer_stats")
     mode = st.radio(
         "Reel view",
         ["I send more reels", "They send more reels"],
@@ -330,54 +640,235 @@ elif section == "Media & attachments":
         st.pyplot(fig_spam)
 
     st.markdown("### Most attachment-heavy conversations (chart)")
-    attach_stats = attachment_heavy_stats(df)
+    attach_stats = src.get("attachment_heavy_stats")
     fig_attach = plot_attachment_share(attach_stats, top_n=15)
     if fig_attach:
         st.pyplot(fig_attach)
 
 
+# -------------------------------------------------------------
+# SECTION: REACTIONS & SHARES
+# -------------------------------------------------------------
+elif section == "Reactions & shares":
+    st.subheader("Reactions & shares")
+    summary = src.get("reaction_summary")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Reactions", f"{summary['reactions']:,}")
+    with col2:
+        st.metric("Messages with reactions", f"{summary['reacted_messages']:,}")
+    with col3:
+        st.metric("Shared posts", f"{summary['shared_posts']:,}")
+
+    st.markdown("### Most reacted messages")
+    paged_table(src.get("most_reacted_messages"), key="most_reacted",
+                sort_by="reaction_count", hide_index=True)
+
+    st.markdown("### Who reacts to whom")
+    paged_table(src.get("who_reacts_to_whom"), key="who_reacts",
+                sort_by="reactions", rank_by="reactions", hide_index=True)
+
+    st.markdown("### Reactions by emoji")
+    st.dataframe(src.get("reactions_by_emoji"), hide_index=True)
+
+    st.markdown("### Most shared creators")
+    paged_table(src.get("most_shared_creators"), key="shared_creators",
+                sort_by="total", rank_by="total", hide_index=True)
+
+
 # -------------------------------------------------------------
 # SECTION: LIKES & SAVES INSIGHTS (NEW)
 # -------------------------------------------------------------
 elif section == "Likes & Saves Insights":
     st.subheader("Likes & Saves Insights")
 
-    liked = likes_stats.load_liked_posts(export_root)
-    saved = likes_stats.load_saved_posts(export_root)
+    if snap is not None and "likes_summary" not in snap:
+        st.info("This snapshot was built without likes and saves.")
+        st.stop()
 
-    st.write(f"**Total liked posts:** {len(liked)}")
-    st.write(f"**Total saved posts:** {len(saved)}")
+    counts = src.get("likes_summary")
+    st.write(f"**Total liked posts:** {counts['liked']}")
+    st.write(f"**Total saved posts:** {counts['saved']}")
 
     st.markdown("---")
     st.markdown("### Top creators you like the most")
+    paged_table(src.get("top_liked"), key="top_liked", sort_by="likes", rank_by="likes", hide_index=True)
 
-    top_liked = likes_stats.liked_per_creator(liked)
+    st.markdown("---")
+    st.markdown("### Creators whose posts you save the most")
+    paged_table(src.get("top_saved"), key="top_saved", sort_by="saves", rank_by="saves", hide_index=True)
 
-    df_top_liked = pd.DataFrame(top_liked, columns=["creator", "likes"])
+    st.markdown("---")
+    st.markdown("### Likes and saves over time")
+    st.pyplot(plot_likes_saves_per_month(src.get("likes_per_month"), src.get("saves_per_month")))
 
-    # Make index start at 1
-    df_top_liked.index = df_top_liked.index + 1
+    st.markdown("### Time of day")
+    st.pyplot(plot_hour_of_day(src.get("likes_per_hour"), src.get("saves_per_hour")))
 
-    # Add gold/silver/bronze coloring
-    def highlight_top3(row):
-        idx = row.name
-        if idx == 1:
-            return ["font-weight: bold; color: gold"] * len(row)
-        if idx == 2:
-            return ["font-weight: bold; color: silver"] * len(row)
-        if idx == 3:
-            return ["font-weight: bold; color: #cd7f32"] * len(row)  # bronze
-        return [""] * len(row)
+    st.markdown("### Trend for your most-liked creators")
+    top_n_trend = st.slider("Creators", min_value=3, max_value=20, value=8)
+    trend = src.get("liked_creator_trend")
+    trend = trend.iloc[:, :top_n_trend]
+    fig_trend = plot_creator_trend(trend[trend.sum(axis=1) > 0])
+    if fig_trend:
+        st.pyplot(fig_trend)
 
-    st.dataframe(df_top_liked.style.apply(highlight_top3, axis=1))
 
-    st.markdown("---")
-    st.markdown("### Creators whose posts you save the most")
+# -------------------------------------------------------------
+# SECTION: ACTIVITY OVERVIEW
+# -------------------------------------------------------------
+elif section == "Activity overview":
+    st.subheader("Activity overview")
+
+    frames = activity.load_all(export_root)
+    overview = activity.summary(frames)
+    st.dataframe(overview, hide_index=True)
+
+    present = [n for n in frames if len(frames[n])]
+    if present:
+        chosen = st.multiselect(
+            "Tables to chart",
+            present,
+            default=present[:3],
+            format_func=lambda n: activity.REGISTRY[n]["label"],
+        )
+        if chosen:
+            series = {activity.REGISTRY[n]["label"]: likes_stats.per_month(frames[n]) for n in chosen}
+            st.pyplot(plot_monthly_series(series))
+
+        name = st.selectbox(
+            "Top values in",
+            present,
+            format_func=lambda n: activity.REGISTRY[n]["label"],
+        )
+        frame = frames[name]
+        cat_cols = [c for c in frame.columns if c in activity.CATEGORY_COLUMNS]
+        if cat_cols:
+            top = frame[cat_cols[0]].value_counts().rename_axis(cat_cols[0]).reset_index(name="count")
+            paged_table(top, key=f"activity_top_{name}", sort_by="count", rank_by="count", hide_index=True)
 
-    top_saved = likes_stats.saved_per_creator(saved)
 
-    df_top_saved = pd.DataFrame(top_saved, columns=["creator", "saves"])
-    df_top_saved.index = df_top_saved.index + 1
+# -------------------------------------------------------------
+# SECTION: MEDIA INVENTORY
+# -------------------------------------------------------------
+elif section == "Media inventory":
+    st.subheader("Media inventory")
+
+    refresh = st.button("Rescan media")
+    with st.spinner("Indexing and hashing media..."):
+        report = media_inventory.run_inventory(export_root, my_name, refresh=refresh)
+    files, refs, dups = report["files"], report["refs"], report["duplicates"]
+    dup_summary = media_inventory.duplicate_summary(dups)
 
-    # Reuse same styling
-    st.dataframe(df_top_saved.style.apply(highlight_top3, axis=1))
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Files in export", f"{len(files):,}")
+    with col2:
+        st.metric("Total size", f"{files['size'].sum() / 1e9:.2f} GB")
+    with col3:
+        st.metric("Referenced media missing", int(refs["size"].isna().sum()))
+    with col4:
+        st.metric("Reclaimable by dedup", f"{dup_summary['wasted_bytes'].sum() / 1e6:.1f} MB")
+
+    st.markdown("### Bytes by type")
+    st.dataframe(files.groupby("type", observed=True)["size"].agg(["count", "sum"]))
+
+    st.markdown("### Bytes sent vs received")
+    st.dataframe(media_inventory.bytes_per_direction(refs))
+
+    st.markdown("### Bytes per conversation")
+    paged_table(
+        media_inventory.bytes_per_conversation(refs).reset_index(),
+        key="media_bytes_per_conversation",
+        sort_by="bytes",
+        rank_by="bytes",
+        hide_index=True,
+    )
+
+    st.markdown("### Duplicate files")
+    paged_table(dup_summary.reset_index(), key="media_duplicates", sort_by="wasted_bytes", hide_index=True)
+
+
+# -------------------------------------------------------------
+# SECTION: CONVERSATION GALLERY
+# -------------------------------------------------------------
+elif section == "Conversation gallery":
+    st.subheader("Conversation gallery")
+
+    with st.spinner("Indexing media..."):
+        _, refs = media_inventory.get_inventory(export_root, my_name)
+    photos = refs[(refs["kind"] == "photos") & refs["size"].notna()]
+    if photos.empty:
+        st.info("No photos found in this export.")
+    else:
+        counts = photos["conversation"].value_counts()
+        counts = counts[counts > 0]
+        conv = st.selectbox(
+            "Conversation",
+            counts.index.astype(str),
+            format_func=lambda c: f"{c} ({counts[c]} photos)",
+        )
+        paths = photos.loc[photos["conversation"] == conv, "path"].tolist()
+
+        gc1, gc2 = st.columns(2)
+        with gc1:
+            per_page = st.selectbox("Photos per page", [24, 48, 96], index=0)
+        pages = max(1, -(-len(paths) // per_page))
+        with gc2:
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+        visible = paths[(page - 1) * per_page:page * per_page]
+
+        thumbs = thumbnails.get_thumbnails(visible)
+        cols = st.columns(6)
+        for i, (path, thumb) in enumerate(zip(visible, thumbs)):
+            with cols[i % 6]:
+                st.image(thumb or path, caption=os.path.basename(path), width="stretch")
+
+        n_files, n_bytes = thumbnails.cache_usage()
+        st.caption(
+            f"Thumbnail cache: {n_files:,} files, {n_bytes / 1e6:.1f} MB "
+            f"of {config.THUMBNAIL_CACHE_MAX_BYTES / 1e6:.0f} MB"
+        )
+
+
+# -------------------------------------------------------------
+# SIDEBAR: DIAGNOSTICS
+# -------------------------------------------------------------
+if show_diagnostics:
+    with st.sidebar.expander("Diagnostics", expanded=True):
+        st.caption(
+            "Timings recorded in this server process, most self time first. Wall time includes "
+            "nested spans; self time does not."
+        )
+        summary = instrument.summary()
+        summary["self_ms"] = (summary["self_s"] * 1000).round(2)
+        summary["wall_ms"] = (summary["wall_s"] * 1000).round(2)
+        summary["cpu_ms"] = (summary["cpu_s"] * 1000).round(2)
+        summary["rss_delta_mb"] = (summary["rss_delta"] / 1e6).round(2)
+        st.dataframe(
+            summary[["name", "calls", "self_ms", "wall_ms", "cpu_ms", "rows", "bytes_read", "rss_delta_mb"]],
+            hide_index=True,
+        )
+
+        st.download_button(
+            "Download Chrome trace",
+            data=json.dumps(instrument.chrome_trace()),
+            file_name="ig_stats_trace.json",
+            mime="application/json",
+        )
+        if st.button("Clear timings"):
+            instrument.reset()
+            st.rerun()
+
+        st.caption(
+            f"Shared cache: {shared_cache.memory_bytes() / 1e6:.1f} MB in memory "
+            f"of {config.SHARED_CACHE_MAX_BYTES / 1e6:.0f} MB."
+        )
+        cache_usage = shared_cache.usage()
+        cache_usage["memory_mb"] = (cache_usage["memory_bytes"] / 1e6).round(1)
+        cache_usage["disk_mb"] = (cache_usage["disk_bytes"] / 1e6).round(1)
+        st.dataframe(
+            cache_usage[["owner", "entries", "memory_mb", "disk_mb", "hits", "disk_hits", "misses", "evictions", "last_access"]],
+            hide_index=True,
+        )
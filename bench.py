@@ -0,0 +1,371 @@
+"""Benchmark suite for ingest, stats and plots.
+
+Generates (and reuses) a synthetic export via ``synth_export``, then times
+cold ingest, cached ingest (shared ingest job hit), every ``stats_core`` function and every plot.
+Each case reports best-of-N wall time, throughput and peak traced memory,
+and is compared against the baselines in ``bench_baselines.json``.
+
+    python bench.py                      # run the "small" scale, check baselines
+    python bench.py --scale medium
+    python bench.py --update             # store this run as the baseline
+    python bench.py --only stats_core    # substring filter on case names
+    python bench.py --trace trace.json   # also write a Chrome trace of one pass
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import instrument
+import synth_export
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINES_PATH = os.path.join(HERE, "bench_baselines.json")
+HISTORY_PATH = os.path.join(HERE, "bench_history.jsonl")
+
+SCALES = {
+    "small": {"conversations": 100, "messages": 300, "likes": 2000, "saves": 500},
+    "medium": {"conversations": 600, "messages": 800, "likes": 20000, "saves": 5000},
+    "large": {"conversations": 3000, "messages": 1500, "likes": 100000, "saves": 20000},
+}
+
+# A case regresses when it is slower / bigger than baseline by these factors.
+# Differences below the floors are treated as noise.
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+TIME_FLOOR_S = 0.002
+MEMORY_FLOOR_BYTES = 1 << 20
+
+
+def export_for_scale(scale, media_ratio=0.2, seed=0):
+    """Return the root of a cached synthetic export for ``scale``."""
+    params = dict(SCALES[scale], media_ratio=media_ratio, seed=seed)
+    key = "-".join(f"{k}{v}" for k, v in sorted(params.items()))
+    root = os.path.join(tempfile.gettempdir(), "ig_stats_bench", key)
+    marker = os.path.join(root, ".complete")
+    if not os.path.exists(marker):
+        synth_export.generate_export(root, **params)
+        open(marker, "w").close()
+    return root
+
+
+def _tree_bytes(path):
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
+
+
+def measure(fn, repeats):
+    """Run ``fn`` and return (best seconds, peak traced bytes, result)."""
+    best = None
+    result = None
+    for _ in range(repeats):
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def _naive_fix(value):
+    """The usual per-string mojibake post-fix, as the reference for ``export_json``."""
+    if isinstance(value, str):
+        try:
+            return value.encode("latin-1").decode("utf-8")
+        except UnicodeError:
+            return value
+    if isinstance(value, list):
+        return [_naive_fix(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _naive_fix(v) for k, v in value.items()}
+    return value
+
+
+def build_cases(root):
+    """Return a list of (name, fn, units, unit_name) benchmark cases."""
+    import activity
+    import config
+    import export_json
+    import identity
+    import ingest
+    import json_loader
+    import likes_stats
+    import engagement
+    import message_store
+    import participants
+    import similarity
+    import snapshot
+    import watcher
+    import plots
+    import stats_core
+    import text_store
+    import timeline_index
+    import trends
+
+    paths = config.resolve_paths(root)
+    inbox = paths["INBOX_DIR"]
+    inbox_bytes = _tree_bytes(inbox)
+
+    def cold_ingest():
+        my_name, _ = identity.detect_identity(inbox, paths["PERSONAL_INFO_JSON"])
+        return json_loader.build_dataframe_from_json(inbox, my_name)
+
+    # With the export already loaded, a request only looks up the finished
+    # shared job and hands out a view of its frame; no parsing or disk reads.
+    df, _ = ingest.get_job(root).wait()
+    n = len(df)
+
+    cases = [
+        ("ingest.cold", cold_ingest, inbox_bytes, "B"),
+        ("ingest.view_cached_frame", lambda: ingest.get_job(root).wait(), n, "msg"),
+    ]
+
+    # Parsing every message file: plain json (still mojibake), the repair at
+    # parse time, and the naive per-string fix after a plain parse.
+    raws = []
+    for _, file_paths in json_loader.list_message_files(inbox):
+        for file_path in file_paths:
+            with open(file_path, "rb") as f:
+                raws.append(f.read())
+    raw_bytes = sum(map(len, raws))
+    cases += [
+        ("export_json.plain_json_loads", lambda: [json.loads(raw) for raw in raws], raw_bytes, "B"),
+        ("export_json.loads", lambda: [export_json.loads(raw) for raw in raws], raw_bytes, "B"),
+        ("export_json.naive_postfix", lambda: [_naive_fix(json.loads(raw)) for raw in raws], raw_bytes, "B"),
+    ]
+
+    # A watcher refresh re-parses one changed conversation instead of the
+    # export; an idle poll is the steady-state cost of watching.
+    job = ingest.get_job(root)
+    changed = sorted(df["raw_folder"].unique())[:1]
+    export_watcher = watcher.ExportWatcher(root, interval=3600).start()
+    cases += [
+        ("watcher.refresh_one_conversation", lambda: job.refresh(changed), n, "msg"),
+        ("watcher.idle_poll", export_watcher.poll, inbox_bytes, "B"),
+    ]
+
+    # Re-merging a snapshot that is already in the store only scans the
+    # messages at each conversation's high-water mark.
+    store_dir = tempfile.mkdtemp(prefix="ig_stats_store_")
+    message_store.merge_export(store_dir, root)
+    cases.append(("store.merge_overlap", lambda: message_store.merge_export(store_dir, root), inbox_bytes, "B"))
+
+    liked = likes_stats.load_liked_posts(root)
+    saved = likes_stats.load_saved_posts(root)
+
+    def likes_cold():
+        activity.clear_cache()
+        return likes_stats.load_liked_posts(root), likes_stats.load_saved_posts(root)
+
+    def activity_cold():
+        activity.clear_cache()
+        return activity.load_all(root)
+
+    cases += [
+        ("likes.load_cold", likes_cold, len(liked) + len(saved), "item"),
+        ("likes.load_cached", lambda: (likes_stats.load_liked_posts(root),
+                                       likes_stats.load_saved_posts(root)),
+         len(liked) + len(saved), "item"),
+        ("likes.per_month", lambda: likes_stats.per_month(liked), len(liked), "item"),
+        ("likes.per_hour", lambda: likes_stats.per_hour(liked), len(liked), "item"),
+        ("likes.creator_trend", lambda: likes_stats.creator_trend(liked), len(liked), "item"),
+        ("activity.load_all_cold", activity_cold, 1, "export"),
+    ]
+
+    stats_fns = [
+        ("global_user_stats", stats_core.global_user_stats),
+        ("messages_per_month", stats_core.messages_per_month),
+        ("messages_per_day", stats_core.messages_per_day),
+        ("most_active_day", stats_core.most_active_day),
+        ("user_span", stats_core.user_span),
+        ("messages_per_user", stats_core.messages_per_user),
+        ("user_time_stats", stats_core.user_time_stats),
+        ("words_per_user", stats_core.words_per_user),
+        ("direction_word_stats", stats_core.direction_word_stats),
+        ("per_conversation_message_length_diff", stats_core.per_conversation_message_length_diff),
+        ("domination_stats", stats_core.domination_stats),
+        ("heatmap_data", stats_core.heatmap_data),
+        ("longest_conversations_by_messages", stats_core.longest_conversations_by_messages),
+        ("longest_conversations_by_duration", stats_core.longest_conversations_by_duration),
+        ("media_stats_overall", stats_core.media_stats_overall),
+        ("media_stats_per_conversation", stats_core.media_stats_per_conversation),
+        ("reel_spammer_stats", stats_core.reel_spammer_stats),
+        ("attachment_heavy_stats", stats_core.attachment_heavy_stats),
+    ]
+    for name, fn in stats_fns:
+        cases.append((f"stats_core.{name}", lambda fn=fn: fn(df), n, "msg"))
+
+    def participants_index():
+        participants._index_cache.clear()
+        return participants.build_index(df)
+
+    def timeline_build():
+        timeline_index._index_cache.clear()
+        return timeline_index.build_index(df)
+
+    day_index = timeline_index.build_index(df)
+    cases += [
+        ("timeline_index.build_index", timeline_build, n, "msg"),
+        ("timeline_index.best_windows_30d", lambda: timeline_index.best_windows(day_index, 30), n, "msg"),
+        ("timeline_index.rolling_counts_30d", lambda: timeline_index.rolling_counts(day_index, 30), n, "msg"),
+    ]
+
+    weekly = trends.detect(df)
+    cases += [
+        ("trends.detect_weekly", lambda: trends.detect(df), n, "msg"),
+        ("trends.top_anomalies", lambda: trends.top_anomalies(weekly), n, "msg"),
+        ("trends.change_points", lambda: trends.change_points(weekly), n, "msg"),
+    ]
+
+    cases += [
+        ("participants.build_index", participants_index, n, "msg"),
+        ("participants.top_interaction_pairs", lambda: participants.top_interaction_pairs(df), n, "msg"),
+        ("participants.contacts", lambda: participants.contacts(df), n, "msg"),
+        ("text_store.text_column", lambda: text_store.text_column(df), n, "msg"),
+        ("engagement.most_reacted_messages", lambda: engagement.most_reacted_messages(df), n, "msg"),
+        ("engagement.who_reacts_to_whom", lambda: engagement.who_reacts_to_whom(df), n, "msg"),
+        ("engagement.most_shared_creators", lambda: engagement.most_shared_creators(df), n, "msg"),
+        ("similarity.similar_conversations", lambda: similarity.similar_conversations(df), n, "msg"),
+        ("similarity.conversation_clusters", lambda: similarity.conversation_clusters(df), n, "msg"),
+    ]
+
+    # Opening a snapshot and decoding every table is what a snapshot-mode
+    # dashboard pays instead of ingest plus aggregates.
+    snap_path = os.path.join(tempfile.mkdtemp(prefix="ig_stats_snap_"), "bench.igsnap")
+    snapshot.build_snapshot(df, root, ingest.get_job(root).wait()[1], snap_path)
+
+    def snapshot_open_all():
+        snap = snapshot.Snapshot(snap_path)
+        return [snap.get(name) for name in snap.manifest["values"]]
+
+    cases += [
+        ("snapshot.build", lambda: snapshot.snapshot_bytes(df, root, "bench"), n, "msg"),
+        ("snapshot.open_all", snapshot_open_all, os.path.getsize(snap_path), "B"),
+    ]
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plot_inputs = [
+        ("plot_messages_per_month", plots.plot_messages_per_month, stats_core.messages_per_month(df), {}),
+        ("plot_top_users_by_messages", plots.plot_top_users_by_messages, stats_core.words_per_user(df), {"top_n": 20}),
+        ("plot_domination_balance", plots.plot_domination_balance, stats_core.domination_stats(df), {"top_n": 20}),
+        ("plot_heatmap", plots.plot_heatmap, stats_core.heatmap_data(df), {}),
+        ("plot_top_reel_spammers", plots.plot_top_reel_spammers, stats_core.reel_spammer_stats(df), {"top_n": 15}),
+        ("plot_attachment_share", plots.plot_attachment_share, stats_core.attachment_heavy_stats(df), {"top_n": 15}),
+        ("plot_likes_saves_per_month", plots.plot_likes_saves_per_month,
+         likes_stats.per_month(liked), {"saves": likes_stats.per_month(saved)}),
+        ("plot_hour_of_day", plots.plot_hour_of_day, likes_stats.per_hour(liked), {"saves": likes_stats.per_hour(saved)}),
+        ("plot_creator_trend", plots.plot_creator_trend, likes_stats.creator_trend(liked), {}),
+    ]
+    for name, fn, data, kwargs in plot_inputs:
+        def run(fn=fn, data=data, kwargs=kwargs):
+            fig = fn(data, **kwargs)
+            if fig is not None:
+                fig.canvas.draw()
+                plt.close(fig)
+        cases.append((f"plots.{name}", run, 1, "plot"))
+
+    return cases
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(baselines):
+    with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _fmt_rate(units, seconds, unit):
+    if seconds <= 0:
+        return "-"
+    rate = units / seconds
+    if unit == "B":
+        return f"{rate / 1e6:8.1f} MB/s"
+    return f"{rate:10.0f} {unit}/s"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--only", default="", help="run only cases whose name contains this")
+    ap.add_argument("--update", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--record", action="store_true", help="append results to bench_history.jsonl")
+    ap.add_argument("--trace", metavar="PATH", help="write a Chrome trace of one pass over the cases")
+    args = ap.parse_args(argv)
+
+    root = export_for_scale(args.scale)
+    cases = [c for c in build_cases(root) if args.only in c[0]]
+
+    baselines = load_baselines()
+    scale_base = baselines.get("bench", {}).get(args.scale, {})
+
+    results = {}
+    regressions = []
+    print(f"scale={args.scale} export={root}")
+    for name, fn, units, unit in cases:
+        seconds, peak, _ = measure(fn, args.repeats)
+        results[name] = {"seconds": seconds, "peak_bytes": peak}
+
+        status = ""
+        base = scale_base.get(name)
+        if base:
+            slow = seconds > max(base["seconds"] * TIME_TOLERANCE, base["seconds"] + TIME_FLOOR_S)
+            fat = peak > max(base["peak_bytes"] * MEMORY_TOLERANCE, base["peak_bytes"] + MEMORY_FLOOR_BYTES)
+            if slow or fat:
+                regressions.append(name)
+                status = "REGRESSION" + (" time" if slow else "") + (" memory" if fat else "")
+            else:
+                status = f"x{seconds / base['seconds']:.2f}"
+        print(
+            f"{name:52s} {seconds * 1000:9.2f} ms  {_fmt_rate(units, seconds, unit):>16s}"
+            f"  peak {peak / 1e6:8.2f} MB  {status}"
+        )
+
+    if args.trace:
+        instrument.reset()
+        for name, fn, _, _ in cases:
+            with instrument.span(f"bench.{name}"):
+                fn()
+        instrument.write_chrome_trace(args.trace)
+        print(f"trace written to {args.trace}")
+
+    if args.record:
+        with open(HISTORY_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": time.time(), "kind": "bench", "scale": args.scale, "results": results}) + "\n")
+
+    if args.update:
+        baselines.setdefault("bench", {}).setdefault(args.scale, {}).update(results)
+        save_baselines(baselines)
+        print(f"baselines written to {BASELINES_PATH}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
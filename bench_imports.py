@@ -0,0 +1,124 @@
+"""Import-time budget check.
+
+Runs each module in a fresh interpreter under ``-X importtime`` and compares
+the cumulative import time against the budgets in ``bench_baselines.json``.
+
+    python bench_imports.py                # check against budgets
+    python bench_imports.py --record       # also append to bench_history.jsonl
+    python bench_imports.py --update       # rewrite budgets from this run
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINES_PATH = os.path.join(HERE, "bench_baselines.json")
+HISTORY_PATH = os.path.join(HERE, "bench_history.jsonl")
+
+# Modules imported by app.py before the first render.
+MODULES = [
+    "config",
+    "identity",
+    "json_loader",
+    "profile_loader",
+    "likes_stats",
+    "stats_core",
+    "plots",
+]
+
+# Budget = measured * HEADROOM + SLACK_US when --update is used. The slack
+# absorbs millisecond jitter; the budgets exist to catch heavy libraries
+# (pandas, matplotlib, bs4) creeping back into module scope.
+HEADROOM = 1.5
+SLACK_US = 25_000
+REPEATS = 5
+
+
+def measure_import_us(modules):
+    """Best-of-N cumulative import time of ``modules`` in microseconds.
+
+    All modules are imported in one fresh interpreter; only top-level entries
+    of the ``-X importtime`` report are summed, so shared dependencies are
+    counted once. An empty list measures interpreter startup imports.
+    """
+    stmt = "import " + ", ".join(modules) if modules else "pass"
+    best = None
+    for _ in range(REPEATS):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", stmt],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"{stmt} failed:\n{proc.stderr}")
+
+        total = 0
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            parts = line[len("import time:"):].split("|")
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2][1:]
+            if name and not name.startswith(" "):
+                total += int(parts[1])
+        best = total if best is None else min(best, total)
+    return best
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(baselines):
+    with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--record", action="store_true", help="append results to bench_history.jsonl")
+    ap.add_argument("--update", action="store_true", help="rewrite the import budgets")
+    args = ap.parse_args(argv)
+
+    startup = measure_import_us([])
+    results = {m: max(0, measure_import_us([m]) - startup) for m in MODULES}
+    results["app_total"] = max(0, measure_import_us(MODULES) - startup)
+
+    baselines = load_baselines()
+    budgets = baselines.get("import_us", {})
+
+    failed = []
+    for name, us in results.items():
+        budget = budgets.get(name)
+        status = ""
+        if budget is not None:
+            status = "ok" if us <= budget else "OVER BUDGET"
+            if us > budget:
+                failed.append(name)
+        budget_ms = f"{budget / 1000:9.1f} ms" if budget is not None else "        -   "
+        print(f"{name:16s} {us / 1000:9.1f} ms   budget {budget_ms}  {status}")
+
+    if args.record:
+        with open(HISTORY_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": time.time(), "kind": "import_us", "results": results}) + "\n")
+
+    if args.update:
+        baselines["import_us"] = {k: int(v * HEADROOM) + SLACK_US for k, v in results.items()}
+        save_baselines(baselines)
+        print(f"budgets written to {BASELINES_PATH}")
+        return 0
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
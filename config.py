@@ -9,6 +9,30 @@ SPECIAL_MAP = {
 
 AUTO_LOCAL_TIME = True
 
+# Persistent caches (media hashes, thumbnails, ...) live under here.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ig_stats")
+
+MEDIA_HASH_WORKERS = 8
+
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+THUMBNAIL_WORKERS = 4
+
+# Loaded exports and tables shared by all sessions; least recently used
+# entries beyond this are spilled to CACHE_DIR/shared (see shared_cache.py).
+SHARED_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Successive exports are merged into this store (see message_store.py).
+MESSAGE_STORE_DIR = os.path.join(CACHE_DIR, "message_store")
+
+# Read-ahead for the JSON parsers (see readahead.py): reader threads, files
+# read or waiting to be parsed, and bytes held in memory at once.
+READAHEAD_WORKERS = 4
+READAHEAD_DEPTH = 64
+READAHEAD_MAX_BYTES = 256 * 1024 * 1024
+
+# How often the export watcher polls for changed files (see watcher.py).
+WATCH_INTERVAL_S = 1.0
+
 DIV_SELECTOR = "div.pam._3-95._2ph-._a6-g.uiBoxWhite.noborder"
 
 
@@ -0,0 +1,135 @@
+"""Reactions and shared-content analytics.
+
+At ingest each message keeps its raw ``reactions`` list only until the frame
+is built; ``split_reactions`` then explodes them into a compact side table
+(one row per reaction: message row, reactor, emoji, the latter two as
+categoricals) and replaces the column with a ``reaction_count``. Shared
+posts keep the original owner in ``share_owner``, also categorical, so
+"most shared creators" is a ``value_counts`` over integer codes.
+
+The side table is attached to the frame object it was split from (views
+handed out by ``shared_cache`` resolve to that frame), so the analytics
+below are plain groupbys and never go back to the JSON.
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+import shared_cache
+import text_store
+from instrument import traced
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _forget(key):
+    with _tables_lock:
+        _tables.pop(key, None)
+
+
+def split_reactions(df: pd.DataFrame):
+    """Move ``df["reactions"]`` into a side table and add ``reaction_count`` (in place)."""
+    import numpy as np
+    import pandas as pd
+
+    raw = df.pop("reactions") if "reactions" in df.columns else pd.Series([None] * len(df), dtype=object)
+    positions = np.flatnonzero(raw.notna().to_numpy())
+
+    message, reactor, emoji = [], [], []
+    counts = np.zeros(len(df), dtype="int16")
+    for pos, pairs in zip(positions, raw.to_numpy()[positions]):
+        counts[pos] = len(pairs)
+        for actor, reaction in pairs:
+            message.append(pos)
+            reactor.append(actor)
+            emoji.append(reaction)
+
+    df["reaction_count"] = counts
+    table = pd.DataFrame({
+        "message": np.asarray(message, dtype="int64"),
+        "reactor": pd.Categorical(reactor),
+        "emoji": pd.Categorical(emoji),
+    })
+    return attach(df, table)
+
+
+def attach(df: pd.DataFrame, table):
+    """Register ``table`` as the reactions side table of ``df``."""
+    key = id(df)
+    with _tables_lock:
+        _tables[key] = (weakref.ref(df, lambda _, key=key: _forget(key)), table)
+    return table
+
+
+def reactions_table(df: pd.DataFrame):
+    """The side table split from ``df`` (empty if ``df`` was not split)."""
+    import pandas as pd
+
+    df = shared_cache.origin(df)
+    with _tables_lock:
+        hit = _tables.get(id(df))
+    if hit is not None and hit[0]() is df:
+        return hit[1]
+    return pd.DataFrame({
+        "message": pd.Series(dtype="int64"),
+        "reactor": pd.Categorical([]),
+        "emoji": pd.Categorical([]),
+    })
+
+
+@traced
+def most_reacted_messages(df: pd.DataFrame, top_n=50):
+    if "reaction_count" not in df.columns:
+        return df.iloc[:0]
+    counts = df["reaction_count"]
+    top = counts[counts > 0].nlargest(top_n).index
+    out = df.loc[top, ["conversation", "sender", "timestamp", "reaction_count"]]
+    out.insert(3, "text", text_store.text_column(df, top))
+    return out.reset_index(drop=True)
+
+
+@traced
+def who_reacts_to_whom(df: pd.DataFrame, top_n=50):
+    """(reactor, author) pairs by number of reactions, with the favourite emoji."""
+    import pandas as pd
+
+    table = reactions_table(df)
+    if table.empty:
+        return pd.DataFrame(columns=["reactor", "author", "reactions", "top_emoji"])
+    pairs = pd.DataFrame({
+        "reactor": table["reactor"].astype(str).to_numpy(),
+        "author": df["sender"].to_numpy()[table["message"].to_numpy()],
+        "emoji": table["emoji"].astype(str).to_numpy(),
+    })
+    by_emoji = pairs.groupby(["reactor", "author", "emoji"], sort=False).size().rename("n").reset_index()
+    top = by_emoji.sort_values("n", ascending=False, kind="stable").drop_duplicates(["reactor", "author"])
+    out = by_emoji.groupby(["reactor", "author"], sort=False)["n"].sum().rename("reactions").reset_index()
+    out = out.merge(top[["reactor", "author", "emoji"]].rename(columns={"emoji": "top_emoji"}), on=["reactor", "author"])
+    return out.sort_values("reactions", ascending=False, ignore_index=True).head(top_n)
+
+
+@traced
+def reactions_by_emoji(df: pd.DataFrame):
+    table = reactions_table(df)
+    return table["emoji"].value_counts().rename("reactions").rename_axis("emoji").reset_index()
+
+
+@traced
+def most_shared_creators(df: pd.DataFrame, top_n=50):
+    """Owners of shared posts, split into shares sent by me and received."""
+    import pandas as pd
+
+    if "share_owner" not in df.columns:
+        return pd.DataFrame(columns=["creator", "sent", "received", "total"])
+    shared = df.loc[df["share_owner"].notna(), ["share_owner", "direction"]]
+    out = pd.crosstab(shared["share_owner"], shared["direction"]).reindex(columns=["me", "them"], fill_value=0)
+    out.columns = ["sent", "received"]
+    out["total"] = out["sent"] + out["received"]
+    out = out.sort_values("total", ascending=False).head(top_n)
+    return out.rename_axis("creator").reset_index()
@@ -0,0 +1,143 @@
+"""JSON decoding for export files, with Instagram's mojibake repaired.
+
+Instagram writes text as UTF-8 bytes read back as Latin-1 and escaped, so
+"é" arrives as ``"\\u00c3\\u00a9"`` and parses to ``"Ã©"``. The usual fix is
+``s.encode("latin-1").decode("utf-8")`` on every string after parsing,
+which is a Python call per string for every message, name and title.
+
+``loads`` repairs the raw bytes before parsing instead, in one vectorized
+pass over the escapes: each run of ``\\u0080`` .. ``\\u00ff`` escapes that
+spells a valid UTF-8 sequence is rewritten as the escape of the character
+it encodes (a surrogate pair above U+FFFF), so ``"\\u00c3\\u00a9"`` becomes
+``"\\u00e9"``. The document stays ASCII and shrinks, and ``json.loads``
+decodes the escapes in C as it parses. Escapes that are not part of a valid
+sequence (a genuine ``\\u00e9``) are left alone, as are escaped backslashes.
+"""
+import json
+
+_HEX = None
+_DIGITS = None
+
+
+def _tables():
+    global _HEX, _DIGITS
+    if _HEX is None:
+        import numpy as np
+
+        table = np.full(256, -1, dtype="int32")
+        for i, c in enumerate(b"0123456789abcdef"):
+            table[c] = i
+        for i, c in enumerate(b"ABCDEF"):
+            table[c] = 10 + i
+        _HEX = table
+        _DIGITS = np.frombuffer(b"0123456789abcdef", dtype="uint8")
+    return _HEX, _DIGITS
+
+
+def _escapes(a, raw):
+    """Positions and byte values of the ``\\u0080`` .. ``\\u00ff`` escapes in ``a``."""
+    import numpy as np
+
+    hex_, _ = _tables()
+    p = np.flatnonzero(a[:-5] == 0x5C)
+    if len(p) and b"\\\\" in raw:
+        # Only a backslash at an even position in its run starts an escape.
+        run = np.ones(len(p), dtype=bool)
+        run[1:] = np.diff(p) != 1
+        starts = np.flatnonzero(run)
+        first = np.repeat(starts, np.diff(np.append(starts, len(p))))
+        p = p[(np.arange(len(p)) - first) % 2 == 0]
+    p = p[(a[p + 1] == 0x75) & (a[p + 2] == 0x30) & (a[p + 3] == 0x30)]
+    hi, lo = hex_[a[p + 4]], hex_[a[p + 5]]
+    hit = (hi >= 8) & (lo >= 0)
+    return p[hit], hi[hit] * 16 + lo[hit]
+
+
+def _repaired(raw):
+    """uint8 array of the repaired ``raw``, or None if there is nothing to repair."""
+    if b"\\u00" not in raw:
+        return None
+    import numpy as np
+
+    a = np.frombuffer(raw, dtype="uint8")
+    p, v = _escapes(a, raw)
+    m = len(p)
+    if m < 2:
+        return None
+
+    # Byte k escapes ahead, or -1 when the run of adjacent escapes ends first.
+    adjacent = np.zeros(m + 3, dtype=bool)
+    adjacent[:m - 1] = p[1:] == p[:-1] + 6
+    padded = np.concatenate([v, np.full(3, -1, dtype=v.dtype)])
+    ahead = []
+    joined = np.ones(m, dtype=bool)
+    for k in range(1, 4):
+        joined = joined & adjacent[k - 1:m + k - 1]
+        ahead.append(np.where(joined, padded[k:m + k], -1))
+    v1, v2, v3 = ahead
+    c1, c2, c3 = ((x >= 0x80) & (x <= 0xBF) for x in ahead)
+
+    two = (v >= 0xC2) & (v <= 0xDF) & c1
+    three = ((v >= 0xE0) & (v <= 0xEF) & c1 & c2
+             & ~((v == 0xE0) & (v1 < 0xA0)) & ~((v == 0xED) & (v1 >= 0xA0)))
+    four = ((v >= 0xF0) & (v <= 0xF4) & c1 & c2 & c3
+            & ~((v == 0xF0) & (v1 < 0x90)) & ~((v == 0xF4) & (v1 >= 0x90)))
+    if not (two.any() or three.any() or four.any()):
+        return None
+
+    # Code unit each kept escape ends up holding; the rest of a sequence is dropped.
+    unit = v.copy()
+    drop = np.zeros(m + 3, dtype=bool)
+    i = np.flatnonzero(two)
+    unit[i] = (v[i] & 0x1F) << 6 | (v1[i] & 0x3F)
+    drop[i + 1] = True
+    i = np.flatnonzero(three)
+    unit[i] = (v[i] & 0x0F) << 12 | (v1[i] & 0x3F) << 6 | (v2[i] & 0x3F)
+    drop[i + 1] = drop[i + 2] = True
+    i = np.flatnonzero(four)
+    cp = ((v[i] & 0x07) << 18 | (v1[i] & 0x3F) << 12 | (v2[i] & 0x3F) << 6 | (v3[i] & 0x3F)) - 0x10000
+    unit[i] = 0xD800 | cp >> 10
+    unit[i + 1] = 0xDC00 | cp & 0x3FF
+    drop[i + 2] = drop[i + 3] = True
+    drop = drop[:m]
+
+    _, digits = _tables()
+    out = a.copy()
+    kept, unit = p[~drop], unit[~drop]
+    for k in range(4):
+        out[kept + 2 + k] = digits[unit >> (12 - 4 * k) & 0xF]
+    keep = np.ones(len(a), dtype=bool)
+    gone = p[drop]
+    for k in range(6):
+        keep[gone + k] = False
+    return out[keep]
+
+
+def repair(raw: bytes) -> bytes:
+    """``raw`` with its mojibake escapes rewritten (see module docstring)."""
+    out = _repaired(raw)
+    return raw if out is None else out.tobytes()
+
+
+def loads(raw: bytes):
+    """Parse export JSON ``raw`` with the mojibake repaired."""
+    out = _repaired(raw)
+    if out is None:
+        return json.loads(raw)
+    text = str(out, "utf-8-sig", "surrogatepass")
+    del out
+    return json.loads(text)
+
+
+def repair_strings(values):
+    """``values`` (strings, None and nested lists) as ``loads`` would have parsed them.
+
+    For text that was parsed without the repair: the whole list is escaped
+    back to JSON once and repaired in one ``loads`` call.
+    """
+    return loads(json.dumps(list(values)).encode("ascii"))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
@@ -1,5 +1,7 @@
 import os
-import json
+import export_json
+import instrument
+import readahead
 
 
 def _name_from_personal_info(personal_info_json):
@@ -7,8 +9,7 @@ def _name_from_personal_info(personal_info_json):
         return None, None
 
     try:
-        with open(personal_info_json, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = export_json.load(personal_info_json)
     except Exception:
         return None, None
 
@@ -31,30 +32,32 @@ def _name_from_personal_info(personal_info_json):
 
 
 def _name_from_participants(inbox_dir):
-    counts = {}
-
+    # Top-level JSON files of every conversation folder, read ahead.
+    paths = []
     for entry in os.scandir(inbox_dir):
         if not entry.is_dir():
             continue
 
         for root, dirs, files in os.walk(entry.path):
             for name in files:
-                if not name.lower().endswith(".json"):
-                    continue
-                fp = os.path.join(root, name)
-                try:
-                    with open(fp, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                except Exception:
-                    continue
-
-                for p in data.get("participants", []):
-                    pname = p.get("name")
-                    if not pname:
-                        continue
-                    counts[pname] = counts.get(pname, 0) + 1
+                if name.lower().endswith(".json"):
+                    paths.append(os.path.join(root, name))
             break
 
+    counts = {}
+    with readahead.ReadAhead(paths, skip_errors=True, name="identity.readahead") as reader:
+        for _, raw in reader:
+            try:
+                data = export_json.loads(raw)
+            except Exception:
+                continue
+
+            for p in data.get("participants", []):
+                pname = p.get("name")
+                if not pname:
+                    continue
+                counts[pname] = counts.get(pname, 0) + 1
+
     if not counts:
         return None
 
@@ -62,10 +65,12 @@ def _name_from_participants(inbox_dir):
 
 
 def detect_identity(inbox_dir, personal_info_json):
-    name, username = _name_from_personal_info(personal_info_json)
+    with instrument.span("identity.personal_info"):
+        name, username = _name_from_personal_info(personal_info_json)
 
     if not name:
-        name = _name_from_participants(inbox_dir)
+        with instrument.span("identity.participants_scan"):
+            name = _name_from_participants(inbox_dir)
 
     if not name:
         name = "Me"
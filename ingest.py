@@ -0,0 +1,356 @@
+"""Background ingestion of an export with progress and partial results.
+
+``get_job(export_root)`` returns the process-wide ingest job for an export,
+starting it on first use, so every Streamlit session asking for the same
+export shares one in-flight load and its finished frame. The job parses one
+conversation at a time and, after each, publishes progress (files, bytes,
+messages per second) plus running totals that are enough to draw provisional
+"My stats" numbers and the monthly timeline before the full frame exists.
+
+A thread is used rather than a process so the finished frame is handed to
+the app without pickling a copy. The finished frame lives in
+``shared_cache`` (bounded, may be spilled to disk), and ``wait`` hands out a
+copy-on-write view of it.
+
+Message text goes to a per-job ``TextStore`` under ``CACHE_DIR/text`` rather
+than into the frame. When the job is forgotten the store is retired (its files
+go once the last frame using it is collected); the process removes the rest
+at exit.
+
+``refresh`` re-parses only the given conversations and swaps the new frame
+into the cache (see ``watcher``); ``version`` counts those swaps.
+"""
+import atexit
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+
+import config
+import engagement
+import identity
+import instrument
+import json_loader
+import readahead
+import shared_cache
+import text_store
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_text_ids = itertools.count()
+
+
+def _text_path(export_root):
+    digest = hashlib.blake2b(export_root.encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(config.CACHE_DIR, "text", f"{digest}-{os.getpid()}-{next(_text_ids)}")
+
+
+class IngestJob:
+    def __init__(self, export_root):
+        self.export_root = os.path.abspath(export_root)
+        self.cache_key = ("export", self.export_root)
+        self.status = "pending"
+        self.error = None
+        self.version = 0
+        self.texts = text_store.TextStore(_text_path(self.export_root), truncate=True)
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._done = threading.Event()
+        self._started = None
+        self._finished = None
+        self._reader = None
+        self._progress = {
+            "conversations_done": 0,
+            "conversations_total": 0,
+            "files_done": 0,
+            "files_total": 0,
+            "bytes_done": 0,
+            "bytes_total": 0,
+            "messages": 0,
+        }
+        self._partial = {
+            "my_name": None,
+            "my_messages": 0,
+            "their_messages": 0,
+            "my_reels": 0,
+            "their_reels": 0,
+            "my_images": 0,
+            "their_images": 0,
+            "first_message": None,
+            "last_message": None,
+            "per_conversation": Counter(),
+            "per_month": Counter(),
+        }
+        self._thread = threading.Thread(
+            target=self._run, name=f"ingest:{self.export_root}", daemon=True
+        )
+
+    def start(self):
+        self._started = time.perf_counter()
+        self.status = "running"
+        self._thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the load finishes and return ``(df view, my_name)``.
+
+        Returns None if ``timeout`` expires first.
+        """
+        if not self._done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        result = shared_cache.get(self.cache_key)
+        if result is None:
+            # Dropped from the shared cache (e.g. its spill file was removed).
+            shared_cache.record_miss(self.export_root)
+            result = self._store(self._ingest())
+        df, my_name = result
+        return shared_cache.view(df), my_name
+
+    def _store(self, result):
+        return shared_cache.put(
+            self.cache_key, result, owner=self.export_root,
+            dump=_dump_result, load=_load_result,
+        )
+
+    def refresh(self, raw_convs):
+        """Re-parse the conversations ``raw_convs`` and update the cached frame.
+
+        Conversations whose folder is gone are dropped. Sessions get the new
+        frame on their next ``wait``. Returns the number of re-parsed messages.
+
+        Unchanged messages keep their text ids; only new or edited text is
+        appended to the job's store. Text of edited or deleted messages is not
+        reclaimed (older frames may still read it) until the job is forgotten.
+        """
+        raw_convs = set(raw_convs)
+        self._done.wait()
+        with self._refresh_lock, instrument.span("ingest.refresh", export_root=self.export_root) as sp:
+            result = shared_cache.get(self.cache_key)
+            if result is None:
+                shared_cache.record_miss(self.export_root)
+                result = self._ingest()
+            df, my_name = result
+
+            inbox_dir = config.resolve_paths(self.export_root)["INBOX_DIR"]
+            stats = json_loader.new_stage_stats()
+            rows = []
+            for raw_conv in sorted(raw_convs):
+                for file_path in json_loader.conversation_files(os.path.join(inbox_dir, raw_conv)):
+                    rows.extend(json_loader.parse_message_file(raw_conv, file_path, my_name, stats))
+            json_loader.record_stage_stats(stats)
+
+            part = json_loader.rows_to_dataframe(rows, self.texts, previous=df)
+            self._store((json_loader.splice_conversations(df, part, raw_convs), my_name))
+            sp["rows"] = len(rows)
+            sp["bytes_read"] = stats["bytes"]
+            with self._lock:
+                self.version += 1
+        return len(rows)
+
+    def _run(self):
+        try:
+            with instrument.span("ingest.job", export_root=self.export_root):
+                self._store(self._ingest())
+            self.status = "done"
+        except Exception as exc:
+            self.error = exc
+            self.status = "error"
+        finally:
+            self._finished = time.perf_counter()
+            self._done.set()
+
+    def _ingest(self):
+        paths = config.resolve_paths(self.export_root)
+        inbox_dir = paths["INBOX_DIR"]
+
+        my_name, _ = identity.detect_identity(inbox_dir, paths["PERSONAL_INFO_JSON"])
+        with self._lock:
+            self._partial["my_name"] = my_name
+
+        with instrument.span("json_loader.walk") as sp:
+            convs = json_loader.list_message_files(inbox_dir)
+            sizes = {p: os.path.getsize(p) for _, ps in convs for p in ps}
+            sp["rows"] = len(sizes)
+        with self._lock:
+            self._progress["conversations_total"] = len(convs)
+            self._progress["files_total"] = len(sizes)
+            self._progress["bytes_total"] = sum(sizes.values())
+
+        stats = json_loader.new_stage_stats()
+        rows = []
+        reader = readahead.ReadAhead(list(sizes), sizes=sizes, name="ingest.readahead")
+        with self._lock:
+            self._reader = reader
+        with reader:
+            blobs = iter(reader)
+            for raw_conv, file_paths in convs:
+                conv_rows = []
+                for file_path in file_paths:
+                    _, raw = next(blobs)
+                    conv_rows.extend(json_loader.parse_message_file(raw_conv, file_path, my_name, stats, raw=raw))
+                self._publish(conv_rows, file_paths, sizes)
+                rows.extend(conv_rows)
+        json_loader.record_stage_stats(stats)
+
+        return json_loader.rows_to_dataframe(rows, self.texts), my_name
+
+    def _publish(self, conv_rows, file_paths, sizes):
+        me = [r for r in conv_rows if r["direction"] == "me"]
+        them = len(conv_rows) - len(me)
+        my_reels = sum(r["has_reel"] for r in me)
+        my_images = sum(r["has_image"] for r in me)
+        all_reels = sum(r["has_reel"] for r in conv_rows)
+        all_images = sum(r["has_image"] for r in conv_rows)
+        months = Counter((r["timestamp"].year, r["timestamp"].month) for r in conv_rows)
+        stamps = [r["timestamp"] for r in conv_rows]
+
+        with self._lock:
+            pr = self._progress
+            pr["conversations_done"] += 1
+            pr["files_done"] += len(file_paths)
+            pr["bytes_done"] += sum(sizes[p] for p in file_paths)
+            pr["messages"] += len(conv_rows)
+
+            pa = self._partial
+            pa["my_messages"] += len(me)
+            pa["their_messages"] += them
+            pa["my_reels"] += my_reels
+            pa["their_reels"] += all_reels - my_reels
+            pa["my_images"] += my_images
+            pa["their_images"] += all_images - my_images
+            if stamps:
+                lo, hi = min(stamps), max(stamps)
+                if pa["first_message"] is None or lo < pa["first_message"]:
+                    pa["first_message"] = lo
+                if pa["last_message"] is None or hi > pa["last_message"]:
+                    pa["last_message"] = hi
+                pa["per_conversation"][conv_rows[0]["conversation"]] += len(conv_rows)
+            pa["per_month"].update(months)
+
+    @property
+    def my_name(self):
+        with self._lock:
+            return self._partial["my_name"]
+
+    def progress(self):
+        """Copy of the progress counters plus elapsed time and rates."""
+        with self._lock:
+            pr = dict(self._progress)
+        end = self._finished or time.perf_counter()
+        elapsed = end - self._started if self._started else 0.0
+        pr["status"] = self.status
+        pr["elapsed_s"] = elapsed
+        pr["messages_per_s"] = pr["messages"] / elapsed if elapsed > 0 else 0.0
+        pr["bytes_per_s"] = pr["bytes_done"] / elapsed if elapsed > 0 else 0.0
+        pr["fraction"] = pr["bytes_done"] / pr["bytes_total"] if pr["bytes_total"] else 0.0
+        with self._lock:
+            reader = self._reader
+        read = reader.progress() if reader is not None else {}
+        pr["read_bytes_per_s"] = read.get("bytes_per_s", 0.0)
+        pr["read_stall_s"] = read.get("stall_s", 0.0)
+        pr["read_throttle_s"] = read.get("throttle_s", 0.0)
+        return pr
+
+    def partial_user_stats(self):
+        """Provisional counterpart of ``stats_core.global_user_stats``."""
+        with self._lock:
+            pa = dict(self._partial)
+            per_conv = pa["per_conversation"].most_common(1)
+            conv_count = len(pa["per_conversation"])
+
+        total = pa["my_messages"] + pa["their_messages"]
+        first, last = pa["first_message"], pa["last_message"]
+        active_days = (last - first).days + 1 if first is not None else None
+        return {
+            "total_messages": total,
+            "my_messages": pa["my_messages"],
+            "their_messages": pa["their_messages"],
+            "my_share": pa["my_messages"] / total if total else 0,
+            "conversations": conv_count,
+            "first_message": first,
+            "last_message": last,
+            "active_days": active_days,
+            "messages_per_day": total / active_days if active_days else None,
+            "top_contact": per_conv[0][0] if per_conv else None,
+            "top_contact_count": per_conv[0][1] if per_conv else 0,
+            "my_reels": pa["my_reels"],
+            "their_reels": pa["their_reels"],
+            "my_images": pa["my_images"],
+            "their_images": pa["their_images"],
+        }
+
+    def partial_messages_per_month(self):
+        """Provisional counterpart of ``stats_core.messages_per_month``."""
+        import pandas as pd
+
+        with self._lock:
+            months = dict(self._partial["per_month"])
+        if not months:
+            return pd.Series(dtype="int64")
+        index = pd.PeriodIndex([pd.Period(year=y, month=m, freq="M") for y, m in months], name="month")
+        return pd.Series(list(months.values()), index=index).sort_index()
+
+
+def _dump_result(result, path):
+    import pickle
+
+    df, my_name = result
+    with open(path, "wb") as f:
+        pickle.dump((df, my_name, engagement.reactions_table(df), text_store.store_for(df)), f, protocol=5)
+
+
+def _load_result(path):
+    import pickle
+
+    with open(path, "rb") as f:
+        df, my_name, reactions, texts = pickle.load(f)
+    engagement.attach(df, reactions)
+    if texts is not None:
+        text_store.attach(df, texts)
+    return df, my_name
+
+
+def get_job(export_root):
+    """Return the shared job for ``export_root``, starting one if needed.
+
+    A job that failed stays in place (so callers can report its error) until
+    ``forget`` drops it; the next request after that retries the load.
+    """
+    root = os.path.abspath(export_root)
+    with _jobs_lock:
+        job = _jobs.get(root)
+        if job is None:
+            job = IngestJob(root).start()
+            _jobs[root] = job
+        return job
+
+
+def forget(export_root):
+    """Drop the job and cached frame for ``export_root`` so the next request reloads it."""
+    root = os.path.abspath(export_root)
+    with _jobs_lock:
+        job = _jobs.pop(root, None)
+    shared_cache.discard(("export", root))
+    if job is not None:
+        text_store.retire(job.texts)
+
+
+def jobs():
+    with _jobs_lock:
+        return dict(_jobs)
+
+
+@atexit.register
+def _remove_text_stores():
+    for job in jobs().values():
+        job.texts.remove()
+    text_store.remove_retired()
@@ -0,0 +1,198 @@
+"""Lightweight named-span instrumentation.
+
+Wrap a pipeline stage in ``with span("name") as sp:`` and optionally set
+``sp["rows"]`` / ``sp["bytes_read"]``. Each finished span records wall time,
+CPU time, bytes read, rows and the RSS delta (None where the current RSS
+cannot be read). Hot loops that cannot afford a
+span per item use ``add_stage`` to fold their time into one aggregate span.
+
+Finished spans are kept in a bounded in-process buffer and can be shown as a
+summary table or written as a Chrome trace (``chrome://tracing``, Perfetto).
+Spans nest: the summary's ``self_s`` is each name's wall time minus that of
+the spans directly inside it on the same thread, so unlike ``wall_s`` it
+adds up across rows.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MAX_SPANS = 20000
+
+_lock = threading.Lock()
+_spans = deque(maxlen=MAX_SPANS)
+_epoch_ns = time.perf_counter_ns()
+_pid = os.getpid()
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def rss_bytes():
+    """Current resident set size, or None where it cannot be read.
+
+    There is deliberately no fallback to ``getrusage``: ``ru_maxrss`` is the
+    peak, and a difference of peaks is not the memory a span allocated.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _record(rec):
+    with _lock:
+        _spans.append(rec)
+
+
+@contextmanager
+def span(name, **args):
+    rec = {
+        "name": name,
+        "tid": threading.get_ident(),
+        "rows": None,
+        "bytes_read": None,
+        "args": args,
+    }
+    rss0 = rss_bytes()
+    cpu0 = time.thread_time_ns()
+    t0 = time.perf_counter_ns()
+    try:
+        yield rec
+    finally:
+        t1 = time.perf_counter_ns()
+        rec["start_us"] = (t0 - _epoch_ns) / 1000
+        rec["wall_s"] = (t1 - t0) / 1e9
+        rec["cpu_s"] = (time.thread_time_ns() - cpu0) / 1e9
+        rss1 = rss_bytes()
+        rec["rss_delta"] = None if rss0 is None or rss1 is None else rss1 - rss0
+        _record(rec)
+
+
+def add_stage(name, wall_s, cpu_s=None, rows=None, bytes_read=None, start_us=None):
+    """Record an aggregate span whose time was measured by the caller."""
+    if start_us is None:
+        start_us = (time.perf_counter_ns() - _epoch_ns) / 1000 - wall_s * 1e6
+    _record({
+        "name": name,
+        "tid": threading.get_ident(),
+        "rows": rows,
+        "bytes_read": bytes_read,
+        "args": {"aggregate": True},
+        "start_us": start_us,
+        "wall_s": wall_s,
+        "cpu_s": cpu_s,
+        "rss_delta": None,
+    })
+
+
+def traced(fn=None, *, name=None):
+    """Decorator: run the function inside a span, counting ``len`` of arg 0."""
+    if fn is None:
+        return functools.partial(traced, name=name)
+    span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*a, **kw):
+        with span(span_name) as sp:
+            if a and hasattr(a[0], "__len__"):
+                sp["rows"] = len(a[0])
+            return fn(*a, **kw)
+
+    return wrapper
+
+
+def collect():
+    with _lock:
+        return list(_spans)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+
+
+def _self_times(spans):
+    """Each span's wall time minus that of the spans directly inside it."""
+    self_s = [s["wall_s"] for s in spans]
+    by_tid = {}
+    for i, s in enumerate(spans):
+        by_tid.setdefault(s["tid"], []).append(i)
+    for rows in by_tid.values():
+        # Parents sort before children that start at the same instant.
+        rows.sort(key=lambda i: (spans[i]["start_us"], -spans[i]["wall_s"]))
+        stack = []  # (end_us, index) of the open spans on this thread
+        for i in rows:
+            s = spans[i]
+            start = s["start_us"]
+            end = start + s["wall_s"] * 1e6
+            # Close spans that ended before this one, or that it outlives
+            # (beyond a microsecond of clock rounding).
+            while stack and (stack[-1][0] <= start or stack[-1][0] + 1 < end):
+                stack.pop()
+            if stack:
+                self_s[stack[-1][1]] -= s["wall_s"]
+            # An add_stage aggregate is a sum, not an interval: never a parent.
+            if not (s.get("args") or {}).get("aggregate"):
+                stack.append((end, i))
+    return [max(t, 0.0) for t in self_s]
+
+
+def summary(spans=None):
+    """Per-name totals as a DataFrame sorted by self time (see module docstring)."""
+    import pandas as pd
+
+    spans = collect() if spans is None else spans
+    if not spans:
+        return pd.DataFrame(columns=["name", "calls", "self_s", "wall_s", "cpu_s", "bytes_read", "rows", "rss_delta"])
+    df = pd.DataFrame(spans)
+    df["self_s"] = _self_times(spans)
+    g = df.groupby("name").agg(
+        calls=("name", "size"),
+        self_s=("self_s", "sum"),
+        wall_s=("wall_s", "sum"),
+        cpu_s=("cpu_s", "sum"),
+        bytes_read=("bytes_read", "sum"),
+        rows=("rows", "sum"),
+        # Unavailable stays NaN instead of summing to 0.
+        rss_delta=("rss_delta", lambda s: s.sum(min_count=1)),
+    )
+    return g.sort_values("self_s", ascending=False).reset_index()
+
+
+def chrome_trace(spans=None):
+    """Spans as a Chrome trace-event dict (complete "X" events)."""
+    spans = collect() if spans is None else spans
+    events = []
+    for s in spans:
+        args = dict(s.get("args") or {})
+        if s.get("cpu_s") is not None:
+            args["cpu_ms"] = round(s["cpu_s"] * 1000, 3)
+        if s.get("rss_delta") is not None:
+            args["rss_delta"] = s["rss_delta"]
+        if s.get("rows") is not None:
+            args["rows"] = int(s["rows"])
+        if s.get("bytes_read") is not None:
+            args["bytes_read"] = int(s["bytes_read"])
+        events.append({
+            "name": s["name"],
+            "ph": "X",
+            "ts": s["start_us"],
+            "dur": s["wall_s"] * 1e6,
+            "pid": _pid,
+            "tid": s["tid"],
+            "args": args,
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path, spans=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(spans), f)
+    return path
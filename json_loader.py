@@ -1,9 +1,13 @@
 import os
-import json
 import re
-import pandas as pd
+import time
 from datetime import datetime, timezone
 from config import AUTO_LOCAL_TIME, SPECIAL_MAP
+import engagement
+import export_json
+import instrument
+import readahead
+import text_store
 
 
 
@@ -64,52 +68,107 @@ def to_local_time(ts_ms: int):
 
 
 
-def build_dataframe_from_json(inbox_dir, my_name):
-    rows = []
+def conversation_files(conv_dir):
+    """JSON files of one conversation folder (including subfolders)."""
+    paths = []
+    for root, dirs, files in os.walk(conv_dir):
+        for name in files:
+            if name.lower().endswith(".json"):
+                paths.append(os.path.join(root, name))
+    return paths
+
 
+def list_message_files(inbox_dir):
+    """Return ``[(raw_conv, [json paths])]`` for every conversation folder."""
+    convs = []
     for entry in os.scandir(inbox_dir):
         if not entry.is_dir():
             continue
-        raw_conv = entry.name
-        conv_name = clean_conversation_name(raw_conv)
-        for root, dirs, files in os.walk(entry.path):
-            for name in files:
-                if not name.lower().endswith(".json"):
-                    continue
-                file_path = os.path.join(root, name)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                messages = data.get("messages", [])
-                for msg in messages:
-                    sender = msg.get("sender_name")
-                    ts_ms = msg.get("timestamp_ms")
-                    if ts_ms is None:
-                        continue
-
-                    ts = to_local_time(ts_ms)
-
-                    mtype, has_reel, has_image, attachment_text_only, text = classify_message(msg)
-                    direction = "me" if sender == my_name else "them"
-
-                    rows.append(
-                        {
-                            "conversation": conv_name,
-                            "raw_folder": raw_conv,
-                            "sender": sender,
-                            "direction": direction,
-                            "text": text,
-                            "timestamp": ts,
-                            "message_type": mtype,
-                            "has_reel": has_reel,
-                            "has_image": has_image,
-                            "attachment_text_only": attachment_text_only,
-                        }
-                    )
-
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return df
+        paths = conversation_files(entry.path)
+        if paths:
+            convs.append((entry.name, paths))
+    return convs
+
+
+def new_stage_stats():
+    return {"json_load": 0.0, "to_local_time": 0.0, "classify_message": 0.0,
+            "files": 0, "bytes": 0, "rows": 0}
+
+
+def record_stage_stats(stats):
+    instrument.add_stage("json_loader.json_load", stats["json_load"],
+                         rows=stats["files"], bytes_read=stats["bytes"])
+    instrument.add_stage("json_loader.to_local_time", stats["to_local_time"], rows=stats["rows"])
+    instrument.add_stage("json_loader.classify_message", stats["classify_message"], rows=stats["rows"])
+
+
+def parse_message_file(raw_conv, file_path, my_name, stats=None, since_ms=None, raw=None):
+    """Parse one ``message_N.json`` into row dicts.
+
+    ``raw`` is the file's bytes if already read (see ``readahead``).
+    Messages older than ``since_ms`` are skipped before any per-message work.
+    Each phase is timed per file (not per message) and added to ``stats``.
+    """
+    conv_name = clean_conversation_name(raw_conv)
+
+    t0 = time.perf_counter()
+    if raw is None:
+        with open(file_path, "rb") as f:
+            raw = f.read()
+    data = export_json.loads(raw)
+    t1 = time.perf_counter()
+
+    messages = [m for m in data.get("messages", []) if m.get("timestamp_ms") is not None]
+    if since_ms is not None:
+        messages = [m for m in messages if m["timestamp_ms"] >= since_ms]
+    stamps = [to_local_time(m["timestamp_ms"]) for m in messages]
+    t2 = time.perf_counter()
+
+    rows = []
+    for msg, ts in zip(messages, stamps):
+        sender = msg.get("sender_name")
+        mtype, has_reel, has_image, attachment_text_only, text = classify_message(msg)
+        direction = "me" if sender == my_name else "them"
+        reactions = msg.get("reactions")
+
+        rows.append(
+            {
+                "conversation": conv_name,
+                "raw_folder": raw_conv,
+                "sender": sender,
+                "direction": direction,
+                "text": text,
+                "timestamp": ts,
+                "timestamp_ms": msg["timestamp_ms"],
+                "message_type": mtype,
+                "has_reel": has_reel,
+                "has_image": has_image,
+                "attachment_text_only": attachment_text_only,
+                "share_owner": (msg.get("share") or {}).get("original_content_owner"),
+                "reactions": [(r.get("actor"), r.get("reaction")) for r in reactions] if reactions else None,
+            }
+        )
+
+    if stats is not None:
+        stats["json_load"] += t1 - t0
+        stats["to_local_time"] += t2 - t1
+        stats["classify_message"] += time.perf_counter() - t2
+        stats["files"] += 1
+        stats["bytes"] += len(raw)
+        stats["rows"] += len(rows)
+    return rows
+
+
+def add_derived_columns(df):
+    """Add the calendar and word-count columns the stats expect (in place).
+
+    Also splits raw reactions into their side table (see ``engagement``).
+    """
+    import pandas as pd
+
+    if "share_owner" in df.columns:
+        df["share_owner"] = df["share_owner"].astype("category")
+    engagement.split_reactions(df)
 
     df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
     if df["timestamp"].notna().any():
@@ -121,3 +180,89 @@ def build_dataframe_from_json(inbox_dir, my_name):
 
     df["word_count"] = df["text"].astype(str).str.split().str.len().fillna(0).astype(int)
     return df
+
+
+def _previous_text_ids(df, previous):
+    """Per row of ``df``, the ``text_id`` of the same message in ``previous`` (or -1)."""
+    key = ["raw_folder", "timestamp_ms", "sender"]
+    old = previous.loc[previous["raw_folder"].isin(df["raw_folder"].unique()), key + ["text_id"]]
+    merged = df[key].merge(old.drop_duplicates(key), on=key, how="left")
+    return merged["text_id"].fillna(-1).astype("int64").to_numpy()
+
+
+def rows_to_dataframe(rows, texts=None, previous=None):
+    """Frame of parsed rows; with a ``TextStore``, ``text`` is moved into it.
+
+    ``previous`` is an older frame split into the same store: messages whose
+    text is unchanged there reuse its ids rather than being appended again.
+    """
+    import pandas as pd
+
+    with instrument.span("json_loader.dataframe") as sp:
+        df = pd.DataFrame(rows)
+        sp["rows"] = len(df)
+        if df.empty:
+            return df
+        add_derived_columns(df)
+        if texts is not None:
+            reuse = None
+            if previous is not None and "text_id" in previous.columns and text_store.store_for(previous) is texts:
+                reuse = _previous_text_ids(df, previous)
+            text_store.split_text(df, texts, reuse=reuse)
+    return df
+
+
+def splice_conversations(df, part, raw_convs):
+    """``df`` with the rows of ``raw_convs`` replaced by ``part``.
+
+    ``part`` holds the re-parsed rows of those conversations (built by
+    ``rows_to_dataframe`` into the same text store as ``df``, if any;
+    conversations that are gone simply have none). Both reaction side tables
+    and the text store are carried over to the new frame.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if "raw_folder" not in df.columns:
+        return part
+    keep = ~df["raw_folder"].isin(list(raw_convs)).to_numpy()
+    kept = int(keep.sum())
+    frames = [df[keep]] + ([part] if len(part) else [])
+    out = pd.concat(frames, ignore_index=True)
+    if "share_owner" in out.columns:
+        out["share_owner"] = out["share_owner"].astype("category")
+
+    old = engagement.reactions_table(df)
+    old = old[keep[old["message"].to_numpy()]]
+    new = engagement.reactions_table(part)
+    table = pd.concat([
+        old.assign(message=(np.cumsum(keep) - 1)[old["message"].to_numpy()]),
+        new.assign(message=new["message"] + kept),
+    ], ignore_index=True)
+    table["reactor"] = table["reactor"].astype("category")
+    table["emoji"] = table["emoji"].astype("category")
+    engagement.attach(out, table)
+    store = text_store.store_for(df)
+    if store is not None:
+        text_store.attach(out, store)
+    return out
+
+
+def build_dataframe_from_json(inbox_dir, my_name, texts=None):
+    with instrument.span("json_loader.build_dataframe_from_json") as sp:
+        with instrument.span("json_loader.walk") as sp_walk:
+            convs = list_message_files(inbox_dir)
+            sp_walk["rows"] = sum(len(paths) for _, paths in convs)
+
+        stats = new_stage_stats()
+        rows = []
+        files = [(raw_conv, file_path) for raw_conv, paths in convs for file_path in paths]
+        with readahead.ReadAhead([p for _, p in files], name="json_loader.readahead") as reader:
+            for (raw_conv, file_path), (_, raw) in zip(files, reader):
+                rows.extend(parse_message_file(raw_conv, file_path, my_name, stats, raw=raw))
+        record_stage_stats(stats)
+
+        df = rows_to_dataframe(rows, texts)
+        sp["rows"] = len(df)
+        sp["bytes_read"] = stats["bytes"]
+    return df
@@ -1,20 +1,10 @@
 # likes_stats.py
 import os
-import json
-from collections import Counter
-from datetime import datetime
 
+import activity
 
-def _load(path):
-    if not os.path.exists(path):
-        print("XXXXXX")
-        return None
-        
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return None
+
+_saved_cache = {}
 
 
 # ------------------------------------------------------------
@@ -22,101 +12,93 @@ def _load(path):
 # ------------------------------------------------------------
 
 def load_liked_posts(export_root):
-    """Return list of liked posts with (creator, timestamp, link)."""
+    """Return liked posts as a frame of (creator, timestamp, link).
 
-    path = os.path.join(
-        export_root,
-        "your_instagram_activity",
-        "likes",
-        "liked_posts.json",
-    )
+    Backed by the cached ``activity`` table, so reruns only re-parse after
+    the file changes. Treat the result as read-only.
+    """
+    return activity.load_table(export_root, "liked_posts")
 
-    data = _load(path) or {}
-    items = data.get("likes_media_likes", [])
 
-    results = []
+def liked_per_creator(liked_items, top_n=50):
+    counts = liked_items["creator"].value_counts(sort=True)
+    counts = counts[counts > 0]
+    if top_n is not None:
+        counts = counts.head(top_n)
+    return list(zip(counts.index.astype(str), counts.astype(int)))
 
-    for item in items:
-        creator = item.get("title")  # username
-        sld = item.get("string_list_data", [])
-        if not sld:
-            continue
-        entry = sld[0]
-        ts = entry.get("timestamp")
-        link = entry.get("href")
 
-        results.append({
-            "creator": creator,
-            "timestamp": ts,
-            "link": link,
-            "date": datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
-        })
+# ------------------------------------------------------------
+# Saved Posts
+# ------------------------------------------------------------
 
-    return results
+def load_saved_posts(export_root):
+    """Return saved posts as a frame of (creator, timestamp, link, source).
+
+    Combines saved_posts.json and saved_collections.json (each collection
+    entry is a saved post).
+    """
+    import pandas as pd
+
+    posts = activity.load_table(export_root, "saved_posts")
+    collections = activity.load_table(export_root, "saved_collections")
+
+    key = os.path.abspath(export_root)
+    hit = _saved_cache.get(key)
+    if hit is not None and hit[0] is posts and hit[1] is collections:
+        return hit[2]
+
+    combined = pd.concat(
+        [
+            posts.assign(source="saved_posts"),
+            collections.assign(source="saved_collections"),
+        ],
+        ignore_index=True,
+    )
+    combined["creator"] = combined["creator"].astype("category")
+    combined["source"] = combined["source"].astype("category")
+    _saved_cache[key] = (posts, collections, combined)
+    return combined
 
 
-def liked_per_creator(liked_items, top_n=50):
-    counts = Counter([x["creator"] for x in liked_items])
-    return counts.most_common(top_n)
+def saved_per_creator(saved_items, top_n=50):
+    return liked_per_creator(saved_items, top_n=top_n)
 
 
 # ------------------------------------------------------------
-# Saved Posts
+# Time-series analytics
 # ------------------------------------------------------------
 
-def load_saved_posts(export_root):
-    """Return list of saved posts with (creator, timestamp, link)."""
+def per_month(items):
+    """Count of items per calendar month."""
+    import pandas as pd
 
-    base = os.path.join(
-        export_root,
-        "your_instagram_activity",
-        "saved",
-    )
+    if items.empty:
+        return pd.Series(dtype="int64")
+    return items.groupby(items["timestamp"].dt.to_period("M")).size().sort_index()
 
-    saved_posts_path = os.path.join(base, "saved_posts.json")
-    saved_collections_path = os.path.join(base, "saved_collections.json")
-
-    results = []
-
-    # ---- saved_posts.json (simple) ----
-    sp = _load(saved_posts_path) or {}
-    for item in sp.get("saved_saved_media", []):
-        creator = item.get("title")
-        sm = item.get("string_map_data", {})
-        meta = sm.get("Saved on", {})
-        ts = meta.get("timestamp")
-        link = meta.get("href")
-
-        if ts:
-            results.append({
-                "creator": creator,
-                "timestamp": ts,
-                "link": link,
-                "date": datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
-            })
-
-    # ---- saved_collections.json (each entry is a saved post) ----
-    sc = _load(saved_collections_path) or {}
-    for item in sc.get("saved_saved_collections", []):
-        sm = item.get("string_map_data", {})
-        name_field = sm.get("Name", {})
-        creator = name_field.get("value")
-        meta = sm.get("Added Time") or sm.get("Creation Time") or {}
-
-        ts = meta.get("timestamp")
-        link = name_field.get("href")  # link to reel
-
-        if ts and creator:
-            results.append({
-                "creator": creator,
-                "timestamp": ts,
-                "link": link,
-                "date": datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
-            })
-
-    return results
 
+def per_hour(items):
+    """Count of items per hour of day (0-23)."""
+    import numpy as np
+    import pandas as pd
 
-def saved_per_creator(saved_items, top_n=50):
-    counts = Counter([x["creator"] for x in saved_items])
-    return counts.most_common(top_n)
+    hours = items["timestamp"].dt.hour.dropna().to_numpy(dtype="int64")
+    return pd.Series(np.bincount(hours, minlength=24), index=pd.RangeIndex(24, name="hour"))
+
+
+def creator_trend(items, top_n=10):
+    """Months x creators count table for the ``top_n`` most frequent creators."""
+    import pandas as pd
+
+    if items.empty:
+        return pd.DataFrame()
+    top = items["creator"].value_counts().head(top_n).index
+    sub = items[items["creator"].isin(top)]
+    trend = (
+        sub.groupby([sub["timestamp"].dt.to_period("M"), sub["creator"].astype(str)])
+        .size()
+        .unstack(fill_value=0)
+        .sort_index()
+    )
+    return trend[[c for c in top.astype(str) if c in trend.columns]]
@@ -0,0 +1,328 @@
+"""Media inventory and duplicate detection for an export.
+
+Every file under the export root is indexed once with ``os.scandir`` (size,
+mtime). Media URIs referenced by messages (photos, videos, audio, gifs,
+files, stickers) and the profile photo are resolved against that index, so
+no per-URI ``stat`` is needed.
+
+Duplicates are found in three passes: files are grouped by size, same-size
+files get a partial hash of their first block, and only partial-hash
+collisions are hashed in full. Hashing runs on a thread pool (``hashlib``
+releases the GIL on large buffers) and results are stored in a SQLite cache
+keyed by (path, size, mtime), so an interrupted scan resumes where it
+stopped and repeat scans read nothing.
+"""
+import hashlib
+import mimetypes
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+import export_json
+import instrument
+import json_loader
+import profile_loader
+
+MEDIA_KEYS = ("photos", "videos", "audio_files", "gifs", "files")
+
+PARTIAL_BYTES = 64 * 1024
+CHUNK_BYTES = 1024 * 1024
+COMMIT_EVERY = 500
+
+
+# ------------------------------------------------------------
+# Indexing
+# ------------------------------------------------------------
+
+def scan_tree(root):
+    """Yield (path, size, mtime_ns) for every file under ``root``."""
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        yield os.path.normpath(entry.path), st.st_size, st.st_mtime_ns
+                except OSError:
+                    continue
+
+
+def media_type(path):
+    mime, _ = mimetypes.guess_type(path)
+    return mime.split("/")[0] if mime else "other"
+
+
+def _resolve(export_root, uri, index):
+    for base in (export_root, os.path.join(export_root, "your_instagram_activity")):
+        path = os.path.normpath(os.path.join(base, uri))
+        if path in index:
+            return path
+    return os.path.normpath(os.path.join(export_root, uri))
+
+
+def referenced_media(export_root, my_name):
+    """Media URIs referenced by messages: one row per (message, file)."""
+    paths = config.resolve_paths(export_root)
+    rows = []
+    for raw_conv, file_paths in json_loader.list_message_files(paths["INBOX_DIR"]):
+        conv_name = json_loader.clean_conversation_name(raw_conv)
+        for file_path in file_paths:
+            try:
+                data = export_json.load(file_path)
+            except (OSError, ValueError):
+                continue
+            for msg in data.get("messages", []):
+                direction = "me" if msg.get("sender_name") == my_name else "them"
+                for kind in MEDIA_KEYS:
+                    for item in msg.get(kind) or ():
+                        uri = item.get("uri")
+                        if uri and not uri.startswith("http"):
+                            rows.append((conv_name, direction, kind, uri))
+                sticker = msg.get("sticker") or {}
+                if sticker.get("uri"):
+                    rows.append((conv_name, direction, "sticker", sticker["uri"]))
+    return rows
+
+
+def build_inventory(export_root, my_name):
+    """Return ``(files, refs)`` frames.
+
+    ``files``: every file in the export with size, mtime and media type.
+    ``refs``: every referenced media URI with its conversation, direction,
+    resolved path and size (NaN when the file is missing).
+    """
+    import pandas as pd
+
+    export_root = os.path.abspath(export_root)
+    with instrument.span("media_inventory.scan") as sp:
+        files = pd.DataFrame(list(scan_tree(export_root)), columns=["path", "size", "mtime_ns"])
+        files["type"] = pd.Categorical([media_type(p) for p in files["path"]])
+        sp["rows"] = len(files)
+
+    index = dict(zip(files["path"], files["size"]))
+    with instrument.span("media_inventory.refs") as sp:
+        refs = referenced_media(export_root, my_name)
+        profile = profile_loader.get_profile_photo_path(
+            export_root, config.resolve_paths(export_root)["PERSONAL_INFO_JSON"]
+        )
+        if profile:
+            refs.append(("(profile)", "me", "profile", os.path.relpath(profile, export_root)))
+        refs = pd.DataFrame(refs, columns=["conversation", "direction", "kind", "uri"])
+        refs["path"] = [_resolve(export_root, u, index) for u in refs["uri"]]
+        refs["size"] = refs["path"].map(index)
+        for col in ("conversation", "direction", "kind"):
+            refs[col] = refs[col].astype("category")
+        sp["rows"] = len(refs)
+    return files, refs
+
+
+# ------------------------------------------------------------
+# Hashing
+# ------------------------------------------------------------
+
+def _cache_path(export_root):
+    key = hashlib.blake2b(os.path.abspath(export_root).encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(config.CACHE_DIR, f"media_hashes_{key}.sqlite")
+
+
+class HashCache:
+    """(path, size, mtime_ns) -> partial/full digest, persisted in SQLite."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " path TEXT, size INTEGER, mtime_ns INTEGER, kind TEXT, digest TEXT,"
+            " PRIMARY KEY (path, size, mtime_ns, kind))"
+        )
+        self._lock = threading.Lock()
+
+    def get_many(self, kind, keys):
+        """Cached digests of ``keys``; only those keys are looked up (via a temp table join)."""
+        with self._lock:
+            db = self._db
+            db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS wanted ("
+                " path TEXT, size INTEGER, mtime_ns INTEGER, PRIMARY KEY (path, size, mtime_ns))"
+            )
+            try:
+                db.executemany("INSERT OR IGNORE INTO wanted VALUES (?, ?, ?)", keys)
+                rows = db.execute(
+                    "SELECT h.path, h.size, h.mtime_ns, h.digest FROM wanted w"
+                    " JOIN hashes h ON h.path = w.path AND h.size = w.size"
+                    " AND h.mtime_ns = w.mtime_ns AND h.kind = ?",
+                    (kind,),
+                ).fetchall()
+            finally:
+                db.execute("DELETE FROM wanted")
+                db.commit()
+        return {(p, s, m): d for p, s, m, d in rows}
+
+    def put_many(self, kind, items):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                [(p, s, m, kind, d) for (p, s, m), d in items],
+            )
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def _digest(path, limit=None):
+    h = hashlib.blake2b(digest_size=16)
+    remaining = limit
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = CHUNK_BYTES if remaining is None else min(CHUNK_BYTES, remaining)
+            if n <= 0:
+                break
+            chunk = f.read(n)
+            if not chunk:
+                break
+            h.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return h.hexdigest()
+
+
+def _hash_files(keys, kind, cache, workers):
+    """Digest for every (path, size, mtime_ns) key, using and filling ``cache``."""
+    limit = PARTIAL_BYTES if kind == "partial" else None
+    known = cache.get_many(kind, keys)
+    todo = [k for k in keys if k not in known]
+
+    bytes_read = 0
+    with instrument.span(f"media_inventory.hash_{kind}") as sp:
+        pending = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_digest, k[0], limit): k for k in todo}
+            for fut in as_completed(futures):
+                key = futures[fut]
+                try:
+                    digest = fut.result()
+                except OSError:
+                    continue
+                known[key] = digest
+                pending.append((key, digest))
+                bytes_read += key[1] if limit is None else min(key[1], limit)
+                if len(pending) >= COMMIT_EVERY:
+                    cache.put_many(kind, pending)
+                    pending = []
+        cache.put_many(kind, pending)
+        sp["rows"] = len(todo)
+        sp["bytes_read"] = bytes_read
+    return known
+
+
+def find_duplicates(files, export_root, workers=None):
+    """Groups of byte-identical files.
+
+    Returns a frame with path, size, digest and ``group`` (one id per set of
+    identical files); files without a duplicate are not listed.
+    """
+    import pandas as pd
+
+    workers = workers or config.MEDIA_HASH_WORKERS
+    cand = files[(files["size"] > 0) & files.duplicated("size", keep=False)]
+    keys = list(zip(cand["path"], cand["size"].astype(int), cand["mtime_ns"].astype(int)))
+
+    cache = HashCache(_cache_path(export_root))
+    try:
+        partial = _hash_files(keys, "partial", cache, workers)
+        cand = cand.assign(partial=[partial.get(k) for k in keys]).dropna(subset=["partial"])
+        cand = cand[cand.duplicated(["size", "partial"], keep=False)]
+
+        # Files no larger than the partial block are already fully hashed.
+        cand_keys = list(zip(cand["path"], cand["size"].astype(int), cand["mtime_ns"].astype(int)))
+        big_keys = [k for k in cand_keys if k[1] > PARTIAL_BYTES]
+        full = _hash_files(big_keys, "full", cache, workers)
+    finally:
+        cache.close()
+
+    digest = [full.get(k) if k[1] > PARTIAL_BYTES else p for k, p in zip(cand_keys, cand["partial"])]
+    dups = cand.assign(digest=digest).dropna(subset=["digest"])
+    dups = dups[dups.duplicated(["size", "digest"], keep=False)]
+    dups = dups[["path", "size", "type", "digest"]].sort_values(["size", "digest", "path"], ascending=[False, True, True])
+    dups["group"] = dups.groupby(["size", "digest"], sort=False).ngroup()
+    return dups.reset_index(drop=True)
+
+
+# ------------------------------------------------------------
+# Reports
+# ------------------------------------------------------------
+
+def bytes_per_conversation(refs):
+    g = refs.groupby("conversation", observed=True).agg(
+        files=("uri", "size"),
+        missing=("size", lambda s: int(s.isna().sum())),
+        bytes=("size", "sum"),
+    )
+    return g.sort_values("bytes", ascending=False)
+
+
+def bytes_per_direction(refs):
+    return refs.groupby(["direction", "kind"], observed=True).agg(
+        files=("uri", "size"),
+        bytes=("size", "sum"),
+    )
+
+
+def duplicate_summary(dups):
+    """One row per duplicate group with the bytes a dedup would reclaim."""
+    import pandas as pd
+
+    if dups.empty:
+        return pd.DataFrame(columns=["size", "copies", "example", "wasted_bytes"])
+    g = dups.groupby("group").agg(
+        size=("size", "first"),
+        copies=("path", "size"),
+        example=("path", "first"),
+    )
+    g["wasted_bytes"] = g["size"] * (g["copies"] - 1)
+    return g.sort_values("wasted_bytes", ascending=False)
+
+
+_inventories = {}
+_reports = {}
+_reports_lock = threading.Lock()
+
+
+def get_inventory(export_root, my_name, refresh=False):
+    """``build_inventory`` result for ``export_root``, kept per process."""
+    key = os.path.abspath(export_root)
+    with _reports_lock:
+        inv = None if refresh else _inventories.get(key)
+    if inv is None:
+        inv = build_inventory(export_root, my_name)
+        with _reports_lock:
+            _inventories[key] = inv
+    return inv
+
+
+def run_inventory(export_root, my_name, refresh=False):
+    """Inventory plus duplicates for ``export_root``, kept per process.
+
+    Returns a dict with ``files``, ``refs`` and ``duplicates`` frames.
+    """
+    key = os.path.abspath(export_root)
+    with _reports_lock:
+        report = None if refresh else _reports.get(key)
+    if report is None:
+        files, refs = get_inventory(export_root, my_name, refresh=refresh)
+        report = {"files": files, "refs": refs, "duplicates": find_duplicates(files, export_root)}
+        with _reports_lock:
+            _reports[key] = report
+    return report
@@ -0,0 +1,259 @@
+"""Persisted message store that successive export snapshots merge into.
+
+Monthly exports overlap almost entirely with the previous one. Instead of
+treating each export as a separate world, ``merge_export`` appends only the
+messages that are new since the last merge:
+
+* the manifest keeps a per-conversation high-water mark (newest
+  ``timestamp_ms`` stored), and messages older than it are skipped while
+  parsing, before any per-message work;
+* messages exactly at the mark are checked against the hashes stored for
+  that timestamp, and the batch is deduplicated on a 64-bit hash of
+  (conversation folder, sender, timestamp_ms, text), never by comparing
+  whole frames.
+
+Each merge writes one Parquet part; ``load_store`` concatenates the parts.
+Version 1 stores (text kept as Instagram's mojibake) are upgraded in place
+the first time their manifest is read.
+
+    <store>/manifest.json
+    <store>/parts/part-00001.parquet
+"""
+import json
+import os
+import threading
+import time
+
+import config
+import export_json
+import identity
+import instrument
+import json_loader
+
+# 2: text and names are stored with the export mojibake repaired (export_json).
+STORE_VERSION = 2
+KEY_COLUMNS = ["raw_folder", "sender", "timestamp_ms", "text"]
+STORED_COLUMNS = [
+    "conversation", "raw_folder", "sender", "direction", "text", "timestamp",
+    "timestamp_ms", "message_type", "has_reel", "has_image",
+    "attachment_text_only", "share_owner", "reactions", "msg_hash",
+]
+
+# Columns holding export text (reactions: lists of (actor, emoji) pairs).
+TEXT_COLUMNS = ["sender", "text", "share_owner"]
+
+_lock = threading.Lock()
+_upgrade_lock = threading.Lock()
+_loaded = {}
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, "manifest.json")
+
+
+def read_manifest(store_dir):
+    """The store's manifest, or an empty one if the store does not exist yet."""
+    try:
+        with open(_manifest_path(store_dir), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": STORE_VERSION, "my_name": None, "parts": [], "conversations": {}, "merges": []}
+    if manifest.get("version") == 1:
+        manifest = _upgrade_v1(store_dir)
+    if manifest.get("version") != STORE_VERSION:
+        raise ValueError(
+            f"Unsupported message store version: {manifest.get('version')} "
+            f"(expected {STORE_VERSION}); merge into a new store folder"
+        )
+    return manifest
+
+
+def _upgrade_v1(store_dir):
+    """Repair the mojibake of a version 1 store and return its version 2 manifest.
+
+    Every part is rewritten under a new name with its text repaired and its
+    hashes recomputed; the manifest (names, boundary hashes, part list) is
+    switched over in one atomic write, then the old parts are deleted.
+    """
+    import pandas as pd
+
+    with _upgrade_lock, instrument.span("message_store.upgrade_v1") as sp:
+        with open(_manifest_path(store_dir), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != 1:
+            return manifest
+
+        convs = manifest["conversations"]
+        boundary = {raw_conv: [] for raw_conv in convs}
+        parts = []
+        rows = 0
+        for part in manifest["parts"]:
+            frame = pd.read_parquet(os.path.join(store_dir, "parts", part))
+            for col in TEXT_COLUMNS:
+                frame[col] = export_json.repair_strings(frame[col].astype(object).where(frame[col].notna(), None))
+            frame["reactions"] = export_json.repair_strings(
+                None if pairs is None else [list(pair) for pair in pairs] for pairs in frame["reactions"]
+            )
+            frame["msg_hash"] = message_hashes(frame)
+
+            hwm = frame["raw_folder"].map({c: s["hwm"] for c, s in convs.items()})
+            on_mark = frame.loc[(frame["timestamp_ms"] == hwm).to_numpy(), ["raw_folder", "msg_hash"]]
+            for raw_conv, h in zip(on_mark["raw_folder"], on_mark["msg_hash"]):
+                boundary[raw_conv].append(int(h))
+
+            new_part = f"{part.removesuffix('.parquet')}-v2.parquet"
+            frame[STORED_COLUMNS].to_parquet(os.path.join(store_dir, "parts", new_part), index=False)
+            parts.append(new_part)
+            rows += len(frame)
+
+        old_parts = manifest["parts"]
+        for raw_conv, state in convs.items():
+            state["boundary"] = boundary[raw_conv]
+        if manifest["my_name"]:
+            manifest["my_name"] = export_json.repair_strings([manifest["my_name"]])[0]
+        manifest["parts"] = parts
+        manifest["version"] = STORE_VERSION
+        _write_manifest(store_dir, manifest)
+        for part in old_parts:
+            try:
+                os.remove(os.path.join(store_dir, "parts", part))
+            except OSError:
+                pass
+        sp["rows"] = rows
+    return manifest
+
+
+def _write_manifest(store_dir, manifest):
+    path = _manifest_path(store_dir)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def message_hashes(frame):
+    """uint64 hash per row of the dedup key columns."""
+    import pandas as pd
+
+    key = frame[KEY_COLUMNS].astype({"sender": "string", "text": "string"})
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+
+def _new_messages(rows, convs):
+    """Frame of ``rows`` not already in the store (one vectorized pass)."""
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame(rows)
+    frame["msg_hash"] = message_hashes(frame)
+    keep = ~frame["msg_hash"].duplicated().to_numpy()
+
+    # Only messages sitting exactly on their conversation's mark can already
+    # be stored; everything older was skipped while parsing.
+    hwm = frame["raw_folder"].map({c: s["hwm"] for c, s in convs.items()})
+    boundary = np.fromiter((h for s in convs.values() for h in s["boundary"]), dtype="uint64")
+    at_mark = (frame["timestamp_ms"] == hwm).to_numpy()
+    keep &= ~(at_mark & np.isin(frame["msg_hash"].to_numpy(), boundary))
+    return frame[keep].reset_index(drop=True)
+
+
+def _advance_marks(frame, convs):
+    """Move each touched conversation's high-water mark to its newest message."""
+    newest = frame.groupby("raw_folder", sort=False)["timestamp_ms"].transform("max")
+    on_mark = frame.loc[frame["timestamp_ms"] == newest, ["raw_folder", "timestamp_ms", "msg_hash"]]
+    for (raw_conv, ts), hashes in on_mark.groupby(["raw_folder", "timestamp_ms"], sort=False)["msg_hash"]:
+        hashes = [int(h) for h in hashes]
+        state = convs.get(raw_conv)
+        if state is not None and state["hwm"] == ts:
+            state["boundary"].extend(hashes)
+        else:
+            convs[raw_conv] = {"hwm": int(ts), "boundary": hashes}
+
+
+def merge_export(store_dir, export_root):
+    """Append the new messages of ``export_root`` to the store.
+
+    Returns a summary dict (conversations touched, messages added, ...).
+    """
+    paths = config.resolve_paths(export_root)
+    os.makedirs(os.path.join(store_dir, "parts"), exist_ok=True)
+
+    with _lock, instrument.span("message_store.merge", export_root=paths["EXPORT_ROOT"]) as sp:
+        started = time.perf_counter()
+        manifest = read_manifest(store_dir)
+        my_name, _ = identity.detect_identity(paths["INBOX_DIR"], paths["PERSONAL_INFO_JSON"])
+        if manifest["my_name"] and my_name and manifest["my_name"] != my_name:
+            raise ValueError(
+                f"Export belongs to {my_name!r} but the store holds {manifest['my_name']!r}"
+            )
+
+        convs = manifest["conversations"]
+        stats = json_loader.new_stage_stats()
+        rows = []
+        for raw_conv, file_paths in json_loader.list_message_files(paths["INBOX_DIR"]):
+            hwm = convs[raw_conv]["hwm"] if raw_conv in convs else None
+            for path in file_paths:
+                rows.extend(json_loader.parse_message_file(raw_conv, path, my_name, stats, since_ms=hwm))
+        json_loader.record_stage_stats(stats)
+
+        added = touched = 0
+        new = _new_messages(rows, convs) if rows else None
+        if new is not None and len(new):
+            _advance_marks(new, convs)
+            part = f"part-{len(manifest['parts']) + 1:05d}.parquet"
+            new[STORED_COLUMNS].to_parquet(os.path.join(store_dir, "parts", part), index=False)
+            manifest["parts"].append(part)
+            added, touched = len(new), int(new["raw_folder"].nunique())
+
+        summary = {
+            "export_root": paths["EXPORT_ROOT"],
+            "merged_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "conversations": touched,
+            "messages_scanned": stats["rows"],
+            "messages_added": added,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        manifest["my_name"] = manifest["my_name"] or my_name
+        manifest["merges"].append(summary)
+        _write_manifest(store_dir, manifest)
+
+        sp["rows"] = added
+        sp["bytes_read"] = stats["bytes"]
+    return summary
+
+
+def load_store(store_dir):
+    """``(df, my_name)`` for everything merged so far; treat ``df`` as read-only.
+
+    Cached per process until the manifest changes.
+    """
+    import pandas as pd
+
+    manifest_path = _manifest_path(store_dir)
+    try:
+        mtime = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        return pd.DataFrame(), None
+
+    key = os.path.abspath(store_dir)
+    with _lock:
+        hit = _loaded.get(key)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+
+    with instrument.span("message_store.load") as sp:
+        manifest = read_manifest(store_dir)
+        parts = [
+            pd.read_parquet(os.path.join(store_dir, "parts", part))
+            for part in manifest["parts"]
+        ]
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        if not df.empty:
+            df = df.sort_values(["raw_folder", "timestamp_ms"], kind="stable", ignore_index=True)
+            json_loader.add_derived_columns(df)
+        sp["rows"] = len(df)
+
+    result = (df, manifest["my_name"])
+    with _lock:
+        _loaded[key] = (mtime, result)
+    return result
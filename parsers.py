@@ -1,7 +1,5 @@
 import re
 from datetime import datetime
-from dateutil.parser import parse as parse_dt
-from bs4 import BeautifulSoup
 from config import DIV_SELECTOR, SPECIAL_MAP
 from identity import MY_NAME
 
@@ -31,6 +29,8 @@ def extract_timestamp(msg_div):
     ts_div = msg_div.find("div", class_="_3-94 _a6-o")
     if not ts_div:
         return None
+    from dateutil.parser import parse as parse_dt
+
     text = ts_div.get_text(strip=True)
     try:
         return parse_dt(text)
@@ -39,6 +39,8 @@ def extract_timestamp(msg_div):
 
 
 def extract_messages_from_html(html, raw_conv_name):
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     conv_name = clean_username(raw_conv_name)
     msg_divs = soup.select(DIV_SELECTOR)
@@ -0,0 +1,175 @@
+"""Per-participant analytics for group and one-to-one chats.
+
+The message frame only says whether a message was sent by "me" or "them",
+which collapses every group chat into one counterpart. Here each sender is
+interned to an integer participant id (the same name in different
+conversations is the same contact), and counts are kept as sparse COO
+matrices over those ids:
+
+* ``per_conversation``: conversations x participants message counts;
+* ``replies``: participants x participants, ``[a, b]`` counting messages by
+  ``a`` that directly follow a message by ``b`` in the same conversation
+  within ``REPLY_WINDOW_S``.
+
+A COO matrix is a dict of equal-length ``row`` / ``col`` / ``data`` arrays
+plus ``shape``; only non-zero cells are stored, so thousands of participants
+across large group threads cost memory proportional to actual interactions.
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+import shared_cache
+from instrument import traced
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# A message counts as a reply only if it follows the previous one this soon.
+REPLY_WINDOW_S = 6 * 3600
+
+_index_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _forget(frame_id):
+    with _cache_lock:
+        _index_cache.pop(frame_id, None)
+
+
+def coo_counts(rows, cols, shape):
+    """Sparse count matrix of (rows[i], cols[i]) pairs."""
+    import numpy as np
+
+    rows = np.asarray(rows, dtype="int64")
+    cols = np.asarray(cols, dtype="int64")
+    keys, counts = np.unique(rows * shape[1] + cols, return_counts=True)
+    return {
+        "row": (keys // shape[1]).astype("int32"),
+        "col": (keys % shape[1]).astype("int32"),
+        "data": counts.astype("int64"),
+        "shape": shape,
+    }
+
+
+def coo_to_frame(coo, row_labels, col_labels, row_name="row", col_name="col", value_name="count"):
+    import pandas as pd
+
+    return pd.DataFrame({
+        row_name: row_labels.take(coo["row"]),
+        col_name: col_labels.take(coo["col"]),
+        value_name: coo["data"],
+    })
+
+
+@traced
+def build_index(df: pd.DataFrame):
+    """Intern participants/conversations and build the sparse count matrices.
+
+    Cached per frame object (views from ``shared_cache`` share their
+    origin's index) without keeping the frame alive; treat the result as
+    read-only.
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = shared_cache.origin(df)
+    with _cache_lock:
+        hit = _index_cache.get(id(df))
+    if hit is not None and hit[0]() is df:
+        return hit[1]
+
+    conv_codes, conv_keys = pd.factorize(df["raw_folder"].to_numpy())
+    ts = df["timestamp"].to_numpy().astype("datetime64[s]").astype("int64")
+    order = np.lexsort((ts, conv_codes))
+    conv_codes, ts = conv_codes[order], ts[order]
+    sender_codes, names = pd.factorize(df["sender"].fillna("").to_numpy()[order])
+    names = pd.Index(names)
+    conv_names = pd.Index(
+        df.drop_duplicates("raw_folder").set_index("raw_folder")["conversation"].reindex(conv_keys).to_numpy()
+    )
+    n_conv, n_part = len(conv_keys), len(names)
+
+    per_conversation = coo_counts(conv_codes, sender_codes, (n_conv, n_part))
+
+    follows = (
+        (conv_codes[1:] == conv_codes[:-1])
+        & (sender_codes[1:] != sender_codes[:-1])
+        & (ts[1:] - ts[:-1] <= REPLY_WINDOW_S)
+    )
+    replies = coo_counts(sender_codes[1:][follows], sender_codes[:-1][follows], (n_part, n_part))
+
+    index = {
+        "names": names,
+        "conversations": conv_names,
+        "per_conversation": per_conversation,
+        "replies": replies,
+        "members": np.bincount(per_conversation["row"], minlength=n_conv),
+    }
+    ref = weakref.ref(df, lambda _, frame_id=id(df): _forget(frame_id))
+    with _cache_lock:
+        _index_cache.clear()
+        _index_cache[id(df)] = (ref, index)
+    return index
+
+
+@traced
+def messages_per_participant(df: pd.DataFrame, group_only=False):
+    """One row per (conversation, participant) with that sender's message count."""
+    index = build_index(df)
+    out = coo_to_frame(
+        index["per_conversation"], index["conversations"], index["names"],
+        row_name="conversation", col_name="participant", value_name="messages",
+    )
+    out["members"] = index["members"][index["per_conversation"]["row"]]
+    if group_only:
+        out = out[out["members"] > 2]
+    return out.sort_values(["conversation", "messages"], ascending=[True, False], ignore_index=True)
+
+
+@traced
+def contacts(df: pd.DataFrame):
+    """Cross-conversation identity: one row per participant across all chats."""
+    import numpy as np
+    import pandas as pd
+
+    index = build_index(df)
+    pc = index["per_conversation"]
+    n = len(index["names"])
+    replies = index["replies"]
+    return pd.DataFrame({
+        "participant": index["names"],
+        "conversations": np.bincount(pc["col"], minlength=n),
+        "group_conversations": np.bincount(pc["col"], weights=index["members"][pc["row"]] > 2, minlength=n).astype(int),
+        "messages": np.bincount(pc["col"], weights=pc["data"], minlength=n).astype(int),
+        "replies_sent": np.bincount(replies["row"], weights=replies["data"], minlength=n).astype(int),
+        "replies_received": np.bincount(replies["col"], weights=replies["data"], minlength=n).astype(int),
+    }).sort_values("messages", ascending=False, ignore_index=True)
+
+
+@traced
+def top_interaction_pairs(df: pd.DataFrame, top_n=50):
+    """Most active reply pairs: one row per pair, with replies in each direction."""
+    import numpy as np
+
+    index = build_index(df)
+    replies = index["replies"]
+    pairs = coo_to_frame(replies, index["names"], index["names"], "replier", "replied_to", "replies")
+
+    pairs["reverse"] = 0
+    if len(pairs):
+        # Look up the reverse (b -> a) cell of each (a -> b) pair in the sorted keys.
+        n = replies["shape"][1]
+        keys = replies["row"].astype("int64") * n + replies["col"]
+        rev = replies["col"].astype("int64") * n + replies["row"]
+        pos = np.searchsorted(keys, rev).clip(max=len(keys) - 1)
+        pairs["reverse"] = np.where(keys[pos] == rev, replies["data"][pos], 0)
+        # Keep each unordered pair once, from its busier direction.
+        busier = (pairs["replies"] > pairs["reverse"]) | (
+            (pairs["replies"] == pairs["reverse"]) & (replies["row"] < replies["col"])
+        )
+        pairs = pairs[busier]
+    pairs["total"] = pairs["replies"] + pairs["reverse"]
+    return pairs.sort_values("total", ascending=False, ignore_index=True).head(top_n)
@@ -1,6 +1,10 @@
-import matplotlib.pyplot as plt
+def _plt():
+    import matplotlib.pyplot as plt
+    return plt
+
 
 def plot_messages_per_month(series):
+    plt = _plt()
     fig, ax = plt.subplots(figsize=(12, 4))
     x = [str(p) for p in series.index]
     ax.plot(x, series.values, marker="o")
@@ -11,6 +15,7 @@ def plot_messages_per_month(series):
     return fig
 
 def plot_top_users_by_messages(series, top_n=20):
+    plt = _plt()
     top = series.sort_values(ascending=False).head(top_n)
     fig, ax = plt.subplots(figsize=(10, 8))
     ax.barh(top.index, top.values)
@@ -23,6 +28,7 @@ def plot_top_users_by_messages(series, top_n=20):
     return fig
 
 def plot_domination_balance(dom_df, top_n=20, mode="me"):
+    plt = _plt()
     df = dom_df[dom_df["total"] > 50].copy()
     if mode == "me":
         sorted_df = df.sort_values("balance", ascending=False).head(top_n)
@@ -37,6 +43,7 @@ def plot_domination_balance(dom_df, top_n=20, mode="me"):
     return fig
 
 def plot_heatmap(heat_df):
+    plt = _plt()
     fig, ax = plt.subplots(figsize=(12, 4))
     im = ax.imshow(heat_df.values, aspect="auto")
     ax.set_yticks(range(len(heat_df.index)))
@@ -52,6 +59,7 @@ def plot_heatmap(heat_df):
 def plot_top_reel_spammers(spammers_df, mode="me", top_n=15):
     if spammers_df.empty:
         return None
+    plt = _plt()
     df = spammers_df.copy()
     if mode == "me":
         df = df.sort_values("balance", ascending=False).head(top_n)
@@ -74,6 +82,7 @@ def plot_top_reel_spammers(spammers_df, mode="me", top_n=15):
 def plot_attachment_share(per_conv_df, top_n=15):
     if per_conv_df.empty:
         return None
+    plt = _plt()
     df = per_conv_df.sort_values("any_attachment_share", ascending=False).head(top_n)
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.barh(df.index, df["any_attachment_share"])
@@ -82,3 +91,78 @@ def plot_attachment_share(per_conv_df, top_n=15):
     ax.set_title("Most attachment-heavy conversations")
     fig.tight_layout()
     return fig
+
+
+def plot_monthly_series(series_by_label, ylabel="Items"):
+    plt = _plt()
+    fig, ax = plt.subplots(figsize=(12, 4))
+    for label, series in series_by_label.items():
+        if not series.empty:
+            ax.plot(series.index.to_timestamp(), series.values, label=label)
+    ax.set_xlabel("Month")
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def plot_rolling_counts(frame, window):
+    plt = _plt()
+    fig, ax = plt.subplots(figsize=(12, 4))
+    for column in frame.columns:
+        label = "All conversations" if column == "all" else column
+        ax.plot(frame.index, frame[column].to_numpy(), label=label, linewidth=1)
+    ax.set_xlabel("Date")
+    ax.set_ylabel(f"Messages in trailing {window} days")
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def plot_trend(trend, marks=None, title=None):
+    plt = _plt()
+    fig, ax = plt.subplots(figsize=(12, 4))
+    ax.plot(trend.index, trend["messages"].to_numpy(), label="Messages", linewidth=1)
+    ax.plot(trend.index, trend["baseline"].to_numpy(), label="Trailing baseline", linestyle="--")
+    if marks is not None and len(marks):
+        ax.scatter(marks.index, marks.to_numpy(), color="red", zorder=3, label="Anomaly")
+    ax.set_xlabel("Period")
+    ax.set_ylabel("Messages")
+    if title:
+        ax.set_title(title)
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def plot_likes_saves_per_month(likes, saves):
+    return plot_monthly_series({"Likes": likes, "Saves": saves}, ylabel="Posts")
+
+
+def plot_hour_of_day(likes, saves):
+    plt = _plt()
+    fig, ax = plt.subplots(figsize=(12, 4))
+    width = 0.4
+    ax.bar(likes.index - width / 2, likes.values, width=width, label="Likes")
+    ax.bar(saves.index + width / 2, saves.values, width=width, label="Saves")
+    ax.set_xticks(range(24))
+    ax.set_xlabel("Hour")
+    ax.set_ylabel("Posts")
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def plot_creator_trend(trend_df):
+    if trend_df.empty:
+        return None
+    plt = _plt()
+    fig, ax = plt.subplots(figsize=(12, 5))
+    x = trend_df.index.to_timestamp()
+    for creator in trend_df.columns:
+        ax.plot(x, trend_df[creator].values, label=creator)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Likes")
+    ax.legend(fontsize="small", ncol=2)
+    fig.tight_layout()
+    return fig
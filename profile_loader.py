@@ -1,5 +1,5 @@
 import os
-import json
+import export_json
 
 
 def get_profile_photo_path(export_root, personal_info_json):
@@ -7,8 +7,7 @@ def get_profile_photo_path(export_root, personal_info_json):
         return None
 
     try:
-        with open(personal_info_json, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = export_json.load(personal_info_json)
     except Exception:
         return None
 
@@ -0,0 +1,173 @@
+"""Overlapped read-ahead of whole files for the JSON parsers.
+
+On network shares a serial open -> read -> parse loop leaves the link idle
+while parsing and the CPU idle while reading. ``ReadAhead`` takes the file
+list up front and reads ahead on a small thread pool while the caller
+parses, handing bytes back in list order:
+
+* at most ``depth`` files are read or waiting to be parsed at any time;
+* at most ``max_bytes`` of them are in memory (a single larger file is still
+  read once nothing else is in flight).
+
+Defaults come from ``config.READAHEAD_WORKERS`` / ``READAHEAD_DEPTH`` /
+``READAHEAD_MAX_BYTES``. ``stats`` reports bytes, throughput, the time the
+parser waited for data (``stall_s``: I/O bound) and the time the reader
+waited for the parser to free budget (``throttle_s``: parse bound). Both
+totals are also recorded as ``instrument`` stages.
+
+    with ReadAhead(paths) as reader:
+        for path, raw in reader:
+            data = json.loads(raw)
+"""
+import os
+import queue
+import threading
+import time
+
+import config
+import instrument
+
+_DONE = object()
+
+
+def _read(path):
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        raw = f.read()
+    return raw, time.perf_counter() - t0
+
+
+class ReadAhead:
+    def __init__(self, paths, sizes=None, workers=None, depth=None, max_bytes=None,
+                 skip_errors=False, name="readahead"):
+        self.paths = list(paths)
+        self.sizes = sizes
+        self.workers = workers or config.READAHEAD_WORKERS
+        self.depth = depth or config.READAHEAD_DEPTH
+        self.max_bytes = max_bytes or config.READAHEAD_MAX_BYTES
+        self.skip_errors = skip_errors
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=self.depth)
+        self._budget = threading.Condition()
+        self._inflight = 0
+        self._stop = threading.Event()
+        self._pool = None
+        self._producer = None
+        self._started = None
+        self.stats = {
+            "files": 0, "bytes": 0, "errors": 0, "seconds": 0.0, "read_s": 0.0,
+            "stall_s": 0.0, "throttle_s": 0.0, "peak_inflight_bytes": 0,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _size(self, path):
+        if self.sizes is not None and path in self.sizes:
+            return self.sizes[path]
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _produce(self):
+        try:
+            for path in self.paths:
+                size = self._size(path)
+                t0 = time.perf_counter()
+                with self._budget:
+                    while self._inflight and self._inflight + size > self.max_bytes and not self._stop.is_set():
+                        self._budget.wait(0.1)
+                    self._inflight += size
+                    self.stats["peak_inflight_bytes"] = max(self.stats["peak_inflight_bytes"], self._inflight)
+                if self._stop.is_set():
+                    return
+                item = (path, size, self._pool.submit(_read, path))
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                self.stats["throttle_s"] += time.perf_counter() - t0
+        finally:
+            self._queue.put(_DONE)
+
+    def _release(self, size):
+        with self._budget:
+            self._inflight -= size
+            self._budget.notify()
+
+    def __iter__(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._started = time.perf_counter()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        self._producer = threading.Thread(target=self._produce, name=f"{self.name}:list", daemon=True)
+        self._producer.start()
+
+        stats = self.stats
+        try:
+            while True:
+                t0 = time.perf_counter()
+                item = self._queue.get()
+                if item is _DONE:
+                    stats["stall_s"] += time.perf_counter() - t0
+                    break
+                path, size, future = item
+                try:
+                    raw, read_s = future.result()
+                except OSError:
+                    stats["stall_s"] += time.perf_counter() - t0
+                    self._release(size)
+                    stats["errors"] += 1
+                    if self.skip_errors:
+                        continue
+                    raise
+                stats["stall_s"] += time.perf_counter() - t0
+                stats["files"] += 1
+                stats["bytes"] += len(raw)
+                stats["read_s"] += read_s
+                try:
+                    yield path, raw
+                finally:
+                    self._release(size)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop reading ahead and record the stats (safe to call twice)."""
+        if self._started is None or self._stop.is_set():
+            return
+        self._stop.set()
+        with self._budget:
+            self._budget.notify_all()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                if not self._producer.is_alive():
+                    break
+                time.sleep(0.01)
+                continue
+            if item is not _DONE:
+                item[2].cancel()
+        self._producer.join()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+        stats = self.stats
+        stats["seconds"] = time.perf_counter() - self._started
+        stats["bytes_per_s"] = stats["bytes"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        instrument.add_stage(f"{self.name}.read", stats["read_s"], rows=stats["files"], bytes_read=stats["bytes"])
+        instrument.add_stage(f"{self.name}.stall", stats["stall_s"], rows=stats["files"])
+
+    def progress(self):
+        """Copy of ``stats`` with throughput so far (bytes per second)."""
+        stats = dict(self.stats)
+        elapsed = (time.perf_counter() - self._started) if self._started else 0.0
+        stats["bytes_per_s"] = stats["bytes"] / elapsed if elapsed > 0 else 0.0
+        return stats
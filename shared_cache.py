@@ -0,0 +1,233 @@
+"""Process-wide cache for loaded exports and aggregates, bounded in memory.
+
+One Streamlit server may serve several users opening different exports.
+Every session gets the same cached objects (no per-session pickled copies),
+and the total size of what is held in memory is capped by
+``config.SHARED_CACHE_MAX_BYTES``. When a new entry pushes the total over the
+cap, least recently used entries are spilled to ``CACHE_DIR/shared`` with
+pickle protocol 5 and dropped from memory; the next ``get`` reloads them
+from disk instead of re-parsing the export.
+
+Frames are handed out through ``view``: a shallow copy that shares the
+cached column buffers. Under pandas copy-on-write (always on from pandas 3,
+which requirements.txt pins) any write to a view copies the touched block
+first, so no session can modify the shared frame.
+``origin`` maps a view back to the cached frame for modules that keep side
+tables keyed by frame identity.
+
+Usage is tracked per export (the ``owner`` given to ``put``): bytes in
+memory and on disk, memory hits, disk reloads, misses and evictions.
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+import weakref
+
+import config
+import instrument
+
+_lock = threading.Lock()
+_entries = {}
+_usage = {}
+_views = {}
+
+
+def _new_usage():
+    return {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "last_access": None}
+
+
+def _spill_path(key):
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(config.CACHE_DIR, "shared", f"{digest}.pkl")
+
+
+def _default_dump(value, path):
+    with open(path, "wb") as f:
+        pickle.dump(value, f, protocol=5)
+
+
+def _default_load(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def estimate_bytes(value):
+    """Rough in-memory size of frames, series, arrays and tuples of them."""
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_bytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(estimate_bytes(v) for v in value.values())
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        used = memory_usage(index=True, deep=True)
+        return int(used.sum()) if hasattr(used, "sum") else int(used)
+    return int(getattr(value, "nbytes", 0))
+
+
+def put(key, value, owner=None, nbytes=None, dump=None, load=None):
+    """Cache ``value`` under ``key`` and evict LRU entries if over the cap.
+
+    ``dump(value, path)`` / ``load(path)`` spill and restore the entry
+    (pickle by default); pass ``dump=False`` for entries that should simply
+    be dropped when evicted.
+    """
+    nbytes = estimate_bytes(value) if nbytes is None else nbytes
+    with _lock:
+        old = _entries.get(key)
+        if old is not None and old["path"] and os.path.exists(old["path"]):
+            os.remove(old["path"])
+        _entries[key] = {
+            "value": value,
+            "owner": owner,
+            "nbytes": nbytes,
+            "disk_bytes": 0,
+            "path": None,
+            "dump": _default_dump if dump is None else dump,
+            "load": load or _default_load,
+            "last_access": time.monotonic(),
+        }
+        _usage.setdefault(owner, _new_usage())
+    _enforce_cap(keep=key)
+    return value
+
+
+def get(key, default=None):
+    """Cached value for ``key`` (reloading it from disk if it was spilled)."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return default
+        usage = _usage.setdefault(entry["owner"], _new_usage())
+        usage["last_access"] = time.time()
+        entry["last_access"] = time.monotonic()
+        if entry["value"] is not None:
+            usage["hits"] += 1
+            return entry["value"]
+        path = entry["path"]
+
+    if path is None or not os.path.exists(path):
+        with _lock:
+            _entries.pop(key, None)
+            usage["misses"] += 1
+        return default
+
+    with instrument.span("shared_cache.restore") as sp:
+        value = entry["load"](path)
+        sp["bytes_read"] = entry["disk_bytes"]
+    with _lock:
+        entry["value"] = value
+        usage["disk_hits"] += 1
+    _enforce_cap(keep=key)
+    return value
+
+
+def record_miss(owner):
+    with _lock:
+        _usage.setdefault(owner, _new_usage())["misses"] += 1
+
+
+def _enforce_cap(keep=None):
+    limit = config.SHARED_CACHE_MAX_BYTES
+    while True:
+        with _lock:
+            resident = [(e["last_access"], k) for k, e in _entries.items() if e["value"] is not None]
+            total = sum(_entries[k]["nbytes"] for _, k in resident)
+            victims = [k for _, k in sorted(resident) if k != keep]
+            if total <= limit or not victims:
+                return
+            key = victims[0]
+            entry = _entries[key]
+            value = entry["value"]
+        _evict(key, entry, value)
+
+
+def _evict(key, entry, value):
+    path = entry["path"]
+    if entry["dump"] and not (path and os.path.exists(path)):
+        path = _spill_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with instrument.span("shared_cache.spill") as sp:
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            entry["dump"](value, tmp)
+            os.replace(tmp, path)
+            sp["bytes_read"] = os.path.getsize(path)
+    with _lock:
+        if _entries.get(key) is not entry:
+            return
+        entry["value"] = None
+        if entry["dump"]:
+            entry["path"] = path
+            entry["disk_bytes"] = os.path.getsize(path)
+        else:
+            _entries.pop(key)
+        _usage.setdefault(entry["owner"], _new_usage())["evictions"] += 1
+
+
+def discard(key):
+    """Drop ``key`` from memory and disk."""
+    with _lock:
+        entry = _entries.pop(key, None)
+    if entry is not None and entry["path"] and os.path.exists(entry["path"]):
+        os.remove(entry["path"])
+
+
+def keys():
+    with _lock:
+        return list(_entries)
+
+
+def discard_owner(owner):
+    with _lock:
+        keys = [k for k, e in _entries.items() if e["owner"] == owner]
+    for key in keys:
+        discard(key)
+
+
+def view(df):
+    """Zero-copy, copy-on-write view of a cached frame."""
+    v = df.copy(deep=False)
+    key = id(v)
+    with _lock:
+        _views[key] = (weakref.ref(v, lambda _, key=key: _drop_view(key)), df)
+    return v
+
+
+def _drop_view(key):
+    with _lock:
+        _views.pop(key, None)
+
+
+def origin(df):
+    """The cached frame ``df`` is a view of (``df`` itself otherwise)."""
+    with _lock:
+        hit = _views.get(id(df))
+    if hit is not None and hit[0]() is df:
+        return hit[1]
+    return df
+
+
+def usage():
+    """Per-owner usage: entries, bytes in memory / on disk, hits, reloads, evictions."""
+    import pandas as pd
+
+    with _lock:
+        rows = {}
+        for owner, counters in _usage.items():
+            rows[owner] = dict(counters, entries=0, memory_bytes=0, disk_bytes=0)
+        for entry in _entries.values():
+            row = rows[entry["owner"]]
+            row["entries"] += 1
+            if entry["value"] is not None:
+                row["memory_bytes"] += entry["nbytes"]
+            row["disk_bytes"] += entry["disk_bytes"]
+    columns = ["owner", "entries", "memory_bytes", "disk_bytes", "hits", "disk_hits", "misses", "evictions", "last_access"]
+    frame = pd.DataFrame([dict(row, owner=owner) for owner, row in rows.items()], columns=columns)
+    frame["last_access"] = pd.to_datetime(frame["last_access"], unit="s")
+    return frame.sort_values("memory_bytes", ascending=False, ignore_index=True)
+
+
+def memory_bytes():
+    with _lock:
+        return sum(e["nbytes"] for e in _entries.values() if e["value"] is not None)
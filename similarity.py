@@ -0,0 +1,189 @@
+"""Conversation similarity and clustering over per-conversation feature vectors.
+
+Each conversation becomes one fixed-width row:
+
+* its 7x24 day-of-week/hour profile (the per-conversation ``heatmap_data``,
+  as shares of its messages);
+* reel / image / attachment-only shares (``media_stats_per_conversation``);
+* my share of messages (``domination_stats``);
+* mean words per message for me and for them, log-scaled.
+
+Every block is built with ``np.bincount`` over conversation codes rather than
+per-conversation groupbys. Columns are standardised and each block is scaled
+by ``1/sqrt(width)`` so the 168 heatmap columns weigh as much as one scalar
+feature. Nearest neighbours are cosine similarities computed blockwise with
+matrix products; clustering is k-means with k-means++ seeding.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from instrument import traced
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+HEATMAP_CELLS = 7 * 24
+SCALAR_FEATURES = ["reel_share", "image_share", "attachment_share", "me_share", "me_words", "them_words"]
+
+# Rows of the similarity matrix computed per matrix product.
+BLOCK_ROWS = 1024
+
+
+@traced
+def feature_matrix(df: pd.DataFrame, min_messages=20):
+    """``(conversations, X, columns)`` for conversations with ``min_messages``+."""
+    import numpy as np
+    import pandas as pd
+
+    codes, convs = pd.factorize(df["conversation"].to_numpy())
+    n = len(convs)
+    total = np.bincount(codes, minlength=n).astype("float64")
+    keep = total >= min_messages
+    safe = np.maximum(total, 1)
+
+    cell = df["dow"].to_numpy(dtype="int64") * 24 + df["hour"].to_numpy(dtype="int64")
+    heat = np.bincount(codes * HEATMAP_CELLS + cell, minlength=n * HEATMAP_CELLS)
+    heat = heat.reshape(n, HEATMAP_CELLS) / safe[:, None]
+
+    def share(mask):
+        return np.bincount(codes, weights=np.asarray(mask, dtype="float64"), minlength=n) / safe
+
+    mine = (df["direction"] == "me").to_numpy()
+    words = df["word_count"].to_numpy(dtype="float64")
+    me_n = np.bincount(codes, weights=mine, minlength=n)
+    me_words = np.bincount(codes, weights=words * mine, minlength=n) / np.maximum(me_n, 1)
+    them_words = np.bincount(codes, weights=words * ~mine, minlength=n) / np.maximum(total - me_n, 1)
+
+    scalars = np.column_stack([
+        share(df["has_reel"].to_numpy()),
+        share(df["has_image"].to_numpy()),
+        share(df["attachment_text_only"].to_numpy()),
+        me_n / safe,
+        np.log1p(me_words),
+        np.log1p(them_words),
+    ])
+
+    X = np.hstack([heat, scalars])[keep]
+    columns = [f"d{d}h{h}" for d in range(7) for h in range(24)] + SCALAR_FEATURES
+    return pd.Index(convs[keep], name="conversation"), X.astype("float32"), columns
+
+
+def standardise(X):
+    """Z-score columns and scale the heatmap block down to the weight of one feature."""
+    import numpy as np
+
+    std = X.std(axis=0)
+    Z = (X - X.mean(axis=0)) / np.where(std > 0, std, 1)
+    Z[:, :HEATMAP_CELLS] /= np.sqrt(HEATMAP_CELLS)
+    return Z.astype("float32")
+
+
+@traced
+def nearest_neighbours(X, k=5):
+    """``(idx, sim)``: each row's ``k`` most cosine-similar other rows."""
+    import numpy as np
+
+    n = len(X)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.zeros((n, 0), dtype="int64"), np.zeros((n, 0), dtype="float32")
+
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    U = X / np.where(norms > 0, norms, 1)
+    idx = np.empty((n, k), dtype="int64")
+    sim = np.empty((n, k), dtype="float32")
+    for start in range(0, n, BLOCK_ROWS):
+        S = U[start:start + BLOCK_ROWS] @ U.T
+        rows = np.arange(len(S))
+        S[rows, start + rows] = -np.inf
+        part = np.argpartition(-S, k - 1, axis=1)[:, :k]
+        vals = np.take_along_axis(S, part, axis=1)
+        order = np.argsort(-vals, axis=1)
+        idx[start:start + len(S)] = np.take_along_axis(part, order, axis=1)
+        sim[start:start + len(S)] = np.take_along_axis(vals, order, axis=1)
+    return idx, sim
+
+
+def _sq_dists(X, C):
+    d = (X * X).sum(axis=1)[:, None] - 2 * X @ C.T + (C * C).sum(axis=1)[None, :]
+    return d.clip(min=0)
+
+
+@traced
+def kmeans(X, k, iters=50, seed=0):
+    """``(labels, centroids)`` from Lloyd's algorithm with k-means++ seeding."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    k = max(1, min(k, n))
+
+    centroids = [X[rng.integers(n)]]
+    closest = _sq_dists(X, centroids[0][None, :])[:, 0]
+    for _ in range(1, k):
+        total = closest.sum()
+        pick = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centroids.append(X[pick])
+        closest = np.minimum(closest, _sq_dists(X, X[pick][None, :])[:, 0])
+    C = np.array(centroids)
+
+    labels = np.full(n, -1)
+    for _ in range(iters):
+        new = _sq_dists(X, C).argmin(axis=1)
+        if np.array_equal(new, labels):
+            break
+        labels = new
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(C)
+        np.add.at(sums, labels, X)
+        filled = counts > 0
+        C[filled] = sums[filled] / counts[filled, None]
+    return labels, C
+
+
+@traced
+def similar_conversations(df: pd.DataFrame, k=5, min_messages=20):
+    """One row per (conversation, neighbour) with cosine similarity."""
+    import numpy as np
+    import pandas as pd
+
+    convs, X, _ = feature_matrix(df, min_messages=min_messages)
+    idx, sim = nearest_neighbours(standardise(X), k=k)
+    return pd.DataFrame({
+        "conversation": np.repeat(convs.to_numpy(), idx.shape[1]),
+        "rank": np.tile(np.arange(1, idx.shape[1] + 1), len(convs)),
+        "neighbour": convs.to_numpy()[idx.ravel()],
+        "similarity": sim.ravel().round(3),
+    })
+
+
+@traced
+def conversation_clusters(df: pd.DataFrame, k=6, min_messages=20, seed=0):
+    """``(members, profile)``: cluster of every conversation and per-cluster means.
+
+    The profile reports the unstandardised scalar features plus each
+    cluster's peak hour, so clusters can be described in plain terms.
+    """
+    import numpy as np
+    import pandas as pd
+
+    convs, X, columns = feature_matrix(df, min_messages=min_messages)
+    if len(convs) == 0:
+        return pd.DataFrame(columns=["conversation", "cluster"]), pd.DataFrame()
+    labels, _ = kmeans(standardise(X), k, seed=seed)
+
+    members = pd.DataFrame({"conversation": convs.to_numpy(), "cluster": labels})
+    counts = np.bincount(labels)
+    sums = np.zeros((len(counts), X.shape[1]))
+    np.add.at(sums, labels, X)
+    means = sums / np.maximum(counts, 1)[:, None]
+
+    hourly = means[:, :HEATMAP_CELLS].reshape(-1, 7, 24).sum(axis=1)
+    profile = pd.DataFrame(means[:, HEATMAP_CELLS:], columns=SCALAR_FEATURES)
+    profile.insert(0, "conversations", counts)
+    profile["peak_hour"] = hourly.argmax(axis=1)
+    profile["me_words"] = np.expm1(profile["me_words"])
+    profile["them_words"] = np.expm1(profile["them_words"])
+    profile = profile[profile["conversations"] > 0].round(3)
+    return members, profile.rename_axis("cluster").reset_index()
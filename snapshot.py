@@ -0,0 +1,450 @@
+"""Precomputed dashboard snapshots that open without the raw export.
+
+A snapshot is a zip holding ``manifest.json`` and one Parquet file per
+aggregate table. The manifest records the format version, the export it was
+built from, scalar results (``global_user_stats``, counts, ...) and, for
+each table, how to restore its index, columns and period dtypes. Tables are
+read lazily, so opening a snapshot costs one manifest read and each section
+only decodes the tables it shows.
+
+``AGGREGATES`` names every aggregate the app sections use. ``LiveSource``
+computes them from the message frame; ``Snapshot`` reads them from a file.
+Both expose ``get(name)``, so sections do not care which one they render.
+Older format versions still open: ``Snapshot.notice`` says what they lack,
+and version 1 text (written before ``export_json`` repaired the export's
+mojibake) is repaired as tables are read.
+
+    python snapshot.py EXPORT_ROOT OUT.igsnap
+"""
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+import config
+import instrument
+
+FORMAT = "ig_stats.snapshot"
+# 2: text repaired at parse time (export_json); busiest_windows_*, top_anomalies
+#    and change_points tables.
+VERSION = 2
+# Older versions that still open, with what the app tells the user about them.
+OLDER_VERSIONS = {
+    1: "This snapshot uses format 1: its names and text are repaired as they are read, and it "
+       "may lack the busiest-window and trend tables. Rebuild it from the export for the full dashboard.",
+}
+
+# Rows kept for the long "top N" tables.
+TOP_N = 500
+
+# Windows whose per-conversation "busiest stretch" table is precomputed.
+BUSIEST_WINDOW_DAYS = (7, 30)
+
+AGGREGATES = {}
+
+
+def aggregate(name, needs_likes=False):
+    """Register ``fn(df, export_root)`` as the aggregate ``name``."""
+    def register(fn):
+        AGGREGATES[name] = {"fn": fn, "needs_likes": needs_likes}
+        return fn
+    return register
+
+
+# ------------------------------------------------------------
+# Aggregates
+# ------------------------------------------------------------
+
+def _stats(fn_name, **kwargs):
+    def compute(df, export_root):
+        import stats_core
+        return getattr(stats_core, fn_name)(df, **kwargs)
+    return compute
+
+
+for _name in (
+    "global_user_stats", "messages_per_month", "messages_per_day", "most_active_day",
+    "user_time_stats", "words_per_user", "direction_word_stats",
+    "per_conversation_message_length_diff", "domination_stats", "heatmap_data",
+    "media_stats_overall", "media_stats_per_conversation", "reel_spammer_stats",
+    "attachment_heavy_stats",
+):
+    aggregate(_name)(_stats(_name))
+aggregate("longest_conversations_by_messages")(_stats("longest_conversations_by_messages", top_n=20))
+aggregate("longest_conversations_by_duration")(_stats("longest_conversations_by_duration", top_n=20))
+
+
+def _busiest_windows(days):
+    def compute(df, export_root):
+        import timeline_index
+        return timeline_index.best_windows(timeline_index.build_index(df), days).head(TOP_N)
+    return compute
+
+
+for _days in BUSIEST_WINDOW_DAYS:
+    aggregate(f"busiest_windows_{_days}d")(_busiest_windows(_days))
+
+
+@aggregate("top_anomalies")
+def _top_anomalies(df, export_root):
+    import trends
+    return trends.top_anomalies(trends.detect(df), top_n=TOP_N)
+
+
+@aggregate("change_points")
+def _change_points(df, export_root):
+    import trends
+    return trends.change_points(trends.detect(df), top_n=TOP_N)
+
+
+@aggregate("likes_summary", needs_likes=True)
+def _likes_summary(df, export_root):
+    import likes_stats
+
+    liked = likes_stats.load_liked_posts(export_root)
+    saved = likes_stats.load_saved_posts(export_root)
+    return {"liked": len(liked), "saved": len(saved)}
+
+
+def _likes_table(loader, compute):
+    def run(df, export_root):
+        import likes_stats
+        return compute(likes_stats, getattr(likes_stats, loader)(export_root))
+    return run
+
+
+def _top_creators(column):
+    def compute(ls, items):
+        import pandas as pd
+        return pd.DataFrame(ls.liked_per_creator(items, top_n=None), columns=["creator", column])
+    return compute
+
+
+aggregate("top_liked", needs_likes=True)(_likes_table("load_liked_posts", _top_creators("likes")))
+aggregate("top_saved", needs_likes=True)(_likes_table("load_saved_posts", _top_creators("saves")))
+aggregate("likes_per_month", needs_likes=True)(_likes_table("load_liked_posts", lambda ls, i: ls.per_month(i)))
+aggregate("saves_per_month", needs_likes=True)(_likes_table("load_saved_posts", lambda ls, i: ls.per_month(i)))
+aggregate("likes_per_hour", needs_likes=True)(_likes_table("load_liked_posts", lambda ls, i: ls.per_hour(i)))
+aggregate("saves_per_hour", needs_likes=True)(_likes_table("load_saved_posts", lambda ls, i: ls.per_hour(i)))
+aggregate("liked_creator_trend", needs_likes=True)(
+    _likes_table("load_liked_posts", lambda ls, i: ls.creator_trend(i, top_n=20))
+)
+
+
+@aggregate("reaction_summary")
+def _reaction_summary(df, export_root):
+    import engagement
+
+    return {
+        "reactions": len(engagement.reactions_table(df)),
+        "reacted_messages": int((df["reaction_count"] > 0).sum()) if "reaction_count" in df else 0,
+        "shared_posts": int(df["share_owner"].notna().sum()) if "share_owner" in df else 0,
+    }
+
+
+def _engagement(fn_name, **kwargs):
+    def compute(df, export_root):
+        import engagement
+        return getattr(engagement, fn_name)(df, **kwargs)
+    return compute
+
+
+aggregate("most_reacted_messages")(_engagement("most_reacted_messages", top_n=TOP_N))
+aggregate("who_reacts_to_whom")(_engagement("who_reacts_to_whom", top_n=TOP_N))
+aggregate("reactions_by_emoji")(_engagement("reactions_by_emoji"))
+aggregate("most_shared_creators")(_engagement("most_shared_creators", top_n=TOP_N))
+
+
+@aggregate("participant_summary")
+def _participant_summary(df, export_root):
+    import participants
+
+    index = participants.build_index(df)
+    return {
+        "participants": len(index["names"]),
+        "group_chats": int((index["members"] > 2).sum()),
+        "reply_pairs": len(index["replies"]["data"]),
+    }
+
+
+@aggregate("top_interaction_pairs")
+def _top_pairs(df, export_root):
+    import participants
+    return participants.top_interaction_pairs(df, top_n=TOP_N)
+
+
+@aggregate("messages_per_participant")
+def _per_participant(df, export_root):
+    import participants
+    return participants.messages_per_participant(df)
+
+
+@aggregate("contacts")
+def _contacts(df, export_root):
+    import participants
+    return participants.contacts(df)
+
+
+# ------------------------------------------------------------
+# Sources
+# ------------------------------------------------------------
+
+class LiveSource:
+    """Aggregates computed on demand from the loaded message frame."""
+
+    def __init__(self, df, export_root, my_name):
+        self.df = df
+        self.export_root = export_root
+        self.my_name = my_name
+
+    def get(self, name):
+        return AGGREGATES[name]["fn"](self.df, self.export_root)
+
+
+class Snapshot:
+    """Aggregates read lazily from a snapshot file (path or file object)."""
+
+    def __init__(self, path_or_file):
+        self._zip = zipfile.ZipFile(path_or_file)
+        self.manifest = json.loads(self._zip.read("manifest.json"))
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError("Not a dashboard snapshot")
+        self.version = self.manifest.get("version")
+        if self.version != VERSION and self.version not in OLDER_VERSIONS:
+            raise ValueError(f"Unsupported snapshot version: {self.version}")
+        self.notice = OLDER_VERSIONS.get(self.version)
+        self.export_root = self.manifest["export_root"]
+        self.my_name = self.manifest["my_name"]
+        if self.version < 2 and self.my_name:
+            self.my_name = _repair_text(self.my_name)
+        self._tables = {}
+
+    def __contains__(self, name):
+        return name in self.manifest["values"]
+
+    def get(self, name):
+        if name not in self._tables:
+            with instrument.span(f"snapshot.read.{name}"):
+                value = _decode(self.manifest["values"][name], self._zip)
+                self._tables[name] = _repair_text(value) if self.version < 2 else value
+        return self._tables[name]
+
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+def open_cached(path):
+    """``Snapshot`` for ``path``, shared until the file changes."""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    with _open_lock:
+        hit = _open.get(key)
+    if hit is not None and hit[0] == (st.st_mtime_ns, st.st_size):
+        return hit[1]
+    snap = Snapshot(path)
+    with _open_lock:
+        _open[key] = ((st.st_mtime_ns, st.st_size), snap)
+    return snap
+
+
+# ------------------------------------------------------------
+# Encoding
+# ------------------------------------------------------------
+
+def _jsonable(value):
+    """Scalars/dicts/tuples as JSON, with timestamps and dates tagged."""
+    import datetime
+
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, dict):
+        return {"dict": {k: _jsonable(v) for k, v in value.items()}}
+    if isinstance(value, tuple):
+        return {"tuple": [_jsonable(v) for v in value]}
+    if isinstance(value, pd.Timestamp):
+        return {"timestamp": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"date": value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _from_jsonable(value):
+    import datetime
+
+    import pandas as pd
+
+    if isinstance(value, dict):
+        if "dict" in value:
+            return {k: _from_jsonable(v) for k, v in value["dict"].items()}
+        if "tuple" in value:
+            return tuple(_from_jsonable(v) for v in value["tuple"])
+        if "timestamp" in value:
+            return pd.Timestamp(value["timestamp"])
+        if "date" in value:
+            return datetime.date.fromisoformat(value["date"])
+    return value
+
+
+def _encode(name, value, zf):
+    """Write ``value`` into ``zf`` and return its manifest entry."""
+    import pandas as pd
+
+    if isinstance(value, tuple) and any(isinstance(v, (pd.DataFrame, pd.Series)) for v in value):
+        return {"kind": "tuple", "items": [_encode(f"{name}.{i}", v, zf) for i, v in enumerate(value)]}
+    if not isinstance(value, (pd.DataFrame, pd.Series)):
+        return {"kind": "json", "value": _jsonable(value)}
+
+    entry = {"kind": "series" if isinstance(value, pd.Series) else "frame", "file": f"{name}.parquet"}
+    if isinstance(value, pd.Series):
+        entry["name"] = _jsonable(value.name)
+        value = value.to_frame("__value__")
+
+    entry["columns"] = [_jsonable(c) for c in value.columns]
+    entry["columns_name"] = value.columns.name
+    entry["index"] = list(value.index.names)
+    frame = value.copy()
+    frame.columns = [str(c) for c in frame.columns]
+    frame.columns = [c if c not in entry["index"] else f"__col__{c}" for c in frame.columns]
+    frame = frame.reset_index(names=[f"__index__{i}" for i in range(frame.index.nlevels)])
+
+    periods = {}
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.PeriodDtype):
+            periods[col] = str(frame[col].dtype)[len("period["):-1]
+            frame[col] = frame[col].astype(str)
+    entry["periods"] = periods
+
+    buf = io.BytesIO()
+    frame.to_parquet(buf, index=False)
+    zf.writestr(entry["file"], buf.getvalue())
+    return entry
+
+
+def _decode(entry, zf):
+    import pandas as pd
+
+    kind = entry["kind"]
+    if kind == "json":
+        return _from_jsonable(entry["value"])
+    if kind == "tuple":
+        return tuple(_decode(item, zf) for item in entry["items"])
+
+    frame = pd.read_parquet(io.BytesIO(zf.read(entry["file"])))
+    for col, freq in entry["periods"].items():
+        frame[col] = pd.PeriodIndex(frame[col], freq=freq)
+    index_cols = [f"__index__{i}" for i in range(len(entry["index"]))]
+    frame = frame.set_index(index_cols)
+    frame.index.names = entry["index"]
+    frame.columns = pd.Index([_from_jsonable(c) for c in entry["columns"]], name=entry["columns_name"])
+
+    if kind == "series":
+        return frame["__value__"].rename(_from_jsonable(entry["name"]))
+    return frame
+
+
+def _repaired_values(values):
+    import export_json
+
+    values = list(values)
+    at = [i for i, v in enumerate(values) if isinstance(v, str)]
+    for i, fixed in zip(at, export_json.repair_strings(values[i] for i in at)):
+        values[i] = fixed
+    return values
+
+
+def _repaired_labels(index):
+    import pandas as pd
+
+    if isinstance(index, pd.MultiIndex):
+        return index.set_levels([_repaired_labels(level) for level in index.levels])
+    if index.dtype == object or pd.api.types.is_string_dtype(index.dtype):
+        return pd.Index(_repaired_values(index), dtype=index.dtype, name=index.name)
+    return index
+
+
+def _repaired_column(col):
+    import pandas as pd
+
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.rename_categories(_repaired_values(col.cat.categories))
+    if col.dtype == object or pd.api.types.is_string_dtype(col.dtype):
+        return pd.Series(_repaired_values(col), index=col.index, dtype=col.dtype, name=col.name)
+    return col
+
+
+def _repair_text(value):
+    """``value`` from a version 1 snapshot with its export mojibake repaired."""
+    import pandas as pd
+
+    if isinstance(value, str):
+        return _repaired_values([value])[0]
+    if isinstance(value, tuple):
+        return tuple(_repair_text(v) for v in value)
+    if isinstance(value, dict):
+        return {_repair_text(k): _repair_text(v) for k, v in value.items()}
+    if isinstance(value, pd.Series):
+        out = _repaired_column(value)
+        out.index = _repaired_labels(value.index)
+        return out
+    if isinstance(value, pd.DataFrame):
+        out = pd.DataFrame({i: _repaired_column(value.iloc[:, i]) for i in range(value.shape[1])})
+        out.columns = _repaired_labels(value.columns)
+        out.index = _repaired_labels(value.index)
+        return out
+    return value
+
+
+def build_snapshot(df, export_root, my_name, out):
+    """Compute every aggregate and write a snapshot to ``out`` (path or file)."""
+    has_likes = os.path.isdir(config.resolve_paths(export_root)["YOUR_IG_ACTIVITY"])
+    source = LiveSource(df, export_root, my_name)
+
+    with instrument.span("snapshot.build") as sp:
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as zf:
+            values = {}
+            for name, spec in AGGREGATES.items():
+                if spec["needs_likes"] and not has_likes:
+                    continue
+                values[name] = _encode(name, source.get(name), zf)
+            manifest = {
+                "format": FORMAT,
+                "version": VERSION,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "export_root": os.path.abspath(export_root),
+                "my_name": my_name,
+                "messages": len(df),
+                "values": values,
+            }
+            zf.writestr("manifest.json", json.dumps(manifest, indent=1))
+        sp["rows"] = len(values)
+
+
+def snapshot_bytes(df, export_root, my_name):
+    buf = io.BytesIO()
+    build_snapshot(df, export_root, my_name, buf)
+    return buf.getvalue()
+
+
+def main(argv=None):
+    import argparse
+
+    import ingest
+
+    ap = argparse.ArgumentParser(description="Write a precomputed dashboard snapshot.")
+    ap.add_argument("export_root")
+    ap.add_argument("out")
+    args = ap.parse_args(argv)
+
+    df, my_name = ingest.get_job(args.export_root).wait()
+    build_snapshot(df, args.export_root, my_name, args.out)
+    print(f"wrote {args.out} ({os.path.getsize(args.out) / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,13 @@
-import pandas as pd
+from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+from instrument import traced
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+@traced
 def global_user_stats(df: pd.DataFrame):
     total_msgs = len(df)
     my_mask = df["direction"] == "me"
@@ -65,18 +73,22 @@ def global_user_stats(df: pd.DataFrame):
 
 
 
+@traced
 def messages_per_month(df: pd.DataFrame):
     return df.groupby("month").size().sort_index()
 
+@traced
 def messages_per_day(df: pd.DataFrame):
     return df.groupby("date").size().sort_index()
 
+@traced
 def most_active_day(df: pd.DataFrame):
     per_day = messages_per_day(df)
     if per_day.empty:
         return None, 0
     return per_day.idxmax(), per_day.max()
 
+@traced
 def user_span(df: pd.DataFrame):
     span = df.groupby("conversation")["timestamp"].agg(["min", "max"])
     span = span.rename(columns={"min": "first_message", "max": "last_message"})
@@ -85,9 +97,11 @@ def user_span(df: pd.DataFrame):
 
 
 
+@traced
 def messages_per_user(df: pd.DataFrame):
     return df.groupby("conversation").size().rename("total_msgs")
 
+@traced
 def user_time_stats(df: pd.DataFrame):
     msgs = messages_per_user(df)
     span = user_span(df)
@@ -95,12 +109,15 @@ def user_time_stats(df: pd.DataFrame):
     stats["msgs_per_day"] = stats["total_msgs"] / stats["duration_days"]
     return stats
 
+@traced
 def words_per_user(df: pd.DataFrame):
     return df.groupby("conversation")["word_count"].sum().sort_values(ascending=False)
 
+@traced
 def direction_word_stats(df: pd.DataFrame):
     return df.groupby("direction")["word_count"].agg(["mean", "sum", "count"])
 
+@traced
 def per_conversation_message_length_diff(df: pd.DataFrame):
     g = df.groupby(["conversation", "direction"])["word_count"].mean().unstack(fill_value=0)
     if "me" not in g:
@@ -110,6 +127,7 @@ def per_conversation_message_length_diff(df: pd.DataFrame):
     g["me_minus_them"] = g["me"] - g["them"]
     return g
 
+@traced
 def domination_stats(df: pd.DataFrame):
     counts = df.groupby(["conversation", "direction"]).size().unstack(fill_value=0)
     if "me" not in counts:
@@ -123,23 +141,27 @@ def domination_stats(df: pd.DataFrame):
     counts["balance"] = counts["me_share"] - counts["them_share"]
     return counts
 
+@traced
 def heatmap_data(df: pd.DataFrame):
     heat = df.groupby(["dow", "hour"]).size().unstack(fill_value=0)
     heat = heat.reindex(index=sorted(heat.index))
     return heat
 
+@traced
 def longest_conversations_by_messages(df: pd.DataFrame, top_n=20):
     msgs = messages_per_user(df)
     return msgs.sort_values(ascending=False).head(top_n)
 
+@traced
 def longest_conversations_by_duration(df: pd.DataFrame, top_n=20):
     stats = user_time_stats(df)
     return stats.sort_values("duration_days", ascending=False).head(top_n)
 
 
 
+@traced
 def media_stats_overall(df: pd.DataFrame):
-    df = df.copy()
+    df = df[["direction", "has_reel", "has_image", "attachment_text_only"]]
     df["has_any_attachment"] = df["has_reel"] | df["has_image"] | df["attachment_text_only"]
 
     total = len(df)
@@ -165,8 +187,9 @@ def media_stats_overall(df: pd.DataFrame):
     return overall, by_dir
 
 
+@traced
 def media_stats_per_conversation(df: pd.DataFrame):
-    df = df.copy()
+    df = df[["conversation", "has_reel", "has_image", "attachment_text_only"]]
     df["has_any_attachment"] = df["has_reel"] | df["has_image"] | df["attachment_text_only"]
     g = df.groupby("conversation").agg(
         total_msgs=("conversation", "size"),
@@ -179,8 +202,10 @@ def media_stats_per_conversation(df: pd.DataFrame):
         g[col + "_share"] = g[col] / g["total_msgs"]
     return g
 
+@traced
 def reel_spammer_stats(df: pd.DataFrame):
     if "has_reel" not in df.columns:
+        import pandas as pd
         return pd.DataFrame()
 
     reels = df[df["has_reel"]]
@@ -196,11 +221,13 @@ def reel_spammer_stats(df: pd.DataFrame):
     return g
 
 
+@traced
 def attachment_heavy_stats(df: pd.DataFrame):
     if not {"has_reel", "has_image", "attachment_text_only"}.issubset(df.columns):
+        import pandas as pd
         return pd.DataFrame()
 
-    df = df.copy()
+    df = df[["conversation", "has_reel", "has_image", "attachment_text_only"]]
     df["has_any_attachment"] = (
         df["has_reel"] | df["has_image"] | df["attachment_text_only"]
     )
@@ -0,0 +1,304 @@
+"""Synthetic Instagram export generator.
+
+Writes a tree shaped like a real "Download your information" JSON export:
+
+    <root>/your_instagram_activity/messages/inbox/<conv>_<id>/message_N.json
+    <root>/your_instagram_activity/likes/liked_posts.json
+    <root>/your_instagram_activity/saved/saved_posts.json
+    <root>/your_instagram_activity/{comments,story_interactions}/...
+    <root>/connections/followers_and_following/{followers_1,following}.json
+    <root>/logged_information/recent_searches/account_searches.json
+    <root>/personal_information/personal_information/personal_information.json
+
+Text is stored the way Instagram stores it: UTF-8 bytes re-read as Latin-1
+and written with ASCII escapes, so names and emoji arrive as mojibake.
+
+    python synth_export.py OUT_DIR --conversations 200 --messages 500
+"""
+import argparse
+import json
+import os
+import random
+
+MY_NAME = "Synthetic Me"
+MY_USERNAME = "synthetic.me"
+
+# Instagram starts a new message_N.json after this many messages.
+MESSAGES_PER_FILE = 10000
+
+WORDS = (
+    "lol ok yes no maybe tomorrow tonight haha what why where when send reel "
+    "this is so funny did you see that omg wait call me later sure thanks "
+    "love it same bro sis coffee class exam trip pics party weekend"
+).split()
+EMOJI = ["\U0001F602", "❤️", "\U0001F62D", "\U0001F525", "\U0001F44D", "\U0001F60D"]
+FIRST = ["Aarav", "Maya", "Noah", "Zoë", "Léa", "Omar", "Priya", "Sven", "Chloé", "Kai", "Ana", "Jiří"]
+LAST = ["Sharma", "Müller", "Okafor", "García", "Kowalski", "Tanaka", "Núñez", "Silva", "Öztürk"]
+CREATORS = [f"creator_{i:04d}" for i in range(400)]
+
+START_MS = 1_420_070_400_000  # 2015-01-01
+END_MS = 1_765_324_800_000  # 2025-12-10
+
+
+def mojibake(s):
+    """Encode ``s`` the way Instagram exports do (UTF-8 read as Latin-1)."""
+    return s.encode("utf-8").decode("latin-1")
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def _person(rng):
+    return f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+
+
+def _text(rng):
+    words = [rng.choice(WORDS) for _ in range(max(1, int(rng.expovariate(1 / 6))))]
+    if rng.random() < 0.15:
+        words.append(rng.choice(EMOJI))
+    return " ".join(words)
+
+
+def _timestamps(rng, n):
+    # Conversations live for a random stretch; activity clusters in the
+    # evening like real chats do.
+    start = rng.randint(START_MS, END_MS - 86_400_000)
+    end = min(END_MS, start + int(rng.expovariate(1 / (400 * 86_400_000))) + 86_400_000)
+    out = []
+    for _ in range(n):
+        t = rng.randint(start, end)
+        day = t - t % 86_400_000
+        hour = min(23, max(0, int(rng.gauss(19, 4))))
+        out.append(day + hour * 3_600_000 + rng.randint(0, 3_599_999))
+    out.sort(reverse=True)
+    return out
+
+
+def _message(rng, sender, ts_ms, conv_dir, media_ratio):
+    msg = {"sender_name": mojibake(sender), "timestamp_ms": ts_ms}
+    r = rng.random()
+    if r < media_ratio * 0.5:
+        msg["share"] = {
+            "link": f"https://www.instagram.com/reel/{rng.getrandbits(40):x}/",
+            "original_content_owner": rng.choice(CREATORS),
+        }
+        msg["content"] = f"{mojibake(sender)} sent an attachment."
+    elif r < media_ratio * 0.9:
+        msg["photos"] = [{
+            "uri": f"{conv_dir}/photos/{rng.getrandbits(48)}.jpg",
+            "creation_timestamp": ts_ms // 1000,
+        }]
+    elif r < media_ratio:
+        msg["content"] = f"{mojibake(sender)} sent an attachment."
+    else:
+        msg["content"] = mojibake(_text(rng))
+
+    if rng.random() < 0.05:
+        msg["reactions"] = [{"reaction": mojibake(rng.choice(EMOJI)), "actor": mojibake(MY_NAME)}]
+    msg["is_geoblocked_for_viewer"] = False
+    return msg
+
+
+def _image_bytes(rng, size):
+    """A small JPEG of random noise (raw bytes if Pillow is unavailable)."""
+    raw = rng.randbytes(size * size * 3)
+    try:
+        from io import BytesIO
+        from PIL import Image
+    except ImportError:
+        return raw
+    buf = BytesIO()
+    Image.frombytes("RGB", (size, size), raw).save(buf, format="JPEG", quality=70)
+    return buf.getvalue()
+
+
+def _write_media(rng, root, uris, duplicate_ratio):
+    """Write an image at every URI; ``duplicate_ratio`` of them reuse content."""
+    distinct = max(1, int(len(uris) * (1 - duplicate_ratio)))
+    pool = [_image_bytes(rng, rng.choice([64, 128, 256])) for _ in range(distinct)]
+    for i, uri in enumerate(uris):
+        data = pool[i] if i < distinct else rng.choice(pool)
+        path = os.path.join(root, uri)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def generate_export(root, conversations=200, messages=500, media_ratio=0.2,
+                    group_ratio=0.1, likes=2000, saves=500, seed=0,
+                    media_files=False, duplicate_ratio=0.1):
+    """Write a synthetic export under ``root`` and return a summary dict.
+
+    ``messages`` is the mean message count per conversation; actual counts
+    are heavy-tailed so a few conversations dominate, as in real inboxes.
+    With ``media_files`` every referenced photo (and the profile photo) is
+    written as a real image, ``duplicate_ratio`` of them byte-identical to
+    another.
+    """
+    rng = random.Random(seed)
+    inbox = os.path.join(root, "your_instagram_activity", "messages", "inbox")
+    total_messages = 0
+    files = 0
+    media_uris = []
+
+    for c in range(conversations):
+        is_group = rng.random() < group_ratio
+        others = [_person(rng) for _ in range(rng.randint(2, 6) if is_group else 1)]
+        folder = f"{others[0].split()[0].lower()}{c}_{10**15 + rng.getrandbits(40)}"
+        conv_dir = f"your_instagram_activity/messages/inbox/{folder}"
+
+        n = max(1, int(rng.paretovariate(1.5) * messages / 3))
+        people = [MY_NAME] + others
+        msgs = [
+            _message(rng, rng.choice(people), ts, conv_dir, media_ratio)
+            for ts in _timestamps(rng, n)
+        ]
+
+        media_uris.extend(p["uri"] for m in msgs for p in m.get("photos", ()))
+
+        participants = [{"name": mojibake(p)} for p in people]
+        title = mojibake(", ".join(others) if is_group else others[0])
+        for i in range(0, len(msgs), MESSAGES_PER_FILE):
+            _write_json(
+                os.path.join(inbox, folder, f"message_{i // MESSAGES_PER_FILE + 1}.json"),
+                {
+                    "participants": participants,
+                    "messages": msgs[i:i + MESSAGES_PER_FILE],
+                    "title": title,
+                    "is_still_participant": True,
+                    "thread_path": f"inbox/{folder}",
+                    "magic_words": [],
+                },
+            )
+            files += 1
+        total_messages += n
+
+    activity = os.path.join(root, "your_instagram_activity")
+    _write_json(os.path.join(activity, "likes", "liked_posts.json"), {
+        "likes_media_likes": [
+            {
+                "title": rng.choice(CREATORS),
+                "string_list_data": [{
+                    "href": f"https://www.instagram.com/p/{rng.getrandbits(40):x}/",
+                    "value": "\U0001F44D".encode("utf-8").decode("latin-1"),
+                    "timestamp": rng.randint(START_MS, END_MS) // 1000,
+                }],
+            }
+            for _ in range(likes)
+        ]
+    })
+    _write_json(os.path.join(activity, "saved", "saved_posts.json"), {
+        "saved_saved_media": [
+            {
+                "title": rng.choice(CREATORS),
+                "string_map_data": {"Saved on": {
+                    "href": f"https://www.instagram.com/reel/{rng.getrandbits(40):x}/",
+                    "timestamp": rng.randint(START_MS, END_MS) // 1000,
+                }},
+            }
+            for _ in range(saves)
+        ]
+    })
+
+    def ts():
+        return rng.randint(START_MS, END_MS) // 1000
+
+    def map_item(fields, title=""):
+        return {"title": title, "string_map_data": fields}
+
+    _write_json(os.path.join(activity, "comments", "post_comments_1.json"), [
+        map_item({
+            "Comment": {"value": mojibake(_text(rng))},
+            "Media Owner": {"value": rng.choice(CREATORS)},
+            "Time": {"timestamp": ts()},
+        })
+        for _ in range(likes // 10)
+    ])
+    _write_json(os.path.join(activity, "story_interactions", "story_likes.json"), {
+        "story_activities_story_likes": [
+            {"title": rng.choice(CREATORS), "string_list_data": [{"timestamp": ts()}]}
+            for _ in range(likes // 4)
+        ]
+    })
+    connections = os.path.join(root, "connections", "followers_and_following")
+    _write_json(os.path.join(connections, "followers_1.json"), [
+        {"title": "", "media_list_data": [], "string_list_data": [{
+            "href": f"https://www.instagram.com/{c}", "value": c, "timestamp": ts(),
+        }]}
+        for c in rng.sample(CREATORS, len(CREATORS) // 2)
+    ])
+    _write_json(os.path.join(connections, "following.json"), {
+        "relationships_following": [
+            {"title": c, "string_list_data": [{"href": f"https://www.instagram.com/_u/{c}", "timestamp": ts()}]}
+            for c in rng.sample(CREATORS, len(CREATORS) // 3)
+        ]
+    })
+    _write_json(os.path.join(root, "logged_information", "recent_searches", "account_searches.json"), {
+        "searches_user": [
+            map_item({"Search": {"value": rng.choice(CREATORS)}, "Time": {"timestamp": ts()}})
+            for _ in range(saves // 2)
+        ]
+    })
+
+    _write_json(
+        os.path.join(root, "personal_information", "personal_information", "personal_information.json"),
+        {"profile_user": [{
+            "media_map_data": {"Profile Photo": {
+                "uri": "media/profile/202501/profile.jpg",
+                "creation_timestamp": END_MS // 1000,
+            }},
+            "string_map_data": {
+                "Name": {"href": "", "value": mojibake(MY_NAME), "timestamp": 0},
+                "Username": {"href": "", "value": MY_USERNAME, "timestamp": 0},
+            },
+        }]},
+    )
+
+    if media_files:
+        _write_media(rng, root, media_uris + ["media/profile/202501/profile.jpg"], duplicate_ratio)
+
+    return {
+        "root": os.path.abspath(root),
+        "conversations": conversations,
+        "messages": total_messages,
+        "files": files,
+        "likes": likes,
+        "saves": saves,
+        "media_files": len(media_uris) if media_files else 0,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic Instagram export.")
+    ap.add_argument("out_dir")
+    ap.add_argument("--conversations", type=int, default=200)
+    ap.add_argument("--messages", type=int, default=500, help="mean messages per conversation")
+    ap.add_argument("--media-ratio", type=float, default=0.2)
+    ap.add_argument("--group-ratio", type=float, default=0.1)
+    ap.add_argument("--likes", type=int, default=2000)
+    ap.add_argument("--saves", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--media-files", action="store_true", help="write real image files for media URIs")
+    ap.add_argument("--duplicate-ratio", type=float, default=0.1)
+    args = ap.parse_args(argv)
+
+    summary = generate_export(
+        args.out_dir,
+        conversations=args.conversations,
+        messages=args.messages,
+        media_ratio=args.media_ratio,
+        group_ratio=args.group_ratio,
+        likes=args.likes,
+        saves=args.saves,
+        seed=args.seed,
+        media_files=args.media_files,
+        duplicate_ratio=args.duplicate_ratio,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
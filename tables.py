@@ -0,0 +1,148 @@
+"""Paged, rank-styled tables for large frames.
+
+Only the visible page is sliced, styled and sent to the browser. Sort
+orders are argsorted once per column and reused across reruns while the
+column's values are unchanged (their hash is part of the key), and rank
+styling is a vectorized lookup over the page instead of a per-row
+``Styler.apply`` callback.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RANK_STYLES = {
+    1: "font-weight: bold; color: gold",
+    2: "font-weight: bold; color: silver",
+    3: "font-weight: bold; color: #cd7f32",
+}
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def frame_fingerprint(df: pd.DataFrame):
+    """Cheap identity for a frame: shape, columns and a hash of the index."""
+    import pandas as pd
+
+    idx_hash = int(pd.util.hash_pandas_object(df.index, index=False).sum()) if len(df) else 0
+    return (df.shape, tuple(map(str, df.columns)), idx_hash)
+
+
+def sort_order(df: pd.DataFrame, column, ascending=True):
+    """Stable positional order of ``df`` by ``column`` (NaNs last)."""
+    values = df[column].reset_index(drop=True)
+    ordered = values.sort_values(ascending=ascending, kind="stable", na_position="last")
+    return ordered.index.to_numpy()
+
+
+def rank_positions(df: pd.DataFrame, column, ascending=False):
+    """1-based rank of every row by ``column``."""
+    import numpy as np
+
+    order = sort_order(df, column, ascending=ascending)
+    ranks = np.empty(len(df), dtype=np.int64)
+    ranks[order] = np.arange(1, len(df) + 1)
+    return ranks
+
+
+def rank_style_matrix(ranks, n_cols, styles=RANK_STYLES):
+    """CSS strings of shape (len(ranks), n_cols), styled by rank."""
+    import numpy as np
+
+    ranks = np.asarray(ranks)
+    css = np.full(len(ranks), "", dtype=object)
+    for rank, style in styles.items():
+        css[ranks == rank] = style
+    return np.repeat(css[:, None], n_cols, axis=1)
+
+
+def page_frame(df: pd.DataFrame, order, page, page_size):
+    """Rows of page ``page`` (0-based) in ``order``."""
+    start = page * page_size
+    return df.iloc[order[start:start + page_size]]
+
+
+def style_page(page_df: pd.DataFrame, rank_col):
+    """Styler for one page, highlighting the top ranks in ``rank_col``."""
+    import pandas as pd
+
+    styles = rank_style_matrix(page_df[rank_col].to_numpy(), page_df.shape[1])
+    styles = pd.DataFrame(styles, index=page_df.index, columns=page_df.columns)
+    return page_df.style.apply(lambda _: styles, axis=None)
+
+
+def column_hash(df: pd.DataFrame, column):
+    """Hash of ``df[column]``'s values in row order."""
+    import numpy as np
+    import pandas as pd
+
+    if not len(df):
+        return 0
+    h = pd.util.hash_pandas_object(df[column], index=False).to_numpy()
+    return int((h ^ np.arange(len(h), dtype="uint64") * np.uint64(0x9E3779B97F4A7C15)).sum())
+
+
+def _cached_order(key, df, column, ascending):
+    import streamlit as st
+
+    cache_key = f"_table_orders_{key}"
+    fp = frame_fingerprint(df)
+    entry = st.session_state.get(cache_key)
+    if entry is None or entry[0] != fp:
+        entry = (fp, {})
+        st.session_state[cache_key] = entry
+    orders = entry[1]
+    order_key = (column, ascending, column_hash(df, column))
+    if order_key not in orders:
+        if len(orders) >= 8:
+            orders.clear()
+        orders[order_key] = sort_order(df, column, ascending=ascending)
+    return orders[order_key]
+
+
+def paged_table(df: pd.DataFrame, key, sort_by=None, ascending=False, rank_by=None,
+                page_size=50, hide_index=False):
+    """Render ``df`` as a sortable, paged table.
+
+    ``rank_by`` adds a leading ``Rank`` column (1 = largest) whose top three
+    rows are highlighted gold/silver/bronze on whichever page they appear.
+    """
+    import streamlit as st
+
+    if df.empty:
+        st.dataframe(df, hide_index=hide_index)
+        return
+
+    if rank_by is not None:
+        df = df.copy(deep=False)
+        df.insert(0, "Rank", rank_positions(df, rank_by, ascending=False))
+
+    columns = list(df.columns)
+    c1, c2, c3, c4 = st.columns([3, 2, 2, 2])
+    with c1:
+        default = columns.index(sort_by) if sort_by in columns else 0
+        column = st.selectbox("Sort by", columns, index=default, key=f"{key}_sort")
+    with c2:
+        asc = st.toggle("Ascending", value=ascending, key=f"{key}_asc")
+    with c3:
+        size = st.selectbox(
+            "Rows per page",
+            PAGE_SIZES,
+            index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1,
+            key=f"{key}_size",
+        )
+    n_pages = max(1, -(-len(df) // size))
+    with c4:
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages,
+                               value=1, step=1, key=f"{key}_page")
+
+    order = _cached_order(key, df, column, asc)
+    page_df = page_frame(df, order, int(page) - 1, size)
+
+    if rank_by is not None:
+        st.dataframe(style_page(page_df, "Rank"), hide_index=hide_index)
+    else:
+        st.dataframe(page_df, hide_index=hide_index)
+    st.caption(f"{len(df):,} rows")
@@ -0,0 +1,236 @@
+"""Message text kept outside the analytics frame in a memory-mapped store.
+
+Text is most of a message frame's memory, yet only views that show messages
+need it: the stats use ``word_count`` and the flags. ``split_text`` moves the
+``text`` column into a ``TextStore`` and leaves an int64 ``text_id`` (``-1``
+for missing text), so copies, cache pickles and spills of the frame stay
+small.
+
+A store is two append-only files: ``<path>.bin`` with the UTF-8 bytes of
+every string back to back, and ``<path>.idx`` with int64 end offsets (after
+a leading 0), so string ``i`` is ``bin[idx[i]:idx[i + 1]]``. Reads go through
+``mmap`` and only decode the requested ids. Appending never moves existing
+strings, so frames built before an append keep valid ids.
+
+Like the reaction side table (see ``engagement``), the store is attached to
+the frame object it was split from; ``shared_cache`` views resolve to it.
+The store path is also kept in ``df.attrs``, which pandas carries over to
+filtered, sorted, copied and concatenated frames, so those find it too (only
+attached frames keep a retired store's files alive, though).
+A store that is no longer needed is ``retire``d: its files are deleted once
+no frame attached to it is alive, so sessions still holding an older frame
+keep reading their text.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+import shared_cache
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_stores = {}
+# Store objects by path, for frames that only carry the path in attrs.
+_paths = {}
+# Live attached frames per store path, and paths to delete when that hits 0.
+_live = {}
+_retired = {}
+# Re-entrant: a frame collected while the lock is held runs _forget.
+_stores_lock = threading.RLock()
+
+
+class TextStore:
+    """Append-only UTF-8 strings addressed by id."""
+
+    def __init__(self, path, truncate=False):
+        import numpy as np
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._maps = None
+        if truncate or not os.path.exists(f"{path}.idx"):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            open(f"{path}.bin", "wb").close()
+            with open(f"{path}.idx", "wb") as f:
+                f.write(np.zeros(1, dtype="<i8").tobytes())
+        self._count = os.path.getsize(f"{path}.idx") // 8 - 1
+        self._end = os.path.getsize(f"{path}.bin")
+
+    def __reduce__(self):
+        return TextStore, (self.path,)
+
+    def __len__(self):
+        return self._count
+
+    def nbytes(self):
+        return self._end + 8 * (self._count + 1)
+
+    def append(self, texts):
+        """Append ``texts`` (None allowed) and return their ids (-1 for None)."""
+        import numpy as np
+
+        ids = np.full(len(texts), -1, dtype="int64")
+        present = [i for i, t in enumerate(texts) if t is not None]
+        encoded = [str(texts[i]).encode("utf-8", "surrogatepass") for i in present]
+        lengths = np.fromiter(map(len, encoded), dtype="int64", count=len(encoded))
+
+        with self._lock:
+            ends = self._end + np.cumsum(lengths)
+            with open(f"{self.path}.bin", "ab") as f:
+                f.write(b"".join(encoded))
+            with open(f"{self.path}.idx", "ab") as f:
+                f.write(ends.astype("<i8").tobytes())
+            ids[present] = np.arange(self._count, self._count + len(encoded))
+            self._count += len(encoded)
+            if len(ends):
+                self._end = int(ends[-1])
+        return ids
+
+    def _mapped(self):
+        import numpy as np
+
+        with self._lock:
+            if self._maps is None or self._maps[0] != self._count:
+                offsets = np.memmap(f"{self.path}.idx", dtype="<i8", mode="r", shape=(self._count + 1,))
+                blob = b""
+                if self._end:
+                    with open(f"{self.path}.bin", "rb") as f:
+                        blob = mmap.mmap(f.fileno(), self._end, access=mmap.ACCESS_READ)
+                self._maps = (self._count, offsets, blob)
+            return self._maps[1], self._maps[2]
+
+    def get(self, ids):
+        """Strings for ``ids`` (None where the id is -1)."""
+        import numpy as np
+
+        ids = np.asarray(ids, dtype="int64")
+        offsets, blob = self._mapped()
+        safe = np.where(ids >= 0, ids, 0)
+        starts, ends = offsets[safe], offsets[safe + 1]
+        return [
+            None if i < 0 else blob[s:e].decode("utf-8", "surrogatepass")
+            for i, s, e in zip(ids.tolist(), starts.tolist(), ends.tolist())
+        ]
+
+    def remove(self):
+        """Delete the store's files; already mapped data stays readable."""
+        with _stores_lock:
+            if _paths.get(self.path) is self:
+                del _paths[self.path]
+        for suffix in (".bin", ".idx"):
+            try:
+                os.remove(f"{self.path}{suffix}")
+            except OSError:
+                pass
+
+
+def _release(store):
+    """Drop one live frame of ``store``; True if its files should go now."""
+    count = _live.get(store.path, 0) - 1
+    if count > 0:
+        _live[store.path] = count
+        return False
+    _live.pop(store.path, None)
+    return _retired.pop(store.path, None) is not None
+
+
+def _forget(key):
+    with _stores_lock:
+        hit = _stores.pop(key, None)
+        done = hit is not None and _release(hit[1])
+    if done:
+        hit[1].remove()
+
+
+def attach(df: pd.DataFrame, store):
+    """Register ``store`` as the text store of ``df``."""
+    key = id(df)
+    with _stores_lock:
+        old = _stores.get(key)
+        if old is not None and old[0]() is df:
+            _release(old[1])
+        _stores[key] = (weakref.ref(df, lambda _, key=key: _forget(key)), store)
+        _live[store.path] = _live.get(store.path, 0) + 1
+        _paths[store.path] = store
+    df.attrs["text_store"] = store.path
+    return store
+
+
+def retire(store):
+    """Delete ``store``'s files once no frame attached to it is alive (now if none is)."""
+    with _stores_lock:
+        if _live.get(store.path):
+            _retired[store.path] = store
+            return
+    store.remove()
+
+
+def remove_retired():
+    """Delete every retired store now, live frames or not (for process exit)."""
+    with _stores_lock:
+        stores = list(_retired.values())
+        _retired.clear()
+    for store in stores:
+        store.remove()
+
+
+def store_for(df: pd.DataFrame):
+    """The store ``df``'s ``text_id`` column points into (None if not split)."""
+    origin = shared_cache.origin(df)
+    with _stores_lock:
+        hit = _stores.get(id(origin))
+        if hit is not None and hit[0]() is origin:
+            return hit[1]
+        path = df.attrs.get("text_store")
+        if path is None:
+            return None
+        store = _paths.get(path)
+        if store is None and os.path.exists(f"{path}.idx"):
+            store = _paths[path] = TextStore(path)
+        return store
+
+
+def split_text(df: pd.DataFrame, store, reuse=None):
+    """Move ``df["text"]`` into ``store`` and add ``text_id`` (in place).
+
+    ``reuse`` optionally gives, per row, an id already in ``store`` (-1 for
+    none); rows whose text equals that id's text keep it instead of being
+    appended again.
+    """
+    import numpy as np
+
+    texts = df.pop("text").to_numpy(dtype=object)
+    ids = np.full(len(texts), -1, dtype="int64")
+    fresh = np.ones(len(texts), dtype=bool)
+    if reuse is not None:
+        reuse = np.asarray(reuse, dtype="int64")
+        rows = np.flatnonzero(reuse >= 0)
+        old = store.get(reuse[rows])
+        same = rows[np.fromiter((o == t for o, t in zip(old, texts[rows])), dtype=bool, count=len(rows))]
+        ids[same] = reuse[same]
+        fresh[same] = False
+    ids[fresh] = store.append(texts[fresh])
+    df["text_id"] = ids
+    return attach(df, store)
+
+
+def text_column(df: pd.DataFrame, index=None):
+    """Message text of ``df`` (or of the rows labelled ``index``) as a Series.
+
+    Works for frames that still carry a ``text`` column as well as for split
+    ones; only the requested rows are decoded.
+    """
+    import pandas as pd
+
+    if "text" in df.columns:
+        return df["text"] if index is None else df.loc[index, "text"]
+    ids = df["text_id"] if index is None else df.loc[index, "text_id"]
+    store = store_for(df)
+    if store is None:
+        raise KeyError("frame has no text column and no attached text store")
+    return pd.Series(store.get(ids.to_numpy()), index=ids.index, name="text")
@@ -0,0 +1,149 @@
+"""Downscaled image thumbnails in a size-bounded on-disk LRU cache.
+
+A thumbnail is keyed by the source's absolute path, mtime, size and the
+requested edge length, so edited or replaced originals get fresh
+thumbnails. JPEGs are decoded with ``Image.draft`` so the decoder itself
+downsamples instead of materialising the full-resolution image. Each cache
+hit touches the file's mtime; when the cache grows past
+``config.THUMBNAIL_CACHE_MAX_BYTES`` the least recently used files are
+deleted. Concurrent requests for the same thumbnail wait for one decode.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import instrument
+
+DEFAULT_MAX_PX = 256
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+_lock = threading.Lock()
+_inflight = {}
+_cache_bytes = None
+
+
+def _cache_dir():
+    return os.path.join(config.CACHE_DIR, "thumbnails")
+
+
+def cache_key(src, max_px):
+    st = os.stat(src)
+    raw = f"{os.path.abspath(src)}|{st.st_mtime_ns}|{st.st_size}|{max_px}".encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _thumb_path(key):
+    return os.path.join(_cache_dir(), key[:2], f"{key}.jpg")
+
+
+def _scan_cache():
+    entries = []
+    for root, _, files in os.walk(_cache_dir()):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+    return entries
+
+
+def _account(added):
+    """Add ``added`` bytes to the cache total and evict LRU files if over."""
+    global _cache_bytes
+    limit = config.THUMBNAIL_CACHE_MAX_BYTES
+    with _lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _scan_cache())
+        else:
+            _cache_bytes += added
+        if _cache_bytes <= limit:
+            return
+
+        # Evict down to 90% so we do not rescan on every insert.
+        target = int(limit * 0.9)
+        for _, size, path in sorted(_scan_cache()):
+            if _cache_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                _cache_bytes -= size
+            except OSError:
+                continue
+
+
+def _render(src, dest, max_px):
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        img.draft("RGB", (max_px, max_px))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_px, max_px))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{threading.get_ident()}.tmp"
+        try:
+            img.save(tmp, format="JPEG", quality=85)
+            os.replace(tmp, dest)
+        finally:
+            # Only left behind if the save or the replace failed.
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return os.path.getsize(dest)
+
+
+def get_thumbnail(src, max_px=DEFAULT_MAX_PX):
+    """Path to a cached thumbnail of ``src``, or None if it is not an image."""
+    if not src or os.path.splitext(src)[1].lower() not in IMAGE_EXTS:
+        return None
+    try:
+        key = cache_key(src, max_px)
+    except OSError:
+        return None
+    dest = _thumb_path(key)
+
+    if os.path.exists(dest):
+        try:
+            os.utime(dest)
+        except OSError:
+            pass
+        return dest
+
+    with _lock:
+        event = _inflight.get(key)
+        owner = event is None
+        if owner:
+            event = _inflight[key] = threading.Event()
+    if not owner:
+        event.wait()
+        return dest if os.path.exists(dest) else None
+
+    try:
+        with instrument.span("thumbnails.render") as sp:
+            sp["bytes_read"] = os.path.getsize(src)
+            added = _render(src, dest, max_px)
+        _account(added)
+        return dest
+    except Exception:
+        return None
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        event.set()
+
+
+def get_thumbnails(paths, max_px=DEFAULT_MAX_PX, workers=None):
+    """Thumbnails for many sources, generated on a worker pool (order kept)."""
+    workers = workers or config.THUMBNAIL_WORKERS
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda p: get_thumbnail(p, max_px), paths))
+
+
+def cache_usage():
+    """(files, bytes) currently in the thumbnail cache."""
+    entries = _scan_cache()
+    return len(entries), sum(size for _, size, _ in entries)
@@ -0,0 +1,202 @@
+"""Prefix-sum index of message counts per conversation over time.
+
+``build_index`` bins every message by conversation and day (or hour) into a
+dense ``conversations x bins`` count matrix and stores its running sum along
+time, with a leading zero column:
+
+    cum[c, j] = messages in conversation c in bins [0, j)
+
+so the count in any window ``[a, b)`` is ``cum[:, b] - cum[:, a]``: O(1) per
+conversation whatever the window length, and one vectorized subtraction for
+all of them. Rolling-window series and "busiest window" searches are the same
+subtraction over shifted slices of ``cum``.
+
+Counts are int32 (a single conversation never approaches 2**31 messages).
+Daily bins for thousands of conversations over a decade are tens of MB; pass
+``conversations`` to index a subset, which is what hourly bins are meant for.
+The index is cached per frame object (views from ``shared_cache`` share
+their origin's index) without keeping the frame alive; treat it as read-only.
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+import shared_cache
+from instrument import traced
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FREQS = {"D": "datetime64[D]", "h": "datetime64[h]"}
+
+_index_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _forget(frame_id):
+    with _cache_lock:
+        for key in [k for k in _index_cache if k[0] == frame_id]:
+            del _index_cache[key]
+
+
+@traced
+def build_index(df: pd.DataFrame, freq="D", conversations=None):
+    """Prefix-sum counts for ``df`` by conversation and ``freq`` ("D" or "h") bin."""
+    import numpy as np
+    import pandas as pd
+
+    df = shared_cache.origin(df)
+    key = (id(df), freq, None if conversations is None else tuple(conversations))
+    with _cache_lock:
+        hit = _index_cache.get(key)
+    if hit is not None and hit[0]() is df:
+        return hit[1]
+
+    unit = FREQS[freq]
+    names = df["conversation"].to_numpy()
+    stamps = df["timestamp"].to_numpy()
+    if conversations is not None:
+        keep = np.isin(names, list(conversations))
+        names, stamps = names[keep], stamps[keep]
+    codes, convs = pd.factorize(names)
+
+    bins = stamps.astype(unit)
+    valid = ~np.isnat(bins)
+    n_conv = len(convs)
+    if valid.any():
+        start = bins[valid].min()
+        n_bins = int((bins[valid].max() - start).astype("int64")) + 1
+    else:
+        start, n_bins = np.datetime64("1970-01-01", freq), 0
+    pos = (bins[valid] - start).astype("int64")
+
+    counts = np.bincount(codes[valid] * n_bins + pos, minlength=n_conv * n_bins).reshape(n_conv, n_bins)
+    cum = np.zeros((n_conv, n_bins + 1), dtype="int32")
+    np.cumsum(counts, axis=1, out=cum[:, 1:])
+
+    index = {
+        "freq": freq,
+        "start": pd.Timestamp(start),
+        "conversations": pd.Index(convs, name="conversation"),
+        "cum": cum,
+        "cum_total": cum.sum(axis=0, dtype="int64"),
+    }
+    ref = weakref.ref(df, lambda _, frame_id=key[0]: _forget(frame_id))
+    with _cache_lock:
+        if len(_index_cache) >= 4:
+            _index_cache.clear()
+        _index_cache[key] = (ref, index)
+    return index
+
+
+def _step(index):
+    import pandas as pd
+
+    return pd.Timedelta(1, unit=index["freq"])
+
+
+def bin_of(index, when):
+    """Bin number of ``when`` (clipped to ``[0, n_bins]``)."""
+    import pandas as pd
+
+    n_bins = index["cum"].shape[1] - 1
+    j = (pd.Timestamp(when) - index["start"]) // _step(index)
+    return int(min(max(j, 0), n_bins))
+
+
+def bin_starts(index, first=0, last=None):
+    """Timestamps of bins ``first`` .. ``last`` (exclusive)."""
+    import pandas as pd
+
+    last = index["cum"].shape[1] - 1 if last is None else last
+    return pd.date_range(index["start"] + first * _step(index), periods=max(last - first, 0), freq=index["freq"])
+
+
+def window_counts(index, start, end):
+    """Messages per conversation in ``[start, end)``."""
+    import pandas as pd
+
+    a, b = bin_of(index, start), bin_of(index, end)
+    cum = index["cum"]
+    return pd.Series(cum[:, b] - cum[:, a], index=index["conversations"], name="messages")
+
+
+def total_in_range(index, start, end):
+    a, b = bin_of(index, start), bin_of(index, end)
+    return int(index["cum_total"][b] - index["cum_total"][a])
+
+
+@traced
+def rolling_counts(index, window, conversations=None):
+    """Trailing ``window``-bin counts, one column per conversation (or "all").
+
+    Row ``t`` counts the bins ``(t - window, t]``; the first ``window - 1``
+    rows count a shorter history.
+    """
+    import numpy as np
+    import pandas as pd
+
+    window = max(int(window), 1)
+    if conversations is None:
+        cum, columns = index["cum_total"][None, :], ["all"]
+    else:
+        rows = index["conversations"].get_indexer(list(conversations))
+        rows = rows[rows >= 0]
+        cum, columns = index["cum"][rows], index["conversations"][rows]
+    hi = np.arange(1, cum.shape[1])
+    out = cum[:, hi] - cum[:, np.maximum(hi - window, 0)]
+    return pd.DataFrame(out.T, index=bin_starts(index), columns=columns)
+
+
+@traced
+def best_windows(index, window, min_messages=1):
+    """Each conversation's busiest ``window``-bin stretch: start, end and count.
+
+    Ties go to the earliest window. A window longer than the indexed span is
+    shortened to the span.
+    """
+    import numpy as np
+    import pandas as pd
+
+    cum = index["cum"]
+    n_bins = cum.shape[1] - 1
+    window = max(1, min(int(window), n_bins))
+    if n_bins == 0:
+        return pd.DataFrame(columns=["conversation", "start", "end", "messages", "share"])
+
+    sums = cum[:, window:] - cum[:, :-window]
+    best = sums.argmax(axis=1)
+    messages = np.take_along_axis(sums, best[:, None], axis=1)[:, 0]
+    totals = cum[:, -1]
+    starts = index["start"] + pd.to_timedelta(best, unit=index["freq"])
+
+    out = pd.DataFrame({
+        "conversation": index["conversations"],
+        "start": starts,
+        "end": starts + window * _step(index),
+        "messages": messages,
+        "share": (messages / np.maximum(totals, 1)).round(3),
+    })
+    out = out[out["messages"] >= min_messages]
+    return out.sort_values("messages", ascending=False, ignore_index=True)
+
+
+def rolling_series(per_day, window):
+    """Trailing ``window``-day sums of a per-day count series (e.g. ``messages_per_day``).
+
+    For sources without the frame, such as snapshots; days without messages
+    count as zero.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if per_day.empty:
+        return pd.Series(dtype="int64", name="all")
+    days = pd.to_datetime(pd.Index(per_day.index))
+    full = pd.date_range(days.min(), days.max(), freq="D")
+    counts = pd.Series(per_day.to_numpy(), index=days).reindex(full, fill_value=0).to_numpy()
+    cum = np.concatenate([[0], np.cumsum(counts)])
+    hi = np.arange(1, len(cum))
+    return pd.Series(cum[hi] - cum[np.maximum(hi - max(int(window), 1), 0)], index=full, name="all")
@@ -0,0 +1,197 @@
+"""Trend and anomaly detection over every conversation at once.
+
+``detect`` turns the daily prefix sums of ``timeline_index`` into a
+``conversations x periods`` count matrix (periods end on the last day of
+the export, so the latest one is complete) and computes, for every cell in
+one pass of array ops:
+
+* a trailing baseline: mean and variance of the previous ``baseline_periods``
+  periods, from running sums of counts and squared counts;
+* a z-score against that baseline. The scale is ``sqrt(max(var, mean, 1))``
+  so quiet chats (where a Poisson count's variance is about its mean) do not
+  blow up on a handful of messages.
+
+A cell is only scored once the whole baseline lies after the conversation's
+first message, so a chat starting is not an anomaly. ``top_anomalies``
+reports spikes (high z) and drops (count far below the baseline), keeping
+the first period of each run. ``change_points`` finds, per conversation, the
+single split of its active span that best separates two activity levels
+(the CUSUM statistic, normalised like a z-score).
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import timeline_index
+from instrument import traced
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PERIOD_DAYS = 7
+BASELINE_PERIODS = 8
+Z_THRESHOLD = 3.0
+# A drop alert needs the period to fall by this share below a baseline of at
+# least MIN_BASELINE messages per period; spikes need MIN_SPIKE messages.
+DROP_SHARE = 0.8
+MIN_BASELINE = 5.0
+MIN_SPIKE = 10
+
+ANOMALY_COLUMNS = ["conversation", "period", "kind", "messages", "baseline", "change", "z"]
+CHANGE_COLUMNS = ["conversation", "changed", "before", "after", "change", "score"]
+
+
+@traced
+def period_matrix(df: pd.DataFrame, period_days=PERIOD_DAYS):
+    """``(conversations, period starts, counts)`` with counts as int32 (conv x period)."""
+    import numpy as np
+    import pandas as pd
+
+    index = timeline_index.build_index(df)
+    cum = index["cum"]
+    n_bins = cum.shape[1] - 1
+    n_periods = n_bins // period_days
+    edges = (n_bins - n_periods * period_days) + period_days * np.arange(n_periods + 1)
+    counts = np.diff(cum[:, edges], axis=1)
+    starts = pd.DatetimeIndex(index["start"] + pd.to_timedelta(edges[:-1], unit="D"), name="period")
+    return index["conversations"], starts, counts
+
+
+def _running(values):
+    import numpy as np
+
+    out = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=out[:, 1:])
+    return out
+
+
+@traced
+def detect(df: pd.DataFrame, period_days=PERIOD_DAYS, baseline_periods=BASELINE_PERIODS):
+    """Baselines and z-scores for every (conversation, period); see module docstring."""
+    import numpy as np
+
+    convs, periods, counts = period_matrix(df, period_days)
+    C = counts.astype("float64")
+    n_periods = C.shape[1]
+    b = max(int(baseline_periods), 2)
+
+    S, Q = _running(C), _running(C * C)
+    t = np.arange(n_periods)
+    lo = np.maximum(t - b, 0)
+    n_prev = np.maximum(t - lo, 1)
+    mean = (S[:, t] - S[:, lo]) / n_prev
+    var = np.maximum((Q[:, t] - Q[:, lo]) / n_prev - mean * mean, 0)
+    scale = np.sqrt(np.maximum(var, np.maximum(mean, 1)))
+    z = (C - mean) / scale
+
+    first = np.where(C.any(axis=1), (C > 0).argmax(axis=1), n_periods)
+    valid = (t[None, :] - b) >= first[:, None]
+    z[~valid] = 0
+
+    return {
+        "conversations": convs,
+        "periods": periods,
+        "period_days": period_days,
+        "baseline_periods": b,
+        "counts": C,
+        "running": S,
+        "baseline": mean,
+        "z": z,
+        "valid": valid,
+    }
+
+
+def _first_of_run(flag):
+    import numpy as np
+
+    prev = np.zeros_like(flag)
+    prev[:, 1:] = flag[:, :-1]
+    return flag & ~prev
+
+
+@traced
+def top_anomalies(result, z_threshold=Z_THRESHOLD, drop_share=DROP_SHARE,
+                  min_spike=MIN_SPIKE, min_baseline=MIN_BASELINE, top_n=100):
+    """Spikes and drops across all conversations, most extreme first."""
+    import numpy as np
+    import pandas as pd
+
+    C, mean, z, valid = result["counts"], result["baseline"], result["z"], result["valid"]
+    spike = _first_of_run(valid & (z >= z_threshold) & (C >= min_spike))
+    drop = _first_of_run(valid & (mean >= min_baseline) & (C <= (1 - drop_share) * mean))
+
+    rows, cols = np.nonzero(spike | drop)
+    if not len(rows):
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    base = mean[rows, cols]
+    out = pd.DataFrame({
+        "conversation": result["conversations"].take(rows),
+        "period": result["periods"].take(cols),
+        "kind": np.where(spike[rows, cols], "spike", "drop"),
+        "messages": C[rows, cols].astype("int64"),
+        "baseline": base.round(1),
+        "change": ((C[rows, cols] - base) / np.maximum(base, 1e-9)).round(3),
+        "z": z[rows, cols].round(2),
+    })
+    order = np.argsort(-np.abs(out["z"].to_numpy()), kind="stable")
+    return out.iloc[order[:top_n]].reset_index(drop=True)
+
+
+@traced
+def change_points(result, min_periods=None, top_n=100):
+    """Each conversation's strongest shift in activity level, strongest first.
+
+    Conversations active for fewer than ``min_periods`` periods (default: two
+    of ``detect``'s baselines) are skipped.
+    """
+    import numpy as np
+    import pandas as pd
+
+    C, S = result["counts"], result["running"]
+    n_conv, n_periods = C.shape
+    min_periods = 2 * result["baseline_periods"] if min_periods is None else min_periods
+    if n_conv == 0 or n_periods < 2:
+        return pd.DataFrame(columns=CHANGE_COLUMNS)
+
+    active = C > 0
+    first = active.argmax(axis=1)
+    last = n_periods - 1 - active[:, ::-1].argmax(axis=1)
+    length = (last - first + 1)[:, None].astype("float64")
+    rows = np.arange(n_conv)
+    base = S[rows, first][:, None]
+    total = S[rows, last + 1][:, None] - base
+
+    # Split before period j: [first, j) vs [j, last].
+    k = np.arange(n_periods + 1)[None, :] - first[:, None]
+    inside = (k >= 1) & (k <= length - 1)
+    k = np.where(inside, k, 1).astype("float64")
+    before_sum = S - base
+    stat = np.abs(before_sum - k / length * total) * np.sqrt(length / (k * np.maximum(length - k, 1)))
+    stat = np.where(inside, stat, 0) / np.sqrt(np.maximum(total / length, 1))
+
+    split = stat.argmax(axis=1)
+    pick = (rows, split)
+    before = before_sum[pick] / k[pick]
+    after = (total[:, 0] - before_sum[pick]) / np.maximum(length[:, 0] - k[pick], 1)
+    keep = (length[:, 0] >= min_periods) & inside[pick]
+
+    out = pd.DataFrame({
+        "conversation": result["conversations"],
+        "changed": result["periods"].take(np.minimum(split, n_periods - 1)),
+        "before": before.round(1),
+        "after": after.round(1),
+        "change": ((after - before) / np.maximum(before, 1e-9)).round(3),
+        "score": stat[pick].round(2),
+    })[keep]
+    return out.sort_values("score", ascending=False, ignore_index=True).head(top_n)
+
+
+def conversation_trend(result, conversation):
+    """Per-period messages and trailing baseline of one conversation."""
+    import pandas as pd
+
+    row = result["conversations"].get_loc(conversation)
+    return pd.DataFrame(
+        {"messages": result["counts"][row], "baseline": result["baseline"][row]},
+        index=result["periods"],
+    )
@@ -0,0 +1,159 @@
+"""Watch an export folder and refresh the loaded data when files change.
+
+Dropping a newer export over an old one (or unpacking extra parts into it)
+changes a few conversation folders and activity files. The watcher polls the
+tree every ``config.WATCH_INTERVAL_S`` and compares it with what was last
+applied:
+
+* conversations: each inbox folder's JSON files as (path, mtime, size). A
+  folder whose own mtime is unchanged has no added or removed files, so only
+  its known files are stat'ed again; the folder is re-listed otherwise.
+* activity tables: the fingerprint of every registered table's files.
+
+A change is applied once two consecutive polls agree, so files still being
+copied are not parsed half-written. Changed conversations are re-parsed by
+``IngestJob.refresh``, which swaps the new frame into ``shared_cache``;
+changed activity tables that are cached are re-loaded. Aggregates are keyed
+by frame identity or file fingerprints, so they follow on the next rerun.
+``version`` goes up on every applied change, which is what the app polls to
+rerun open dashboards.
+"""
+import os
+import threading
+import time
+
+import activity
+import config
+import ingest
+import json_loader
+import shared_cache
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+class ExportWatcher:
+    def __init__(self, export_root, interval=None):
+        self.export_root = os.path.abspath(export_root)
+        self.interval = config.WATCH_INTERVAL_S if interval is None else interval
+        self.version = 0
+        self.last_change = None
+        self.error = None
+
+        self._paths = config.resolve_paths(self.export_root)
+        self._convs = {}
+        self._applied = None
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"watch:{self.export_root}", daemon=True
+        )
+
+    def start(self):
+        self._applied = self._scan()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def _scan_inbox(self):
+        try:
+            entries = [e for e in os.scandir(self._paths["INBOX_DIR"]) if e.is_dir()]
+        except FileNotFoundError:
+            entries = []
+
+        convs = {}
+        for entry in entries:
+            mtime = entry.stat().st_mtime_ns
+            prev = self._convs.get(entry.name)
+            if prev is not None and prev[0] == mtime:
+                files = [p for p, _, _ in prev[1]]
+            else:
+                files = json_loader.conversation_files(entry.path)
+            convs[entry.name] = (mtime, activity.fingerprint(files))
+        self._convs = convs
+        return {name: fp for name, (_, fp) in convs.items() if fp}
+
+    def _scan(self):
+        tables = {
+            name: activity.fingerprint(activity.matched_files(self.export_root, spec))
+            for name, spec in activity.REGISTRY.items()
+        }
+        return {"conversations": self._scan_inbox(), "activity": tables}
+
+    def poll(self):
+        """Scan once and apply settled changes; returns the change or None."""
+        current = self._scan()
+        if current == self._applied:
+            self._pending = None
+            return None
+        if current != self._pending:
+            # Changed since the last poll: wait until it settles.
+            self._pending = current
+            return None
+
+        job = ingest.jobs().get(self.export_root)
+        if job is not None and not job.done:
+            return None
+
+        old, new = self._applied["conversations"], current["conversations"]
+        convs = sorted(name for name in old.keys() | new.keys() if old.get(name) != new.get(name))
+        tables = sorted(
+            name for name, fp in current["activity"].items() if self._applied["activity"].get(name) != fp
+        )
+        change = {"time": time.time(), "conversations": convs, "activity": tables, "messages": 0}
+
+        t0 = time.perf_counter()
+        try:
+            if convs and job is not None and job.status == "done":
+                change["messages"] = job.refresh(convs)
+            for name in tables:
+                if ("activity", self.export_root, name) in shared_cache.keys():
+                    activity.load_table(self.export_root, name)
+            self.error = None
+        except Exception as exc:
+            # Retried only when the files change again.
+            self.error = exc
+        change["seconds"] = time.perf_counter() - t0
+
+        self._applied = current
+        self._pending = None
+        self.last_change = change
+        self.version += 1
+        return change
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except OSError as exc:
+                self.error = exc
+
+
+def start(export_root, interval=None):
+    """Return the shared watcher for ``export_root``, starting one if needed."""
+    root = os.path.abspath(export_root)
+    with _watchers_lock:
+        w = _watchers.get(root)
+        if w is None or not w.running:
+            w = ExportWatcher(root, interval).start()
+            _watchers[root] = w
+        return w
+
+
+def stop(export_root):
+    root = os.path.abspath(export_root)
+    with _watchers_lock:
+        w = _watchers.pop(root, None)
+    if w is not None:
+        w.stop()
+
+
+def watchers():
+    with _watchers_lock:
+        return dict(_watchers)